@@ -0,0 +1,139 @@
+"""
+Benchmark of the compression of upload archives, ratio against time.
+
+Zips DESC outputs (by default the examples shipped with DESC) or any other
+files with every compression method and level of ``archive.write_zip`` and
+for several numbers of threads, and reports the compression ratio, the time
+and the throughput of each. The upload time of an archive is roughly its
+size divided by the bandwidth, so ``--bandwidth`` adds the estimated total
+time of compressing and uploading it. Results are written as JSON.
+
+Usage:
+    python benchmarks/benchmark_compression.py
+    python benchmarks/benchmark_compression.py runs/*.h5 --workers 1 4 16
+    python benchmarks/benchmark_compression.py --methods deflate --levels 1 6 9
+"""
+
+import argparse
+import glob
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from datetime import datetime
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO)
+
+from stelladb.archive import COMPRESSIONS, write_zip  # noqa: E402
+
+# levels benchmarked by default, None being the default level of the method
+_LEVELS = {
+    "stored": [None],
+    "deflate": [1, 6, 9],
+    "bzip2": [1, 9],
+    "lzma": [None],
+    "zstd": [1, 3, 10],
+}
+
+
+def _desc_examples():
+    """Return the example outputs shipped with DESC."""
+    import desc
+
+    folder = os.path.join(os.path.dirname(desc.__file__), "examples")
+    return sorted(glob.glob(os.path.join(folder, "*.h5")))
+
+
+def _run_case(files, method, level, workers, repeat):
+    """Zip ``files`` in memory, return the size and the best time of ``repeat`` runs."""
+    members = {f"{i}_{os.path.basename(path)}": path for i, path in enumerate(files)}
+    best = float("inf")
+    for _ in range(repeat):
+        out = io.BytesIO()
+        t = time.perf_counter()
+        write_zip(out, members, method, level, workers)
+        best = min(best, time.perf_counter() - t)
+    return len(out.getvalue()), best
+
+
+def _metadata():
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "HEAD"], cwd=REPO, capture_output=True, text=True
+        ).stdout.strip()
+    except OSError:
+        commit = None
+    return {
+        "date": datetime.now().isoformat(timespec="seconds"),
+        "commit": commit or None,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("files", nargs="*", help="files to zip, DESC examples if none")
+    parser.add_argument("--methods", nargs="+", default=list(COMPRESSIONS))
+    parser.add_argument(
+        "--levels", nargs="+", type=int, help="levels of every method instead of ours"
+    )
+    parser.add_argument("--workers", nargs="+", type=int, default=[1, os.cpu_count()])
+    parser.add_argument("--repeat", type=int, default=3, help="best of this many runs")
+    parser.add_argument(
+        "--bandwidth", type=float, default=100.0, help="upload bandwidth in Mbit/s"
+    )
+    parser.add_argument("--output", default="compression_results.json")
+    args = parser.parse_args(argv)
+
+    files = args.files or _desc_examples()
+    size = sum(os.path.getsize(path) for path in files)
+    print(f"Zipping {len(files)} files, {size / 1e6:.1f} MB in total")
+    upload_rate = args.bandwidth * 1e6 / 8
+
+    results = []
+    for method in args.methods:
+        if method not in COMPRESSIONS:
+            print(f"{method}: not available with Python {platform.python_version()}")
+            continue
+        for level in args.levels or _LEVELS[method]:
+            for workers in dict.fromkeys(args.workers):
+                zipped, seconds = _run_case(files, method, level, workers, args.repeat)
+                result = {
+                    "method": method,
+                    "level": level,
+                    "workers": workers,
+                    "size": zipped,
+                    "ratio": size / zipped,
+                    "time": seconds,
+                    "throughput_mb_s": size / 1e6 / seconds,
+                    "total_upload_time": seconds + zipped / upload_rate,
+                }
+                results.append(result)
+                print(
+                    f"{method:>8} level={str(level):>4} workers={workers:>3}: "
+                    f"ratio {result['ratio']:.2f}, {seconds:.3g}s, "
+                    f"{result['throughput_mb_s']:.0f} MB/s, "
+                    f"with upload {result['total_upload_time']:.3g}s"
+                )
+
+    with open(args.output, "w") as f:
+        json.dump(
+            {
+                "metadata": {**_metadata(), "files": files, "size": size},
+                "bandwidth_mbit_s": args.bandwidth,
+                "results": results,
+            },
+            f,
+            indent=1,
+        )
+    print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
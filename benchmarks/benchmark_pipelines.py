@@ -0,0 +1,286 @@
+"""
+Benchmarks of the DESC and VMEC pipelines over a sweep of resolutions.
+
+Every case builds a synthetic equilibrium (or a synthetic VMEC wout) and times
+``desc_to_csv``, ``vmec_to_csv``, ``_create_zip`` and ``_generate_desc_plots``
+together with the stages they consist of. Each case runs in a fresh process,
+so the first call of a pipeline includes JAX compilation and the reported
+peak RSS belongs to that case alone. Results are written as JSON.
+
+Usage:
+    python benchmarks/benchmark_pipelines.py --quick
+    python benchmarks/benchmark_pipelines.py --resolutions 4 8 16 24 --nfp 1 3 5
+    python benchmarks/benchmark_pipelines.py --pipelines vmec --output vmec.json
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from types import SimpleNamespace
+
+import numpy as np
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _peak_rss_mb():
+    """Return the peak resident set size of this process in MB."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return peak / 1024**2 if sys.platform == "darwin" else peak / 1024
+
+
+class _Stages:
+    """Record the wall time and peak RSS growth of consecutive stages."""
+
+    def __init__(self):
+        self.stages = {}
+
+    def __call__(self, stage, fun, *args, **kwargs):
+        rss = _peak_rss_mb()
+        t = time.perf_counter()
+        out = fun(*args, **kwargs)
+        self.stages[stage] = {
+            "time": time.perf_counter() - t,
+            "peak_rss_growth_mb": _peak_rss_mb() - rss,
+        }
+        return out
+
+
+def synthetic_equilibrium(L, M, N, NFP, sym, seed=0):
+    """Return an unsolved Equilibrium with a shaped boundary at the given resolution."""
+    from desc.equilibrium import Equilibrium
+    from desc.profiles import PowerSeriesProfile
+
+    eq = Equilibrium(
+        L=L,
+        M=M,
+        N=N,
+        NFP=NFP,
+        sym=sym,
+        Psi=1.0,
+        pressure=PowerSeriesProfile([1.0e4, 0, -1.0e4]),
+        iota=PowerSeriesProfile([0.5, 0, 0.2]),
+    )
+    # small random shaping decaying with mode number, keeping surfaces nested
+    rng = np.random.default_rng(seed)
+    for name in ("R", "Z"):
+        basis = getattr(eq, name + "_basis")
+        decay = np.exp(-np.abs(basis.modes[:, 1:]).sum(axis=1))
+        lmn = getattr(eq, name + "_lmn")
+        setattr(eq, name + "_lmn", lmn + 1e-2 * decay * rng.standard_normal(lmn.size))
+    return eq
+
+
+def synthetic_vmec(mpol, ntor, nfp, lasym, ns=51, seed=0):
+    """Return an object with the ``wout`` and ``s_half_grid`` used by vmec_to_csv."""
+    rng = np.random.default_rng(seed)
+    xm = np.concatenate(
+        [np.zeros(ntor + 1)] + [np.full(2 * ntor + 1, m) for m in range(1, mpol)]
+    )
+    xn = nfp * np.concatenate(
+        [np.arange(ntor + 1)] + [np.arange(-ntor, ntor + 1)] * (mpol - 1)
+    )
+    s = np.linspace(0, 1, ns)
+    # coefficients scale like rho^m towards the axis
+    radial = np.sqrt(s)[None, :] ** xm[:, None]
+    decay = np.exp(-xm - np.abs(xn) / nfp)[:, None]
+
+    def spectrum(base):
+        return base[:, None] + 1e-2 * decay * radial * rng.standard_normal((xm.size, 1))
+
+    rmnc = spectrum(np.where((xm == 0) & (xn == 0), 10.0, 0.0) + (xm == 1) * (xn == 0))
+    zmns = spectrum((xm == 1) * (xn == 0) * 1.0)
+    rmns = spectrum(np.zeros(xm.size)) if lasym else np.zeros_like(rmnc)
+    zmnc = spectrum(np.zeros(xm.size)) if lasym else np.zeros_like(zmns)
+    wout = SimpleNamespace(
+        version_=9.0,
+        mpol=mpol,
+        ntor=ntor,
+        nfp=nfp,
+        lasym=lasym,
+        xm=xm,
+        xn=xn,
+        rmnc=rmnc,
+        zmns=zmns,
+        rmns=rmns,
+        zmnc=zmnc,
+        phi=s,
+        iotas=np.concatenate([[0], 0.5 + 0.2 * (s[1:] - 0.5 / (ns - 1))]),
+        pres=np.concatenate([[0], 1e4 * (1 - (s[1:] - 0.5 / (ns - 1)))]),
+        am=np.array([1e4, -1e4]),
+        ai=np.array([0.5, 0.2]),
+        ac=np.array([0.0, 1e3]),
+        DMerc=rng.standard_normal(ns),
+        aspect=10.0,
+        Aminor_p=1.0,
+        Rmajor_p=10.0,
+        volume=2 * np.pi**2 * 10.0,
+        volavgB=1.0,
+        betatotal=0.01,
+        ctor=0.0,
+    )
+    return SimpleNamespace(wout=wout, s_half_grid=s[1:] - 0.5 / (ns - 1))
+
+
+def _desc_case(case):
+    from stelladb.artifacts import ArtifactBundle
+    from stelladb.db_desc import (
+        _create_zip,
+        _desc_rows,
+        _generate_desc_plots,
+        desc_to_csv,
+    )
+    from stelladb.metrics import boundary_spectra, compute_family_metrics
+    from stelladb.reader import desc_header
+    from stelladb.writers import _append_rows_to_csv
+
+    record = _Stages()
+    res, nfp, sym = case["resolution"], case["NFP"], case["sym"]
+    eq = record("build", synthetic_equilibrium, res, res, res, nfp, sym)
+
+    record("desc_to_csv_cold", desc_to_csv, eq, name="bench", cache=False)
+    record("desc_to_csv_warm", desc_to_csv, eq, name="bench", cache=False)
+    record("desc_to_csv_store", desc_to_csv, eq, name="bench")
+    record("desc_to_csv_cached", desc_to_csv, eq, name="bench")
+
+    # breakdown of a warm desc_to_csv call
+    header = record("header", desc_header, eq)
+    metrics = record("metrics", compute_family_metrics, [eq])[0]
+    record("boundary_spectrum", boundary_spectra, [eq])
+    rows = record("rows", _desc_rows, header, metrics, "bench.h5", "bench")
+    record("write_csv", _append_rows_to_csv, "desc_runs.csv", [rows[0]])
+
+    record("save_h5", eq.save, "bench.h5")
+    record("create_zip", _create_zip, "bench.h5", None, False, "bench.zip")
+    if case["plots"]:
+        with ArtifactBundle() as bundle:
+            record("generate_plots", _generate_desc_plots, eq, "bench", "bench", bundle)
+    return record.stages
+
+
+def _vmec_case(case):
+    from stelladb.db_vmec import _compute_vmec_metrics, vmec_to_csv
+
+    record = _Stages()
+    res, nfp, sym = case["resolution"], case["NFP"], case["sym"]
+    vmec = record("build", synthetic_vmec, res + 1, res, nfp, not sym)
+    record("vmec_to_csv", vmec_to_csv, vmec, name="bench", cache=False)
+    record("vmec_to_csv_store", vmec_to_csv, vmec, name="bench")
+    record("vmec_to_csv_cached", vmec_to_csv, vmec, name="bench")
+    record("metrics", _compute_vmec_metrics, vmec.wout, vmec.s_half_grid)
+    return record.stages
+
+
+def _run_case(case):
+    """Run one benchmark case in the current (fresh) process."""
+    sys.path.insert(0, REPO)
+    with tempfile.TemporaryDirectory() as tmp:
+        # keep the user's metrics cache and working directory untouched
+        os.environ["STELLADB_CACHE_DIR"] = os.path.join(tmp, "cache")
+        os.chdir(tmp)
+        t = time.perf_counter()
+        try:
+            run = _desc_case if case["pipeline"] == "desc" else _vmec_case
+            stages = run(case)
+            error = None
+        except Exception as e:
+            stages, error = {}, f"{type(e).__name__}: {e}"
+        return {
+            **case,
+            "total_time": time.perf_counter() - t,
+            "peak_rss_mb": _peak_rss_mb(),
+            "stages": stages,
+            "error": error,
+        }
+
+
+def _metadata():
+    versions = {}
+    for module in ("numpy", "scipy", "jax", "desc", "simsopt"):
+        try:
+            versions[module] = __import__(module).__version__
+        except Exception:
+            versions[module] = None
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "HEAD"], cwd=REPO, capture_output=True, text=True
+        ).stdout.strip()
+    except OSError:
+        commit = None
+    return {
+        "date": datetime.now().isoformat(timespec="seconds"),
+        "commit": commit or None,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "versions": versions,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--pipelines", nargs="+", default=["desc", "vmec"])
+    parser.add_argument(
+        "--resolutions", nargs="+", type=int, default=[4, 8, 12, 16, 24]
+    )
+    parser.add_argument("--nfp", nargs="+", type=int, default=[1, 3, 5])
+    parser.add_argument(
+        "--sym", choices=["sym", "asym", "both"], default="both", help="symmetry"
+    )
+    parser.add_argument("--no-plots", action="store_true", help="skip plotting")
+    parser.add_argument(
+        "--quick", action="store_true", help="small sweep for a smoke test"
+    )
+    parser.add_argument("--output", default="benchmark_results.json")
+    args = parser.parse_args(argv)
+
+    if args.quick:
+        args.resolutions, args.nfp = [4, 8], [1, 3]
+    syms = {"sym": [True], "asym": [False], "both": [True, False]}[args.sym]
+    cases = [
+        {
+            "pipeline": pipeline,
+            "resolution": res,
+            "NFP": nfp,
+            "sym": sym,
+            "plots": not args.no_plots,
+        }
+        for pipeline in args.pipelines
+        for res in args.resolutions
+        for nfp in args.nfp
+        for sym in syms
+    ]
+
+    results = []
+    context = multiprocessing.get_context("spawn")
+    for i, case in enumerate(cases):
+        # a new process per case, so compilation and peak memory are per case
+        with ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+            result = executor.submit(_run_case, case).result()
+        results.append(result)
+        summary = result["error"] or ", ".join(
+            f"{name} {stage['time']:.3g}s" for name, stage in result["stages"].items()
+        )
+        print(
+            f"[{i + 1}/{len(cases)}] {case['pipeline']} res={case['resolution']} "
+            f"NFP={case['NFP']} sym={case['sym']}: {result['total_time']:.3g}s, "
+            f"peak {result['peak_rss_mb']:.0f} MB\n    {summary}"
+        )
+
+    with open(args.output, "w") as f:
+        json.dump({"metadata": _metadata(), "results": results}, f, indent=1)
+    print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -4,3 +4,8 @@ from .db_desc import (
     generate_files_desc,
     upload_files_desc,
 )
+from .db_vmec import save_to_db_vmec
+from .ledger import UploadLedger
+from .catalog import Catalog
+from .batch import desc_to_csv_many, vmec_to_csv_many
+from .sync import sync_desc_directory, watch_desc_directory
@@ -0,0 +1,268 @@
+"""Zip archives of upload files, compressed in parallel threads."""
+
+import functools
+import io
+import os
+import shutil
+import sys
+import time
+import zipfile
+import zlib
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+# compression methods of the archives, by name
+COMPRESSIONS = {
+    "stored": zipfile.ZIP_STORED,
+    "deflate": zipfile.ZIP_DEFLATED,
+    "bzip2": zipfile.ZIP_BZIP2,
+    "lzma": zipfile.ZIP_LZMA,
+}
+if hasattr(zipfile, "ZIP_ZSTANDARD"):
+    # Python 3.14 and later
+    COMPRESSIONS["zstd"] = zipfile.ZIP_ZSTANDARD
+
+_CHUNK_SIZE = 4 * 2**20
+# deflate window, carried over between chunks so they compress as one stream
+_WINDOW = 2**15
+# versions whose zipfile internals the parallel compression was tested with
+_TESTED_PYTHONS = ((3, 10), (3, 11), (3, 12), (3, 13))
+
+
+class _Precompressed:
+    """Compressor of a zip member whose data was compressed in other threads.
+
+    Takes the place of the compressor of a member opened for writing, so the
+    archive still computes the CRC and sizes of the raw data written and
+    writes the headers. Each write outputs the compressed data set in
+    ``data`` before it, and closing the member outputs ``tail``.
+    """
+
+    def __init__(self, tail=b""):
+        self.data = b""
+        self._tail = tail
+
+    def compress(self, data):
+        out, self.data = self.data, b""
+        return out
+
+    def flush(self):
+        return self._tail
+
+
+def _deflate_chunk(data, history, level):
+    """Return ``data`` deflated as a part of a stream following ``history``.
+
+    The output ends on a byte boundary without closing the stream, so the
+    parts of consecutive chunks concatenate to one deflate stream.
+    """
+    if history:
+        compressor = zlib.compressobj(
+            level, zlib.DEFLATED, -15, 9, zlib.Z_DEFAULT_STRATEGY, history
+        )
+    else:
+        compressor = zlib.compressobj(level, zlib.DEFLATED, -15)
+    return compressor.compress(data) + compressor.flush(zlib.Z_SYNC_FLUSH)
+
+
+def _compress_member(f, compress_type, level, chunk_size):
+    """Return the contents of the file ``f`` compressed as a zip member."""
+    f.seek(0)
+    compressor = zipfile._get_compressor(compress_type, level)
+    out = io.BytesIO()
+    for chunk in iter(lambda: f.read(chunk_size), b""):
+        out.write(compressor.compress(chunk))
+    out.write(compressor.flush())
+    return out.getvalue()
+
+
+def _chunks(f, chunk_size):
+    """Yield the contents of the file ``f`` in chunks, from its start."""
+    f.seek(0)
+    return iter(lambda: f.read(chunk_size), b"")
+
+
+def _deflated_chunks(f, level, chunk_size, executor, ahead):
+    """Yield the chunks of ``f`` with their data deflated in ``executor``.
+
+    Up to ``ahead`` chunks are compressed ahead of the one yielded. Every
+    chunk is compressed with the last 32 KB of the previous ones as history,
+    so the ratio is that of compressing the file as a whole.
+    """
+    pending = deque()
+    history = b""
+    for chunk in _chunks(f, chunk_size):
+        future = executor.submit(_deflate_chunk, chunk, history, level)
+        pending.append((chunk, future))
+        history = (history + chunk)[-_WINDOW:]
+        if len(pending) > ahead:
+            chunk, future = pending.popleft()
+            yield chunk, future.result()
+    for chunk, future in pending:
+        yield chunk, future.result()
+
+
+@functools.lru_cache(maxsize=None)
+def _can_precompress():
+    """Return whether members compressed in other threads can be written.
+
+    They are written by replacing the compressor of a member opened for
+    writing and with ``zipfile._get_compressor``, neither of which is
+    documented by ``zipfile``. This is only done on the Python versions in
+    ``_TESTED_PYTHONS`` and after a small archive written this way with every
+    compression method was read back, its CRCs and sizes checked. Otherwise
+    the members are compressed one after the other by ``zipfile``.
+    """
+    if sys.version_info[:2] not in _TESTED_PYTHONS:
+        return False
+    data = b"stelladb " * 1000
+    try:
+        for compress_type in COMPRESSIONS.values():
+            buffer = io.BytesIO()
+            files = {"probe": (data, io.BytesIO(data), True)}
+            # several chunks, so that deflate concatenates streams
+            _write_parallel(buffer, files, compress_type, None, 2, 2**10)
+            with zipfile.ZipFile(buffer) as zipf:
+                info = zipf.getinfo("probe")
+                if (
+                    zipf.testzip() is not None
+                    or zipf.read("probe") != data
+                    or info.compress_type != compress_type
+                    or info.file_size != len(data)
+                ):
+                    return False
+    except Exception:
+        # any change of the internals of zipfile
+        return False
+    return True
+
+
+def _member_file(source):
+    """Return a binary file of the contents of a member and whether to close it."""
+    if isinstance(source, (bytes, bytearray)):
+        return io.BytesIO(source), True
+    if isinstance(source, (str, os.PathLike)):
+        return open(source, "rb"), True
+    return source, False
+
+
+def write_zip(
+    out,
+    members,
+    compression="deflate",
+    compresslevel=None,
+    workers=None,
+    chunk_size=_CHUNK_SIZE,
+):
+    """Write files to a zip archive, compressing them in parallel threads.
+
+    With ``"deflate"`` every member is split into chunks that are compressed
+    in parallel, each with the end of the previous chunk as history, and
+    concatenated to one deflate stream, like ``pigz`` does. The archive can
+    be read by any zip tool. The other methods compress every member as a
+    whole, the members in parallel. On Python versions whose ``zipfile``
+    internals this was not tested with, the members are compressed one after
+    the other by ``zipfile`` at the same method and level.
+
+    Parameters
+    ----------
+    out : str or file object
+        Path or binary file object to write the archive to.
+    members : dict
+        Contents of every member by its name in the archive: a path, bytes or
+        a seekable binary file object, which is read from its start.
+    compression : {"deflate", "stored", "bzip2", "lzma", "zstd"}, optional
+        Compression method (default ``"deflate"``). ``"zstd"`` needs Python
+        3.14 or later.
+    compresslevel : int, optional
+        Level of the compression method, 0-9 for deflate (default 6) and 1-9
+        for bzip2 (default 9), ignored by lzma.
+    workers : int, optional
+        Number of compression threads. Defaults to the number of CPUs.
+    chunk_size : int, optional
+        Size in bytes of the chunks compressed by one thread (default 4 MB).
+    """
+    if compression not in COMPRESSIONS:
+        raise ValueError(
+            f"compression must be one of {tuple(COMPRESSIONS)}, got {compression!r}"
+        )
+    compress_type = COMPRESSIONS[compression]
+    # the source of every member, kept for the modification time of paths,
+    # with its open file and whether to close it
+    files = {name: (source, *_member_file(source)) for name, source in members.items()}
+    try:
+        if _can_precompress():
+            _write_parallel(
+                out, files, compress_type, compresslevel, workers, chunk_size
+            )
+        else:
+            _write_serial(out, files, compress_type, compresslevel, chunk_size)
+    finally:
+        for _, f, owned in files.values():
+            if owned:
+                f.close()
+
+
+def _member_info(name, source, f, compress_type):
+    """Return the ZipInfo of a member, with the size of ``f`` read to its end."""
+    if isinstance(source, (str, os.PathLike)):
+        info = zipfile.ZipInfo.from_file(source, name)
+    else:
+        info = zipfile.ZipInfo(name, time.localtime()[:6])
+    info.compress_type = compress_type
+    info.file_size = f.seek(0, os.SEEK_END)
+    return info
+
+
+def _write_serial(out, files, compress_type, compresslevel, chunk_size):
+    """Write the archive of ``write_zip`` with ``ZipFile.open``, in this thread."""
+    with zipfile.ZipFile(out, "w", compress_type, compresslevel=compresslevel) as zipf:
+        for name, (source, f, _) in files.items():
+            info = _member_info(name, source, f, compress_type)
+            # not taken from the archive for a ZipInfo given to open
+            info._compresslevel = compresslevel
+            f.seek(0)
+            with zipf.open(info, "w") as member:
+                shutil.copyfileobj(f, member, chunk_size)
+
+
+def _write_parallel(out, files, compress_type, compresslevel, workers, chunk_size):
+    """Write the archive of ``write_zip``, compressing in parallel threads."""
+    level = -1 if compresslevel is None else compresslevel
+    workers = workers or os.cpu_count() or 1
+    # every file is read by one thread at a time, sizes are taken beforehand
+    infos = {
+        name: _member_info(name, source, f, compress_type)
+        for name, (source, f, _) in files.items()
+    }
+    executor = ThreadPoolExecutor(max_workers=workers)
+    try:
+        whole = {}
+        if compress_type not in (zipfile.ZIP_STORED, zipfile.ZIP_DEFLATED):
+            for name, (_, f, _) in files.items():
+                whole[name] = executor.submit(
+                    _compress_member, f, compress_type, compresslevel, chunk_size
+                )
+        with zipfile.ZipFile(out, "w", compress_type) as zipf:
+            for name, (_, f, _) in files.items():
+                info = infos[name]
+                # the raw data is still written, for the CRC and size of the member
+                with zipf.open(info, "w") as member:
+                    if compress_type == zipfile.ZIP_DEFLATED:
+                        # the stream is closed by an empty final block
+                        compressor = _Precompressed(tail=b"\x03\x00")
+                        member._compressor = compressor
+                        chunks = _deflated_chunks(
+                            f, level, chunk_size, executor, workers
+                        )
+                        for chunk, compressor.data in chunks:
+                            member.write(chunk)
+                    else:
+                        if name in whole:
+                            # waited for first, so that only this thread reads f
+                            compressed = whole[name].result()
+                            member._compressor = _Precompressed(tail=compressed)
+                        for chunk in _chunks(f, chunk_size):
+                            member.write(chunk)
+    finally:
+        executor.shutdown(cancel_futures=True)
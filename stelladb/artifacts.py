@@ -0,0 +1,127 @@
+"""In-memory bundles of the files prepared for an upload."""
+
+import os
+import shutil
+import tempfile
+from contextlib import contextmanager
+
+
+def _in_workspace(workspace, name):
+    """Return the path of the file ``name`` in ``workspace``, creating it if needed.
+
+    Without a workspace the path is relative to the working directory.
+    """
+    if workspace is None:
+        return name
+    os.makedirs(workspace, exist_ok=True)
+    return os.path.join(workspace, name)
+
+
+class ArtifactBundle:
+    """Named files kept in memory, spilling to temporary files when large.
+
+    Each file is a ``SpooledTemporaryFile``, held in memory up to ``max_size``
+    bytes and moved to ``directory`` beyond that, so preparing an upload
+    neither writes to nor deletes from the working directory. Used as a
+    context manager, the files are released on exit.
+
+    Parameters
+    ----------
+    max_size : int, optional
+        Size in bytes up to which a file is kept in memory (default 64 MB).
+    directory : str, optional
+        Workspace of the job the files belong to, where large files spill to
+        and ``materialize`` writes. Defaults to the temporary directory of the
+        system.
+    """
+
+    def __init__(self, max_size=64 * 2**20, directory=None):
+        self.max_size = max_size
+        self.directory = directory
+        self._files = {}
+
+    def open(self, name):
+        """Return a new binary file object stored under ``name``, replacing any old one.
+
+        The file stays open and belongs to the bundle, callers write to it
+        without closing it.
+        """
+        if name in self._files:
+            self._files.pop(name).close()
+        self._files[name] = tempfile.SpooledTemporaryFile(
+            max_size=self.max_size, dir=self.directory
+        )
+        return self._files[name]
+
+    def add(self, name, data):
+        """Store ``data``, str or bytes, under ``name``."""
+        if isinstance(data, str):
+            data = data.encode()
+        self.open(name).write(data)
+
+    def add_file(self, name, path):
+        """Store a copy of the file at ``path`` under ``name``."""
+        with open(path, "rb") as f:
+            shutil.copyfileobj(f, self.open(name))
+
+    def read(self, name):
+        """Return the contents of the file ``name`` as bytes."""
+        f = self._files[name]
+        f.seek(0)
+        return f.read()
+
+    def __contains__(self, name):
+        return name in self._files
+
+    def __iter__(self):
+        return iter(self._files)
+
+    def write_to(self, folder):
+        """Write all files into ``folder``, creating it if needed.
+
+        Returns
+        -------
+        paths : dict of str
+            Path of every written file, by name.
+        """
+        os.makedirs(folder, exist_ok=True)
+        paths = {}
+        for name, f in self._files.items():
+            f.seek(0)
+            paths[name] = os.path.join(folder, name)
+            with open(paths[name], "wb") as out:
+                shutil.copyfileobj(f, out)
+        return paths
+
+    @contextmanager
+    def materialize(self):
+        """Write the files to a temporary directory for as long as the context lasts.
+
+        For consumers that need paths, such as the file inputs of the upload
+        form. The directory is a new one inside ``directory``, never the
+        working directory, so concurrent jobs sharing a workspace do not see
+        each other's files. It is removed on exit.
+
+        Yields
+        ------
+        paths : dict of str
+            Path of every file, by name.
+        """
+        if self.directory is not None:
+            os.makedirs(self.directory, exist_ok=True)
+        with tempfile.TemporaryDirectory(
+            prefix="stelladb_", dir=self.directory
+        ) as folder:
+            yield self.write_to(folder)
+
+    def close(self):
+        """Release all files."""
+        for f in self._files.values():
+            f.close()
+        self._files.clear()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,269 @@
+"""Parallel conversion of many DESC and VMEC output files to database CSV rows."""
+
+import os
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+from .artifacts import _in_workspace
+from .cache import cache_dir
+from .catalog import _catalog_rows
+from .writers import _append_rows_to_csv
+
+# environment variables limiting the threads of one worker process
+_THREAD_VARIABLES = (
+    "OMP_NUM_THREADS",
+    "MKL_NUM_THREADS",
+    "OPENBLAS_NUM_THREADS",
+)
+
+
+def _find_files(paths, match):
+    """Return the files in ``paths`` accepted by ``match``, see ``find_desc_files``."""
+    if isinstance(paths, (str, os.PathLike)):
+        paths = [paths]
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            found = []
+            for root, dirs, names in os.walk(path):
+                dirs.sort()
+                found += [os.path.join(root, n) for n in names if match(n)]
+            files += sorted(found)
+        else:
+            files.append(path)
+    return list(dict.fromkeys(os.fspath(f) for f in files))
+
+
+def find_desc_files(paths):
+    """Return the ``.h5`` files in ``paths``, searching directories recursively.
+
+    Parameters
+    ----------
+    paths : str or list of str
+        Files and directories to search.
+
+    Returns
+    -------
+    files : list of str
+        Files in the order of ``paths``, the files found in each directory in
+        sorted order, without duplicates.
+    """
+    return _find_files(paths, lambda name: name.endswith(".h5"))
+
+
+def find_wout_files(paths):
+    """Return the ``wout*.nc`` files in ``paths``, see ``find_desc_files``."""
+    return _find_files(
+        paths, lambda name: name.startswith("wout") and name.endswith(".nc")
+    )
+
+
+def _worker_env(threads):
+    """Return the environment of a worker process running ``threads`` threads."""
+    env = {name: str(threads) for name in _THREAD_VARIABLES}
+    flags = os.environ.get("XLA_FLAGS", "")
+    if threads == 1 and "xla_cpu_multi_thread_eigen" not in flags:
+        flags += " --xla_cpu_multi_thread_eigen=false"
+    env["XLA_FLAGS"] = flags.strip()
+    # loading kernels from the compilation cache logs a spurious CPU feature error
+    env["TF_CPP_MIN_LOG_LEVEL"] = os.environ.get("TF_CPP_MIN_LOG_LEVEL", "3")
+    return env
+
+
+def _init_worker(env, jax_cache=False):
+    """Set up a worker process, before it runs any file.
+
+    ``env`` is set in the environment of the worker only, see ``_worker_env``.
+    With ``jax_cache``, compiled kernels are shared between workers through
+    the JAX compilation cache.
+    """
+    os.environ.update(env)
+    if jax_cache:
+        import jax
+
+        jax.config.update("jax_compilation_cache_dir", os.path.join(cache_dir(), "jax"))
+
+
+def _rows_of_file(path, kwargs):
+    """Compute the rows of one DESC file, returning the error instead of raising."""
+    from .db_desc import _desc_csv_rows
+
+    kwargs = dict(kwargs)
+    kwargs.setdefault("name", os.path.splitext(os.path.basename(path))[0])
+    try:
+        return _desc_csv_rows(path, **kwargs)[:2], None
+    except Exception as e:
+        return None, f"{type(e).__name__}: {e}"
+
+
+def _rows_of_wout(path, kwargs):
+    """Compute the rows of one wout file, returning the error instead of raising."""
+    from .db_vmec import _vmec_csv_rows
+
+    kwargs = dict(kwargs)
+    name = os.path.splitext(os.path.basename(path))[0]
+    kwargs.setdefault("name", name[5:] if name.startswith("wout_") else name)
+    try:
+        runs, configuration = _vmec_csv_rows(path, **kwargs)
+        return ([runs], [configuration]), None
+    except Exception as e:
+        return None, f"{type(e).__name__}: {e}"
+
+
+def _map_files(rows_of, files, kwargs, workers, jax_cache, verbose):
+    """Run ``rows_of`` on every file in a pool of spawned worker processes."""
+    cpus = os.cpu_count() or 1
+    workers = min(workers or cpus, len(files))
+    threads = max(1, cpus // workers)
+
+    if verbose:
+        print(f"Processing {len(files)} files with {workers} workers...")
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=_init_worker,
+        initargs=(_worker_env(threads), jax_cache),
+    ) as executor:
+        futures = [executor.submit(rows_of, f, kwargs) for f in files]
+        results = []
+        for i, future in enumerate(futures):
+            results.append(future.result())
+            if verbose:
+                print(f"[{i + 1}/{len(files)}] {files[i]}")
+    return results
+
+
+def _write_results(files, results, runs_table, arrays, workspace, catalog, verbose):
+    """Append the rows of all files in input order and return the failures."""
+    run_rows = []
+    config_rows = []
+    failed = {}
+    for path, (rows, error) in zip(files, results):
+        if error is not None:
+            failed[path] = error
+            if verbose:
+                print(f"Failed to convert {path}: {error}")
+            continue
+        run_rows += rows[0]
+        config_rows += rows[1]
+
+    if run_rows:
+        _append_rows_to_csv(
+            _in_workspace(workspace, runs_table + ".csv"), run_rows, arrays
+        )
+        _append_rows_to_csv(
+            _in_workspace(workspace, "configurations.csv"), config_rows, arrays
+        )
+        _catalog_rows(catalog, runs_table, run_rows, config_rows)
+    return failed
+
+
+def desc_to_csv_many(
+    paths,
+    workers=None,
+    verbose=1,
+    arrays="csv",
+    workspace=None,
+    catalog=True,
+    **kwargs,
+):
+    """Save many DESC equilibria to the database CSV files in parallel.
+
+    The metrics of every file are computed in a pool of worker processes. Each
+    worker keeps DESC, JAX and its compiled metrics kernels loaded between
+    files, and compiled kernels are shared between workers through the JAX
+    compilation cache. The rows are then written in the order of the files to
+    ``desc_runs.csv`` and ``configurations.csv`` in ``workspace``, one
+    ``configurations`` row per run.
+
+    Parameters
+    ----------
+    paths : str or list of str
+        ``.h5`` files, or directories that are searched recursively for them.
+    workers : int, optional
+        Number of worker processes. Defaults to the number of CPUs. Every
+        worker is limited to ``cpu_count // workers`` threads, so that the
+        workers do not compete for cores.
+    verbose : int, optional
+        If 1 (default), print progress and failures.
+    arrays : {"csv", "npz", "parquet"}, optional
+        Where the array fields are written, see ``desc_to_csv``.
+    workspace : str, optional
+        Directory to write the files to, created if needed. Defaults to the
+        current working directory.
+    catalog : bool or str or Catalog, optional
+        Catalog to also add the rows to, see ``desc_to_csv`` (default True).
+    **kwargs
+        Passed to ``desc_to_csv`` for every file, e.g. ``provenance``,
+        ``description``, ``deviceid``, ``fidelity`` or ``family``. ``name``
+        defaults to the file name without extension.
+
+    Returns
+    -------
+    failed : dict of str
+        Error message of every file that could not be converted, by path. The
+        rows of the other files are written regardless.
+    """
+    files = find_desc_files(paths)
+    if not files:
+        if verbose:
+            print("No .h5 files found.")
+        return {}
+    results = _map_files(_rows_of_file, files, kwargs, workers, True, verbose)
+    return _write_results(
+        files, results, "desc_runs", arrays, workspace, catalog, verbose
+    )
+
+
+def vmec_to_csv_many(
+    paths,
+    workers=None,
+    verbose=1,
+    arrays="csv",
+    workspace=None,
+    catalog=True,
+    **kwargs,
+):
+    """Save many VMEC equilibria to the database CSV files in parallel.
+
+    The wout files are read and their profiles, Mercier extrema and boundary
+    excursions computed in a pool of worker processes. The rows are then
+    written in the order of the files to ``vmec_runs.csv`` and
+    ``configurations.csv`` in ``workspace``.
+
+    Parameters
+    ----------
+    paths : str or list of str
+        ``wout*.nc`` files, or directories that are searched recursively for
+        them.
+    workers : int, optional
+        Number of worker processes. Defaults to the number of CPUs.
+    verbose : int, optional
+        If 1 (default), print progress and failures.
+    arrays : {"csv", "npz", "parquet"}, optional
+        Where the array fields are written, see ``vmec_to_csv``.
+    workspace : str, optional
+        Directory to write the files to, created if needed. Defaults to the
+        current working directory.
+    catalog : bool or str or Catalog, optional
+        Catalog to also add the rows to, see ``vmec_to_csv`` (default True).
+    **kwargs
+        Passed to ``vmec_to_csv`` for every file, e.g. ``current``,
+        ``provenance`` or ``description``. ``name`` defaults to the file name
+        without the ``wout_`` prefix and extension.
+
+    Returns
+    -------
+    failed : dict of str
+        Error message of every file that could not be converted, by path. The
+        rows of the other files are written regardless.
+    """
+    files = find_wout_files(paths)
+    if not files:
+        if verbose:
+            print("No wout files found.")
+        return {}
+    results = _map_files(_rows_of_wout, files, kwargs, workers, False, verbose)
+    return _write_results(
+        files, results, "vmec_runs", arrays, workspace, catalog, verbose
+    )
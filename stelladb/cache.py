@@ -0,0 +1,212 @@
+"""Persistent on-disk cache of computed metrics, keyed by equilibrium content."""
+
+import contextlib
+import hashlib
+import os
+import tempfile
+
+import numpy as np
+
+# bump whenever the definition of a cached metric changes, to invalidate old entries
+_METRICS_VERSION = 3
+
+_DEFAULT_MAX_BYTES = 256 * 1024**2
+
+# profile attributes of an Equilibrium whose type changes the computed metrics
+_DESC_PROFILES = (
+    "pressure",
+    "iota",
+    "current",
+    "electron_temperature",
+    "electron_density",
+    "ion_temperature",
+    "atomic_number",
+    "anisotropy",
+)
+
+
+def cache_dir():
+    """Return the directory holding the local stelladb caches.
+
+    Defaults to ``~/.cache/stelladb`` and can be changed with the
+    ``STELLADB_CACHE_DIR`` environment variable.
+    """
+    return os.environ.get(
+        "STELLADB_CACHE_DIR",
+        os.path.join(os.path.expanduser("~"), ".cache", "stelladb"),
+    )
+
+
+def hash_content(*items):
+    """Return a hex digest of a sequence of arrays, strings and numbers."""
+    digest = hashlib.sha256()
+    for item in items:
+        if isinstance(item, np.ndarray) or hasattr(item, "__array__"):
+            arr = np.ascontiguousarray(item)
+            digest.update(f"{arr.dtype.str}{arr.shape}".encode())
+            digest.update(arr.tobytes())
+        else:
+            digest.update(repr(item).encode())
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+def _desc_content(header):
+    """Return the resolution, spectral coefficients and profiles of a header."""
+    resolution = (
+        header["L"],
+        header["M"],
+        header["N"],
+        header["L_grid"],
+        header["M_grid"],
+        header["N_grid"],
+        header["NFP"],
+        header["sym"],
+        header["spectral_indexing"],
+        header["Psi"],
+    )
+    profiles = []
+    for name in _DESC_PROFILES:
+        profile = header["profiles"][name]
+        if profile is None:
+            profiles += [name, None]
+        else:
+            kind, params, knots, method = profile
+            profiles += [name, kind, np.asarray(params, dtype=float), method]
+            if knots is not None:
+                profiles.append(np.asarray(knots, dtype=float))
+    coefficients = [
+        np.asarray(header[name], dtype=float) for name in ("R_lmn", "Z_lmn", "L_lmn")
+    ]
+    return [resolution, *coefficients, *profiles]
+
+
+def desc_metrics_key(header, version, fidelity="standard"):
+    """Return the cache key of the metrics of a DESC equilibrium.
+
+    The key covers the spectral coefficients, the profile types and
+    parameters, the resolution, the DESC version that produced the file and
+    the fidelity level the metrics are evaluated at. ``header`` is the dict
+    returned by ``reader.desc_header`` or ``reader.DescFile.headers``, so a
+    saved file hashes to the same key whether or not it was loaded.
+    """
+    return hash_content(
+        "desc", _METRICS_VERSION, str(version), fidelity, *_desc_content(header)
+    )
+
+
+def desc_content_key(header):
+    """Return a digest of only the content of a DESC equilibrium.
+
+    Covers the spectral coefficients, profiles and resolution, like
+    ``desc_metrics_key``, but not the DESC version, the fidelity or
+    ``_METRICS_VERSION``, so it does not change when the cache is invalidated.
+    """
+    return hash_content("desc", *_desc_content(header))
+
+
+def vmec_metrics_key(wout):
+    """Return the cache key of the metrics of a VMEC wout."""
+    arrays = [wout.phi, wout.iotas, wout.pres, wout.ac, wout.DMerc, wout.xm, wout.xn]
+    arrays += [wout.rmnc[:, -1], wout.zmns[:, -1]]
+    if wout.lasym:
+        arrays += [wout.rmns[:, -1], wout.zmnc[:, -1]]
+    return hash_content(
+        "vmec", _METRICS_VERSION, float(wout.version_), *map(np.asarray, arrays)
+    )
+
+
+def vmec_content_key(wout):
+    """Return a digest of only the content of a VMEC wout.
+
+    Covers the Fourier coefficients of all surfaces, the profiles and the
+    resolution, but not the VMEC version or ``_METRICS_VERSION``.
+    """
+    arrays = [wout.xm, wout.xn, wout.phi, wout.iotas, wout.pres, wout.ac]
+    arrays += [wout.rmnc, wout.zmns]
+    if wout.lasym:
+        arrays += [wout.rmns, wout.zmnc]
+    return hash_content("vmec", int(wout.nfp), *map(np.asarray, arrays))
+
+
+def _metrics_path(key):
+    return os.path.join(cache_dir(), "metrics", f"{key}.npz")
+
+
+def load_metrics(key):
+    """Return the cached metrics stored under ``key``, or None on a miss."""
+    path = _metrics_path(key)
+    try:
+        with np.load(path, allow_pickle=False) as f:
+            metrics = {name: f[name] for name in f.files}
+    except (OSError, ValueError):
+        return None
+    # mark as recently used, eviction removes the least recently used entries;
+    # another process may have evicted the entry since it was read
+    with contextlib.suppress(OSError):
+        os.utime(path)
+    return metrics
+
+
+def store_metrics(key, metrics, max_bytes=None):
+    """Store ``metrics`` under ``key`` and evict old entries above ``max_bytes``.
+
+    Parameters
+    ----------
+    key : str
+        Cache key, as returned by ``desc_metrics_key`` or ``vmec_metrics_key``.
+    metrics : dict of array_like
+        Computed scalar and array fields to store.
+    max_bytes : int, optional
+        Size limit of the metrics cache. Defaults to the
+        ``STELLADB_CACHE_MAX_BYTES`` environment variable, or 256 MB.
+    """
+    if max_bytes is None:
+        max_bytes = int(os.environ.get("STELLADB_CACHE_MAX_BYTES", _DEFAULT_MAX_BYTES))
+    path = _metrics_path(key)
+    directory = os.path.dirname(path)
+    try:
+        os.makedirs(directory, exist_ok=True)
+        # write to a temporary file first so concurrent readers never see
+        # a partially written entry
+        fd, tmp = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            np.savez(f, **{name: np.asarray(val) for name, val in metrics.items()})
+        os.replace(tmp, path)
+        _evict(directory, max_bytes)
+    except OSError as e:
+        print(f"Could not write metrics cache {path}: {e}")
+
+
+def _evict(directory, max_bytes):
+    """Remove least recently used entries until the cache fits in max_bytes."""
+    entries = []
+    for entry in os.scandir(directory):
+        if entry.name.endswith(".npz"):
+            try:
+                st = entry.stat()
+            except FileNotFoundError:
+                # removed by another process
+                continue
+            entries.append((st.st_mtime, st.st_size, entry.path))
+    total = sum(size for _, size, _ in entries)
+    for _, size, path in sorted(entries):
+        if total <= max_bytes:
+            break
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        total -= size
+
+
+def cached_metrics(key, compute, enabled=True):
+    """Return the metrics under ``key``, calling ``compute()`` on a miss."""
+    if enabled:
+        metrics = load_metrics(key)
+        if metrics is not None:
+            return metrics
+    metrics = compute()
+    if enabled:
+        store_metrics(key, metrics)
+    return metrics
@@ -0,0 +1,290 @@
+"""Local SQLite catalog of the generated database rows, for fast filtering."""
+
+import os
+import sqlite3
+import threading
+from datetime import date
+
+import numpy as np
+
+from .cache import cache_dir, hash_content
+from .schema import TABLES
+
+_RUNS_TABLES = ("desc_runs", "vmec_runs")
+
+_SQL_TYPES = {
+    "str": "TEXT",
+    "int": "INTEGER",
+    "float": "REAL",
+    "bool": "INTEGER",
+    "date": "TEXT",
+    "int[]": "BLOB",
+    "float[]": "BLOB",
+}
+
+# columns filtered on most, the iota range being given by iota_min and iota_max
+_INDEXED = {
+    "configurations": (
+        "name",
+        "NFP",
+        "classification",
+        "aspect_ratio",
+        "date_created",
+    ),
+    "desc_runs": ("config_id", "iota_min", "iota_max", "date_created"),
+    "vmec_runs": ("config_id", "iota_min", "iota_max", "date_created"),
+}
+
+
+def catalog_path():
+    """Return the path of the default catalog, ``catalog.sqlite`` in ``cache_dir()``."""
+    return os.path.join(cache_dir(), "catalog.sqlite")
+
+
+def _to_sql(column, value):
+    """Convert a field of a row to the value stored in its typed column.
+
+    Arrays are stored as the bytes of their int64 or float64 values. A value
+    that does not convert to the type of its column, like a device id given
+    by name, is stored as text, which SQLite accepts in any column.
+    """
+    if value is None:
+        return None
+    try:
+        if column.type.endswith("[]"):
+            dtype = np.int64 if column.type == "int[]" else np.float64
+            return np.ascontiguousarray(np.ravel(value), dtype=dtype).tobytes()
+        if column.type in ("int", "bool"):
+            return int(value)
+        if column.type == "float":
+            return float(value)
+    except (TypeError, ValueError):
+        pass
+    return str(value)
+
+
+def _from_sql(column, value):
+    """Convert a stored value back to the field of a row, see ``_to_sql``."""
+    if value is None:
+        return None
+    if isinstance(value, str) and column.type != "date":
+        return value
+    if column.type.endswith("[]"):
+        dtype = np.int64 if column.type == "int[]" else np.float64
+        return np.frombuffer(value, dtype=dtype)
+    if column.type == "bool":
+        return bool(value)
+    if column.type == "date":
+        try:
+            return date.fromisoformat(value)
+        except ValueError:
+            return value
+    return value
+
+
+def _row_hash(row):
+    """Return a digest of all fields of a row, so repeated rows are stored once."""
+    return hash_content(*(item for key in sorted(row) for item in (key, row[key])))
+
+
+class Catalog:
+    """SQLite mirror of the ``desc_runs``, ``vmec_runs`` and ``configurations`` rows.
+
+    Every table has the typed columns of its schema in ``schema.TABLES``, an
+    ``id`` and a digest of the row, so a row generated again is not stored
+    twice. Runs refer to the row of their configuration through ``config_id``.
+    The configuration name, NFP, classification, aspect ratio and date and
+    the iota range and date of the runs are indexed, so filtering many runs
+    with ``search`` is a single indexed query. The database can be shared by
+    several threads and processes. Used as a context manager, the connection
+    is closed on exit.
+
+    Parameters
+    ----------
+    path : str, optional
+        Database file, created if it does not exist. Defaults to
+        ``catalog_path()``.
+    """
+
+    def __init__(self, path=None):
+        self.path = catalog_path() if path is None else path
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(
+            self.path, timeout=30, check_same_thread=False
+        )
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        with self._lock, self._connection:
+            for table in ("configurations",) + _RUNS_TABLES:
+                self._create_table(table)
+
+    def _create_table(self, table):
+        """Create ``table`` and its indexes, adding columns new to its schema."""
+        columns = ["id INTEGER PRIMARY KEY", "row_hash TEXT UNIQUE NOT NULL"]
+        if table in _RUNS_TABLES:
+            columns.append("config_id INTEGER REFERENCES configurations(id)")
+        columns += [
+            f'"{name}" {_SQL_TYPES[column.type]}'
+            for name, column in TABLES[table].items()
+        ]
+        self._connection.execute(
+            f"CREATE TABLE IF NOT EXISTS {table} ({', '.join(columns)})"
+        )
+        existing = {
+            row[1] for row in self._connection.execute(f"PRAGMA table_info({table})")
+        }
+        for name, column in TABLES[table].items():
+            if name not in existing:
+                self._connection.execute(
+                    f'ALTER TABLE {table} ADD COLUMN "{name}" {_SQL_TYPES[column.type]}'
+                )
+        for name in _INDEXED[table]:
+            self._connection.execute(
+                f'CREATE INDEX IF NOT EXISTS "{table}_{name}" ON {table} ("{name}")'
+            )
+
+    def _insert(self, table, row, config_id=None):
+        """Insert ``row`` unless it is already stored and return its id."""
+        schema = TABLES[table]
+        names = [name for name in schema if name in row]
+        values = [_to_sql(schema[name], row[name]) for name in names]
+        key = _row_hash({name: row[name] for name in names})
+        if table in _RUNS_TABLES:
+            names.append("config_id")
+            values.append(config_id)
+        columns = ", ".join(["row_hash"] + [f'"{name}"' for name in names])
+        self._connection.execute(
+            f"INSERT OR IGNORE INTO {table} ({columns}) "
+            f"VALUES ({', '.join('?' * (len(names) + 1))})",
+            [key] + values,
+        )
+        return self._connection.execute(
+            f"SELECT id FROM {table} WHERE row_hash = ?", (key,)
+        ).fetchone()[0]
+
+    def add(self, runs_table, run_rows, config_rows):
+        """Add runs together with their configurations, in one transaction.
+
+        Parameters
+        ----------
+        runs_table : {"desc_runs", "vmec_runs"}
+            Table of the runs.
+        run_rows : list of dict
+            Rows of the runs, as written by ``desc_to_csv`` or ``vmec_to_csv``.
+            Fields that are not columns of the table are not stored.
+        config_rows : list of dict
+            Row of the configuration of every run. Configurations that are
+            already stored are referred to, not stored again.
+        """
+        if runs_table not in _RUNS_TABLES:
+            raise ValueError(f"runs_table must be one of {_RUNS_TABLES}")
+        with self._lock, self._connection:
+            for run, config in zip(run_rows, config_rows):
+                config_id = self._insert("configurations", config)
+                self._insert(runs_table, run, config_id)
+
+    def search(self, runs_table="desc_runs", **filters):
+        """Return the runs matching all filters, with the fields of their configuration.
+
+        Parameters
+        ----------
+        runs_table : {"desc_runs", "vmec_runs"}, optional
+            Table of the runs to search (default ``"desc_runs"``).
+        **filters
+            Conditions on columns of the runs or, for the others, of the
+            configurations, e.g. ``NFP=3``, ``classification="QA"``,
+            ``aspect_ratio=(None, 8)`` or ``iota_min=(0.4, None)``. A value
+            selects equal values, a tuple ``(low, high)`` the values in that
+            range, a bound that is None being open.
+
+        Returns
+        -------
+        rows : list of dict
+            Matching runs in the order they were added. Every row holds the
+            fields of the configuration, those the run has replacing the ones of
+            the same name, and the ``run_id`` and ``config_id`` of the entries.
+        """
+        if runs_table not in _RUNS_TABLES:
+            raise ValueError(f"runs_table must be one of {_RUNS_TABLES}")
+        runs, configs = TABLES[runs_table], TABLES["configurations"]
+        conditions = []
+        params = []
+        for name, value in filters.items():
+            if name in runs:
+                column, ref = runs[name], f'r."{name}"'
+            elif name in configs:
+                column, ref = configs[name], f'c."{name}"'
+            else:
+                raise ValueError(f"{runs_table} and configurations have no {name!r}")
+            if isinstance(value, tuple):
+                low, high = value
+                if low is not None:
+                    conditions.append(f"{ref} >= ?")
+                    params.append(_to_sql(column, low))
+                if high is not None:
+                    conditions.append(f"{ref} <= ?")
+                    params.append(_to_sql(column, high))
+            else:
+                conditions.append(f"{ref} = ?")
+                params.append(_to_sql(column, value))
+
+        selected = [f'c."{name}"' for name in configs]
+        selected += [f'r."{name}"' for name in runs] + ["r.id", "r.config_id"]
+        query = (
+            f"SELECT {', '.join(selected)} FROM {runs_table} r "
+            "JOIN configurations c ON r.config_id = c.id"
+        )
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        with self._lock:
+            result = self._connection.execute(query + " ORDER BY r.id", params)
+            rows = result.fetchall()
+
+        found = []
+        columns = list(configs.values()) + list(runs.values())
+        names = list(configs) + list(runs)
+        for values in rows:
+            row = {}
+            for name, column, value in zip(names, columns, values):
+                value = _from_sql(column, value)
+                if value is not None or name not in row:
+                    row[name] = value
+            row["run_id"], row["config_id"] = values[-2:]
+            found.append(row)
+        return found
+
+    def __len__(self):
+        """Number of stored runs of both codes."""
+        with self._lock:
+            return sum(
+                self._connection.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+                for table in _RUNS_TABLES
+            )
+
+    def close(self):
+        self._connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def _catalog_rows(catalog, runs_table, run_rows, config_rows):
+    """Add rows to the catalog given by a ``catalog`` argument.
+
+    ``catalog`` is True for the default catalog, a path, a Catalog, or False
+    or None to not use one. The catalog only mirrors the rows, so failing to
+    write it is reported without raising.
+    """
+    if catalog is None or catalog is False:
+        return
+    try:
+        if isinstance(catalog, Catalog):
+            catalog.add(runs_table, run_rows, config_rows)
+            return
+        with Catalog(None if catalog is True else catalog) as opened:
+            opened.add(runs_table, run_rows, config_rows)
+    except (sqlite3.Error, OSError, TypeError, ValueError) as e:
+        print(f"Could not write to the catalog: {e}")
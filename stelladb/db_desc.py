@@ -1,12 +1,15 @@
 import os
 import shutil
+import tempfile
+import threading
 import numpy as np
-import csv
 import zipfile
 import time
 import warnings
 from datetime import date
 
+import h5py
+
 from selenium import webdriver
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support import expected_conditions as EC
@@ -15,31 +18,45 @@ from selenium.common.exceptions import TimeoutException
 
 from desc.equilibrium import Equilibrium, EquilibriaFamily
 from desc.grid import LinearGrid
-from desc.vmec_utils import ptolemy_identity_rev, zernike_to_fourier
-from desc.io.hdf5_io import hdf5Reader
 from desc.io import load
 from desc.profiles import *
 
 from .getters import (
-    get_driver,
+    UploadFormError,
+    check_upload_files,
     get_driver_for_download,
     get_file_in_directory,
-    perform_login,
+    open_upload_page,
+    submit_upload_form,
 )
-from .device import device_or_concept_to_csv
+from .archive import write_zip
+from .artifacts import ArtifactBundle, _in_workspace
+from .device import _device_row
+from .cache import desc_content_key, desc_metrics_key, load_metrics, store_metrics
+from .catalog import _catalog_rows
+from .geometry import truncate_spectrum
+from .ledger import FAILED, UPLOADED, _already_uploaded, _open_ledger, upload_key
+from .metrics import compute_family_metrics
+from .reader import DescFile, desc_header
+from .writers import _append_rows_to_csv, rows_to_csv
 from .urls import HOME_PAGE
 
 # ---------------------------------------------------------------------------
 # Private File/Data Preparation Helpers
 # ---------------------------------------------------------------------------
 
+# pyplot keeps global state, so jobs in concurrent threads plot one at a time
+_PYPLOT_LOCK = threading.Lock()
+
+# size up to which an in-memory equilibrium is serialized in memory
+_H5_BUFFER_SIZE = 64 * 2**20
 
-def _load_equilibrium(eq, config_name):
-    """Resolve eq to an Equilibrium (or str path) and return (eq, filename)."""
-    if os.path.exists(f"{config_name}_auto_save.h5"):
-        print(f"Removing {config_name}_auto_save.h5")
-        os.remove(f"{config_name}_auto_save.h5")
 
+def _load_equilibrium(eq, config_name, family=False):
+    """Resolve eq to an Equilibrium (or str path) and return (eq, filename).
+
+    EquilibriaFamily objects are reduced to their last step unless ``family``.
+    """
     if isinstance(eq, str):
         if os.path.exists(eq + ".h5"):
             return eq + ".h5", eq
@@ -47,15 +64,34 @@ def _load_equilibrium(eq, config_name):
     elif isinstance(eq, Equilibrium):
         return eq, config_name
     elif isinstance(eq, EquilibriaFamily):
-        return eq[-1], config_name
+        return (eq if family else eq[-1]), config_name
     raise TypeError(
         "Expected type str, Equilibrium or EquilibriumFamily "
         + f"for eq, got type {type(eq)}"
     )
 
 
-def _prepare_input_file(eq, filename, inputfilename, inputfile):
-    """Find or auto-generate the DESC input file."""
+def _equilibrium_file(eq, filename, workspace=None):
+    """Return the name in the archive and the contents of the .h5 file of eq.
+
+    A saved equilibrium is given by its path. An in-memory one is serialized
+    once, into a spooled temporary file kept in memory up to
+    ``_H5_BUFFER_SIZE`` and in ``workspace`` beyond, which the caller closes.
+    """
+    if isinstance(eq, str):
+        return os.path.basename(eq), eq
+    print("Saving equilibrium to .h5 file...")
+    buffer = tempfile.SpooledTemporaryFile(max_size=_H5_BUFFER_SIZE, dir=workspace)
+    with h5py.File(buffer, "w") as f:
+        eq.save(f)
+    return f"{os.path.basename(filename)}_auto_save.h5", buffer
+
+
+def _prepare_input_file(h5_name, h5_file, filename, inputfilename, inputfile, scratch):
+    """Find or auto-generate (into ``scratch``) the DESC input file.
+
+    ``h5_name`` and ``h5_file`` are as returned by ``_equilibrium_file``.
+    """
     auto_input = False
     if inputfilename is None and inputfile:
         if os.path.exists(filename + "_input.txt"):
@@ -66,59 +102,75 @@ def _prepare_input_file(eq, filename, inputfilename, inputfile):
         else:
             from desc.input_reader import InputReader
 
-            inputfilename = "auto_generated_" + filename + "_input.txt"
+            inputfilename = os.path.join(
+                scratch, f"auto_generated_{os.path.basename(filename)}_input.txt"
+            )
             auto_input = True
             print("Auto-generating input file...")
-            writer = InputReader()
-            if isinstance(eq, str):
-                writer.desc_output_to_input(inputfilename, eq)
-            else:
-                eq.save(f"{filename}_auto_save.h5")
-                writer.desc_output_to_input(inputfilename, f"{filename}_auto_save.h5")
+            header = None
+            if not isinstance(h5_file, str):
+                # DESC only reads an equilibrium from a path
+                path = os.path.join(scratch, h5_name)
+                h5_file.seek(0)
+                with open(path, "wb") as f:
+                    shutil.copyfileobj(h5_file, f)
+                h5_file = path
+                header = (
+                    f"# DESC input file generated from the output file:\n# {h5_name}"
+                )
+            InputReader().desc_output_to_input(inputfilename, h5_file, header=header)
     elif inputfilename is not None and os.path.exists(inputfilename) and not inputfile:
         inputfile = True
     return inputfilename, auto_input, inputfile
 
 
-def _create_zip(eq, filename, inputfilename, inputfile):
-    """Zip the equilibrium .h5 file and optional input file."""
+def _create_zip(
+    h5_file,
+    inputfilename,
+    inputfile,
+    out,
+    compression="deflate",
+    compresslevel=None,
+    h5_name=None,
+):
+    """Zip the equilibrium .h5 file and optional input file into ``out``.
+
+    ``h5_file`` is a path or a binary file object, stored as ``h5_name``, by
+    default its base name. ``out`` is a path or a binary file object. The files
+    are compressed in parallel threads, see ``archive.write_zip``.
+    """
     print("Zipping files...")
-    zip_filename = filename + ".zip"
-    with zipfile.ZipFile(zip_filename, "w") as zipf:
-        if os.path.exists(filename + ".h5"):
-            zipf.write(filename + ".h5")
-        else:
-            print("Saving equilibrium to .h5 file...")
-            auto_save_name = f"{filename}_auto_save.h5"
-            if not os.path.exists(auto_save_name):
-                eq.save(auto_save_name)
-            zipf.write(auto_save_name)
-        if inputfilename is not None and inputfile and os.path.exists(inputfilename):
-            zipf.write(inputfilename)
-    return zip_filename
-
-
-def _generate_desc_plots(eq, filename, config_name):
-    """Generate and save surface, Boozer, and 3D plots."""
+    members = {h5_name or os.path.basename(h5_file): h5_file}
+    if inputfilename is not None and inputfile and os.path.exists(inputfilename):
+        members[os.path.basename(inputfilename)] = inputfilename
+    write_zip(out, members, compression, compresslevel)
+
+
+def _generate_desc_plots(eq, filename, config_name, bundle):
+    """Generate surface, Boozer, and 3D plots into an ArtifactBundle."""
     from desc.plotting import plot_surfaces, plot_boozer_surface, plot_3d
     import matplotlib.pyplot as plt
     import plotly.graph_objects as go
 
     if isinstance(eq, str):
         eq = load(eq)
-        if isinstance(eq, EquilibriaFamily):
-            eq = eq[-1]
+    elif isinstance(eq, DescFile):
+        eq = eq.load()
+    if isinstance(eq, EquilibriaFamily):
+        eq = eq[-1]
 
     print("Plotting/saving surface, Boozer and 3D plots...")
     surface_filename = filename + "_surface.webp"
     boozer_filename = filename + "_boozer.webp"
     d3_filename = filename + "_3d.html"
 
-    plot_surfaces(eq=eq, label=config_name)
-    plt.savefig(surface_filename, dpi=90)
-    plot_boozer_surface(eq)
-    plt.savefig(boozer_filename, dpi=90)
-    plt.close()
+    with _PYPLOT_LOCK:
+        fig, _ = plot_surfaces(eq=eq, label=config_name)
+        fig.savefig(bundle.open(surface_filename), dpi=90, format="webp")
+        plt.close(fig)
+        fig, _ = plot_boozer_surface(eq)
+        fig.savefig(bundle.open(boozer_filename), dpi=90, format="webp")
+        plt.close(fig)
 
     fig = go.Figure()
     grid3d = LinearGrid(
@@ -136,37 +188,13 @@ def _generate_desc_plots(eq, filename, config_name):
         margin=dict(l=0, r=0, t=0, b=0),
         paper_bgcolor="rgb(0, 0, 0)",
     )
-    fig.write_html(
-        d3_filename,
+    html = fig.to_html(
         include_plotlyjs=False,
         full_html=False,
         div_id="plot3d",
         config={"responsive": True},
     )
-
-
-def _append_to_csv(filename, data):
-    """Append a dict as one row to a CSV file, writing the header if new."""
-    file_exists = os.path.isfile(filename)
-    fieldnames = sorted(data.keys())
-    try:
-        with open(filename, "a", newline="") as csvfile:
-            writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
-            if not file_exists:
-                writer.writeheader()
-            writer.writerow(data)
-    except OSError as e:
-        print(f"I/O error writing to {filename}: {e}")
-
-
-def _clean_stale_csvs(verbose=True):
-    """Removes standard CSVs if they already exist in the directory."""
-    files_to_check = ["desc_runs.csv", "configurations.csv", "devices_and_concepts.csv"]
-    for f in files_to_check:
-        if os.path.exists(f):
-            os.remove(f)
-            if verbose:
-                print(f"Previous {f} has been deleted.")
+    bundle.add(d3_filename, html)
 
 
 def _prepare_all_artifacts(
@@ -182,179 +210,173 @@ def _prepare_all_artifacts(
     initialization_method,
     deviceDescription,
     uploadPlots,
+    family=False,
+    workspace=None,
+    catalog=True,
+    compression="deflate",
+    compresslevel=None,
 ):
-    """Handles all local file generation, zipping, and plotting before upload or storage."""
-    eq, filename = _load_equilibrium(eq, config_name)
-    inputfilename, auto_input, inputfile = _prepare_input_file(
-        eq, filename, inputfilename, inputfile
-    )
-    _create_zip(eq, filename, inputfilename, inputfile)
-
-    _clean_stale_csvs()
+    """Generate all files of an upload (zip, CSVs and plots) in an ArtifactBundle.
+
+    Nothing is written to the working directory. Intermediate files and large
+    artifacts go to a directory of their own inside ``workspace``, the
+    temporary directory of the system by default. The files are named as in an
+    upload folder: ``{name}.zip``, ``desc_runs.csv``, ``configurations.csv``,
+    ``devices_and_concepts.csv``, ``auto_generated_{name}_input.txt`` and
+    ``{name}_surface.webp``, ``{name}_boozer.webp``, ``{name}_3d.html``, where
+    ``name`` is the base name of the returned ``filename``. The rows are also
+    added to ``catalog``, see ``desc_to_csv``.
+    """
+    eq, filename = _load_equilibrium(eq, config_name, family)
+    name = os.path.basename(filename)
+    bundle = ArtifactBundle(directory=workspace)
+    # scratch space for the files DESC can only write to a path
+    if workspace is not None:
+        os.makedirs(workspace, exist_ok=True)
+    with tempfile.TemporaryDirectory(prefix="stelladb_", dir=workspace) as scratch:
+        h5_name, h5_file = _equilibrium_file(eq, filename, workspace)
+        try:
+            inputfilename, auto_input, inputfile = _prepare_input_file(
+                h5_name, h5_file, filename, inputfilename, inputfile, scratch
+            )
+            _create_zip(
+                h5_file,
+                inputfilename,
+                inputfile,
+                bundle.open(f"{name}.zip"),
+                compression,
+                compresslevel,
+                h5_name,
+            )
+        finally:
+            if not isinstance(h5_file, str):
+                h5_file.close()
+        if auto_input:
+            bundle.add_file(os.path.basename(inputfilename), inputfilename)
+            inputfilename = os.path.basename(inputfilename)
 
-    print("Creating desc_runs.csv and configurations.csv...")
-    desc_to_csv(
-        eq,
-        name=config_name,
-        provenance=provenance,
-        description=description,
-        inputfilename=inputfilename,
-        deviceid=deviceid,
-        config_class=config_class,
-        initialization_method=initialization_method,
-    )
+    # open a saved equilibrium once and share it between the CSV and plot stages
+    source = DescFile(eq) if isinstance(eq, str) else eq
+    try:
+        print("Creating desc_runs.csv and configurations.csv...")
+        run_rows, config_rows, _ = _desc_csv_rows(
+            source,
+            name=config_name,
+            provenance=provenance,
+            description=description,
+            inputfilename=inputfilename,
+            deviceid=deviceid,
+            config_class=config_class,
+            initialization_method=initialization_method,
+            family=family,
+        )
+        bundle.add("desc_runs.csv", rows_to_csv(run_rows))
+        bundle.add("configurations.csv", rows_to_csv(config_rows))
+        _catalog_rows(catalog, "desc_runs", run_rows, config_rows)
 
-    if isDeviceNew:
-        print("Creating devices_and_concepts.csv...")
-        device_or_concept_to_csv(name=config_name, description=deviceDescription)
+        if isDeviceNew:
+            print("Creating devices_and_concepts.csv...")
+            device = _device_row(name=config_name, description=deviceDescription)
+            bundle.add("devices_and_concepts.csv", rows_to_csv([device]))
 
-    if uploadPlots:
-        _generate_desc_plots(eq, filename, config_name)
+        if uploadPlots:
+            _generate_desc_plots(source, name, config_name, bundle)
+    except BaseException:
+        bundle.close()
+        raise
+    finally:
+        if isinstance(source, DescFile):
+            source.close()
 
-    return filename, auto_input
+    return filename, bundle
 
 
-def _upload_desc_files(driver, filename, isDeviceNew, uploadPlots):
-    """Fill the upload form with all prepared files and return the server response."""
+def _desc_upload_key(eq, family, metadata):
+    """Return the ledger key of uploading ``eq`` with ``metadata``.
 
-    def send(element_id, filepath):
-        WebDriverWait(driver, 10).until(
-            EC.presence_of_element_located((By.ID, element_id))
-        ).send_keys(os.path.abspath(filepath))
+    The content of the equilibria is hashed from the headers of a saved file
+    without building the Equilibrium, see ``cache.desc_content_key``. Neither
+    the DESC version, recorded by a file but not by a loaded Equilibrium, nor
+    the version of the metrics cache are part of the key.
+    """
+    eq, _ = _load_equilibrium(eq, None, family)
+    if isinstance(eq, str):
+        with DescFile(eq) as source:
+            headers = source.headers(family)
+            if any(header is None for header in headers):
+                headers = [desc_header(eq) for eq in source.members(family)]
+    else:
+        headers = [desc_header(eq) for eq in _family_members(eq, family)]
+    return upload_key([desc_content_key(h) for h in headers], metadata)
 
-    send("zipToUpload", f"{filename}.zip")
-    send("descToUpload", "desc_runs.csv")
-    send("configToUpload", "configurations.csv")
 
+def _desc_upload_files(paths, filename, isDeviceNew, uploadPlots):
+    """Return the paths of the files to upload, keyed by the id of their form input."""
+    name = os.path.basename(filename)
+    files = {
+        "zipToUpload": paths[f"{name}.zip"],
+        "descToUpload": paths["desc_runs.csv"],
+        "configToUpload": paths["configurations.csv"],
+    }
     if uploadPlots:
-        send("surfaceToUpload", f"{filename}_surface.webp")
-        send("boozerToUpload", f"{filename}_boozer.webp")
-        send("plot3dToUpload", f"{filename}_3d.html")
-
+        files["surfaceToUpload"] = paths[f"{name}_surface.webp"]
+        files["boozerToUpload"] = paths[f"{name}_boozer.webp"]
+        files["plot3dToUpload"] = paths[f"{name}_3d.html"]
     if isDeviceNew:
-        send("deviceToUpload", "devices_and_concepts.csv")
-
-    WebDriverWait(driver, 10).until(
-        EC.presence_of_element_located((By.ID, "confirmDesc"))
-    ).click()
-    WebDriverWait(driver, 30).until(
-        lambda d: d.find_elements(By.CSS_SELECTOR, ".success-div, .error-div")
-    )
-    return driver.find_element(By.CSS_SELECTOR, ".success-div, .error-div").text
+        files["deviceToUpload"] = paths["devices_and_concepts.csv"]
+    return files
 
 
-def _cleanup_local_files(filename, auto_input, uploadPlots, keep_artifacts):
-    """Handles deletion of locally generated files if `keep_artifacts` is False."""
-    if os.path.exists(f"{filename}_auto_save.h5"):
-        os.remove(f"{filename}_auto_save.h5")
-
-    if not keep_artifacts:
-        if os.path.exists(f"{filename}.zip"):
-            os.remove(f"{filename}.zip")
-
-        _clean_stale_csvs(verbose=False)
-
-        if auto_input:
-            auto_input_file = f"auto_generated_{filename}_input.txt"
-            if os.path.exists(auto_input_file):
-                os.remove(auto_input_file)
-
-        if uploadPlots:
-            for f in [
-                f"{filename}_surface.webp",
-                f"{filename}_boozer.webp",
-                f"{filename}_3d.html",
-            ]:
-                if os.path.exists(f):
-                    os.remove(f)
+def _error_estimates(metrics):
+    """Return the estimated absolute error of every metric that has one."""
+    return {
+        key: float(metrics[f"{key}_error"])
+        for key in sorted(metrics)
+        if f"{key}_error" in metrics
+    }
 
 
-def _format_array(arr, sig=2):
-    """Format an array of floats as a comma-separated string in scientific notation."""
-    return ", ".join(f"{v:.{sig}e}" for v in arr)
+def _print_error_estimates(name, metrics, errors):
+    """Print the value and estimated absolute error of every scalar metric."""
+    print(f"Metrics of {name} (value, estimated absolute error):")
+    for key, error in errors.items():
+        if np.ndim(metrics[key]) == 0:
+            print(f"  {key}: {float(metrics[key]):.4g} +/- {error:.1g}")
 
 
-# ---------------------------------------------------------------------------
-# Public API
-# ---------------------------------------------------------------------------
+def _family_members(eq, family=False):
+    """Return the equilibria of eq, the last step of a family unless ``family``."""
+    if type(eq).__name__ == "EquilibriaFamily":
+        eqs = list(eq) if family else [eq[-1]]
+    else:
+        eqs = [eq]
+    if any(type(eq).__name__ != "Equilibrium" for eq in eqs):
+        raise TypeError(
+            f"Expected str, Equilibrium or EquilibriaFamily for eq, got {type(eq)}"
+        )
+    return eqs
 
 
-def desc_to_csv(
-    eq,
+def _desc_rows(
+    header,
+    metrics,
+    outputfile,
+    version,
     name=None,
     provenance=None,
     description=None,
     inputfilename=None,
     initialization_method="surface",
+    spectrum_threshold=None,
     **kwargs,
 ):
-    """Save DESC equilibrium data to CSV files for database upload.
-
-    Computes scalar metrics, profile arrays, surface geometry, and stability
-    quantities from the equilibrium and writes them to ``desc_runs.csv`` and
-    ``configurations.csv`` in the current working directory.
-
-    Parameters
-    ----------
-    eq : str or Equilibrium or EquilibriaFamily
-        DESC equilibrium to save. If str, treated as a path to an ``.h5`` file
-        (without extension). If EquilibriaFamily, the last element is used.
-    name : str, optional
-        Configuration name stored in the ``configurations`` table.
-    provenance : str, optional
-        Free-text provenance note (e.g. paper reference or run description).
-    description : str, optional
-        Free-text description of the equilibrium.
-    inputfilename : str, optional
-        Path to the DESC input file used to produce this equilibrium.
-    initialization_method : str, optional
-        Method used to initialize the equilibrium (default ``"surface"``).
-    **kwargs
-        Extra fields passed directly into the CSV rows, e.g. ``deviceid``,
-        ``config_class``, ``publicationid``, ``date_created``.
-    """
-    descruns = {"outputfile": f"{name}_auto_save.h5"}
-
-    if isinstance(eq, str) and os.path.exists(eq):
-        descruns["outputfile"] = os.path.basename(eq)
-        reader = hdf5Reader(eq)
-        version = reader.read_dict().get("__version__", "unknown")
-        eq = load(eq)
-    else:
-        import desc
-
-        version = desc.__version__
-
-    if type(eq).__name__ == "EquilibriaFamily":
-        eq = eq[-1]
-
-    if type(eq).__name__ != "Equilibrium":
-        raise TypeError(
-            f"Expected str, Equilibrium or EquilibriaFamily for eq, got {type(eq)}"
-        )
-
-    nfp = eq.NFP
-    rho = np.linspace(0, 1.0, 10, endpoint=True)
-    rho[0] = 1e-12
-    rho_grid = LinearGrid(rho=rho, M=eq.M_grid, N=eq.N_grid, NFP=nfp)
-
-    eq_data = eq.compute(
-        [
-            "R0/a",
-            "a",
-            "R0",
-            "V",
-            "<|B|>_vol",
-            "<beta>_vol",
-            "R",
-            "Z",
-            "a_major/a_minor",
-            "|F|_normalized",
-        ]
-    )
-    data_rho = eq.compute(["current", "iota"], grid=rho_grid)
-    p_iota = rho_grid.compress(data_rho["iota"])
-    p_curr = rho_grid.compress(data_rho["current"])
+    """Build the desc_runs and configurations rows of one equilibrium header."""
+    descruns = {"outputfile": outputfile}
+    nfp = header["NFP"]
+    p_pres = metrics["pressure"]
+    p_iota = metrics["iota"]
+    p_curr = metrics["current"]
+    d_merc = metrics["D_Mercier"]
 
     today = kwargs.get("date_created", date.today())
 
@@ -365,73 +387,62 @@ def desc_to_csv(
             "version": version,
             "inputfilename": inputfilename,
             "initialization_method": initialization_method,
-            "l_rad": int(eq.L),
-            "l_grid": int(eq.L_grid),
-            "m_pol": int(eq.M),
-            "m_grid": int(eq.M_grid),
-            "n_tor": int(eq.N),
-            "n_grid": int(eq.N_grid),
-            "profile_rho": _format_array(rho),
-            "pressure_profile": _format_array(eq.pressure(rho)),
-            "pressure_max": round(float(np.max(eq.pressure(rho))), 3),
-            "pressure_min": round(float(np.min(eq.pressure(rho))), 3),
-            "iota_profile": _format_array(p_iota),
-            "iota_max": round(float(np.max(np.abs(p_iota))), 3),
-            "iota_min": round(float(np.min(np.abs(p_iota))), 3),
-            "current_profile": _format_array(p_curr),
-            "spectral_indexing": eq.spectral_indexing,
-            "sym": bool(eq.sym),
+            "l_rad": int(header["L"]),
+            "l_grid": int(header["L_grid"]),
+            "m_pol": int(header["M"]),
+            "m_grid": int(header["M_grid"]),
+            "n_tor": int(header["N"]),
+            "n_grid": int(header["N_grid"]),
+            "profile_rho": metrics["profile_rho"],
+            "pressure_profile": p_pres,
+            "pressure_max": round(float(metrics["pressure_max"]), 3),
+            "pressure_min": round(float(metrics["pressure_min"]), 3),
+            "iota_profile": p_iota,
+            "iota_max": round(float(metrics["iota_max"]), 3),
+            "iota_min": round(float(metrics["iota_min"]), 3),
+            "current_profile": p_curr,
+            "spectral_indexing": header["spectral_indexing"],
+            "sym": header["sym"],
             "date_created": today,
             "publicationid": kwargs.get("publicationid"),
             "max_normalized_F_error": round(
-                float(np.max(np.abs(eq_data["|F|_normalized"]))), 3
+                float(metrics["max_normalized_F_error"]), 3
             ),
         }
     )
 
-    descruns["current_specification"] = "iota" if eq.iota else "net enclosed current"
-
-    rho_grid_mercier = LinearGrid(
-        rho=np.linspace(0.1, 1.0, 10, endpoint=True), M=0, N=0, NFP=nfp
+    descruns["current_specification"] = (
+        "iota" if header["profiles"]["iota"] is not None else "net enclosed current"
     )
-    d_merc = eq.compute("D_Mercier", grid=rho_grid_mercier)["D_Mercier"]
+
     descruns.update(
         {
             "D_Mercier_max": round(float(np.max(d_merc)), 3),
             "D_Mercier_min": round(float(np.min(d_merc)), 3),
-            "D_Mercier": _format_array(d_merc),
-            "vacuum": bool(
-                np.allclose(eq.pressure.params, 0)
-                and np.allclose(data_rho["current"], 0)
-            ),
+            "D_Mercier": d_merc,
+            "vacuum": bool(np.allclose(p_pres, 0) and np.allclose(p_curr, 0)),
         }
     )
 
     config = {
         "name": name,
         "NFP": int(nfp),
-        "stell_sym": bool(eq.sym),
+        "stell_sym": header["sym"],
         "deviceid": kwargs.get("deviceid"),
         "provenance": provenance,
         "description": description,
-        "toroidal_flux": round(float(eq.Psi), 3),
-        "aspect_ratio": round(float(eq_data["R0/a"]), 3),
-        "minor_radius": round(float(eq_data["a"]), 3),
-        "major_radius": round(float(eq_data["R0"]), 3),
-        "volume": round(float(eq_data["V"]), 3),
-        "volume_averaged_B": round(float(eq_data["<|B|>_vol"]), 3),
-        "volume_averaged_beta": round(float(eq_data["<beta>_vol"]), 3),
+        "toroidal_flux": round(float(header["Psi"]), 3),
+        "aspect_ratio": round(float(metrics["aspect_ratio"]), 3),
+        "minor_radius": round(float(metrics["minor_radius"]), 3),
+        "major_radius": round(float(metrics["major_radius"]), 3),
+        "volume": round(float(metrics["volume"]), 3),
+        "volume_averaged_B": round(float(metrics["volume_averaged_B"]), 3),
+        "volume_averaged_beta": round(float(metrics["volume_averaged_beta"]), 3),
         "total_toroidal_current": round(float(f"{np.max(np.abs(p_curr)):1.2e}"), 3),
-        "R_excursion": round(
-            float(f'{np.max(eq_data["R"]) - np.min(eq_data["R"]):1.4e}'), 3
-        ),
-        "Z_excursion": round(
-            float(f'{np.max(eq_data["Z"]) - np.min(eq_data["Z"]):1.4e}'), 3
-        ),
-        "average_elongation": round(
-            float(f'{np.mean(eq_data["a_major/a_minor"]):1.4e}'), 3
-        ),
-        "classification": "AS" if eq.N == 0 else kwargs.get("config_class"),
+        "R_excursion": round(float(f'{metrics["R_excursion"]:1.4e}'), 3),
+        "Z_excursion": round(float(f'{metrics["Z_excursion"]:1.4e}'), 3),
+        "average_elongation": round(float(f'{metrics["average_elongation"]:1.4e}'), 3),
+        "classification": "AS" if header["N"] == 0 else kwargs.get("config_class"),
         "current_specification": descruns.get("current_specification"),
         "pressure_profile": descruns["pressure_profile"],
         "iota_profile": descruns["iota_profile"],
@@ -439,38 +450,224 @@ def desc_to_csv(
         "date_created": today,
     }
 
-    def get_surface_geometry(lmn, basis):
-        val = np.ones_like(lmn)
-        val[basis.modes[:, 1] < 0] *= -1
-        m, n, x_mn = zernike_to_fourier(val * lmn, basis=basis, rho=np.array([1.0]))
-        return ptolemy_identity_rev(m, n, x_mn)
+    m, n = metrics["m"], metrics["n"]
+    spectrum = {key: metrics[key] for key in ("RBC", "RBS", "ZBS", "ZBC")}
+    if spectrum_threshold is not None:
+        m, n, spectrum, error = truncate_spectrum(m, n, spectrum, spectrum_threshold)
+        config["spectrum_truncation_error"] = float(f"{error:1.2e}")
+    config.update({"m": m, "n": n, **spectrum})
+    return descruns, config
 
-    xm, xn, s_R, c_R = get_surface_geometry(eq.R_lmn, eq.R_basis)
-    _, _, s_Z, c_Z = get_surface_geometry(eq.Z_lmn, eq.Z_basis)
 
-    config.update(
-        {
-            "m": xm,
-            "n": xn,
-            "RBC": _format_array(c_R[0, :], sig=3),
-            "RBS": (
-                np.zeros(c_R.shape[1]) if eq.sym else _format_array(s_R[0, :], sig=3)
-            ),
-            "ZBS": _format_array(s_Z[0, :], sig=3),
-            "ZBC": (
-                np.zeros(s_Z.shape[1]) if eq.sym else _format_array(c_Z[0, :], sig=3)
-            ),
-        }
-    )
+def _desc_csv_rows(
+    eq,
+    name=None,
+    provenance=None,
+    description=None,
+    inputfilename=None,
+    initialization_method="surface",
+    cache=True,
+    family=False,
+    fidelity="standard",
+    estimate_errors=False,
+    **kwargs,
+):
+    """Compute the desc_runs and configurations rows of ``eq``, see ``desc_to_csv``.
+
+    Returns the runs rows, the configurations row of every run and the
+    estimated errors of the metrics of every run, empty unless
+    ``estimate_errors``, all in the order of the runs.
+    """
+    outputfile = f"{name}_auto_save.h5"
+
+    source = None
+    if isinstance(eq, DescFile):
+        source = eq
+    elif isinstance(eq, str) and os.path.exists(eq):
+        source = DescFile(eq)
+
+    try:
+        if source is not None:
+            outputfile = os.path.basename(source.path)
+            version = source.version
+            headers = source.headers(family)
+            if any(header is None for header in headers):
+                headers = [desc_header(eq) for eq in source.members(family)]
+        else:
+            import desc
+
+            version = desc.__version__
+            eqs = _family_members(eq, family)
+            headers = [desc_header(eq) for eq in eqs]
+
+        keys = [desc_metrics_key(header, version, fidelity) for header in headers]
+        all_metrics = [load_metrics(key) if cache else None for key in keys]
+        if estimate_errors:
+            # metrics cached without their error estimates are computed again
+            all_metrics = [
+                m if m is not None and "volume_error" in m else None
+                for m in all_metrics
+            ]
+        missing = [i for i, metrics in enumerate(all_metrics) if metrics is None]
+        if missing:
+            # the Equilibrium is only built when some metrics have to be computed
+            if source is not None:
+                eqs = source.members(family)
+            computed = compute_family_metrics(
+                [eqs[i] for i in missing], fidelity, estimate_errors
+            )
+            for i, metrics in zip(missing, computed):
+                all_metrics[i] = metrics
+                if cache:
+                    store_metrics(keys[i], metrics)
+    finally:
+        if source is not None and source is not eq:
+            source.close()
+
+    run_rows = []
+    config_rows = []
+    errors = []
+    for header, metrics in zip(headers, all_metrics):
+        errors.append(_error_estimates(metrics) if estimate_errors else {})
+        if estimate_errors:
+            _print_error_estimates(name, metrics, errors[-1])
+        descruns, config = _desc_rows(
+            header,
+            metrics,
+            outputfile=outputfile,
+            version=version,
+            name=name,
+            provenance=provenance,
+            description=description,
+            inputfilename=inputfilename,
+            initialization_method=initialization_method,
+            **kwargs,
+        )
+        run_rows.append({k: v for k, v in descruns.items() if v is not None})
+        config_rows.append({k: v for k, v in config.items() if v is not None})
+    return run_rows, config_rows, errors
+
+
+# ---------------------------------------------------------------------------
+# Public API
+# ---------------------------------------------------------------------------
 
-    _append_to_csv(
-        "desc_runs.csv", {k: v for k, v in descruns.items() if v is not None}
+
+def desc_to_csv(
+    eq,
+    name=None,
+    provenance=None,
+    description=None,
+    inputfilename=None,
+    initialization_method="surface",
+    cache=True,
+    family=False,
+    fidelity="standard",
+    estimate_errors=False,
+    spectrum_threshold=None,
+    arrays="csv",
+    workspace=None,
+    catalog=True,
+    **kwargs,
+):
+    """Save DESC equilibrium data to CSV files for database upload.
+
+    Computes scalar metrics, profile arrays, surface geometry, and stability
+    quantities from the equilibrium and writes them to ``desc_runs.csv`` and
+    ``configurations.csv`` in ``workspace``.
+
+    Parameters
+    ----------
+    eq : str or Equilibrium or EquilibriaFamily
+        DESC equilibrium to save. If str, treated as a path to an ``.h5`` file
+        (without extension). If EquilibriaFamily, the last element is used
+        unless ``family=True``.
+    name : str, optional
+        Configuration name stored in the ``configurations`` table.
+    provenance : str, optional
+        Free-text provenance note (e.g. paper reference or run description).
+    description : str, optional
+        Free-text description of the equilibrium.
+    inputfilename : str, optional
+        Path to the DESC input file used to produce this equilibrium.
+    initialization_method : str, optional
+        Method used to initialize the equilibrium (default ``"surface"``).
+    cache : bool, optional
+        If True, reuse metrics previously computed for an equilibrium with the
+        same coefficients, profiles, resolution and DESC version from the local
+        cache in ``~/.cache/stelladb`` (default True).
+    family : bool, optional
+        If True and ``eq`` is an EquilibriaFamily, write one ``desc_runs`` row for
+        every step of the family instead of only the last one. Steps with the
+        same resolution are evaluated together in one batched pass. Every step
+        also gets its own ``configurations`` row, so the n-th new row of
+        ``configurations.csv`` belongs to the n-th new run (default False).
+    fidelity : {"preview", "standard", "full"}, optional
+        Accuracy of the computed metrics (default ``"standard"``). ``"preview"``
+        evaluates on grids coarsened by half with 5 profile samples, for cheap
+        triage of many equilibria. ``"full"`` samples the stored profiles and
+        D_Mercier at 30 instead of 10 radial points.
+    estimate_errors : bool, optional
+        If True, also evaluate the metrics on grids coarsened by half, print
+        the estimated absolute error of every scalar metric and return the
+        estimates (default False). This compiles a second metrics kernel, so
+        it roughly doubles the time of the first equilibrium of a resolution.
+    spectrum_threshold : float, optional
+        If given, only the boundary modes with a coefficient larger than this
+        fraction of the largest one are stored, e.g. 1e-6, and the sum of the
+        dropped coefficients is stored as ``spectrum_truncation_error``, an
+        upper bound of the resulting error of R and Z in meters. By default
+        all modes are stored.
+    arrays : {"csv", "npz", "parquet"}, optional
+        Where the array fields, i.e. the profiles, ``D_Mercier`` and the
+        boundary spectrum, are written. ``"csv"`` (default) writes them into
+        the CSV files as comma-separated strings in scientific notation.
+        ``"npz"`` and ``"parquet"`` write them exactly to the sidecar files
+        ``desc_runs_arrays.{npz,parquet}`` and
+        ``configurations_arrays.{npz,parquet}``, one row per CSV row, and only
+        the scalar fields to the CSV files. This is much faster to write and
+        read for large batches, and ``schema.check_csv`` reads the arrays
+        back from the sidecars. ``"parquet"`` needs ``pyarrow``.
+    workspace : str, optional
+        Directory to write the files to, created if needed. Defaults to the
+        current working directory. Jobs running at the same time should each
+        use their own.
+    catalog : bool or str or Catalog, optional
+        Catalog to also add the rows to, for later searches with
+        ``Catalog.search``. True (default) uses
+        ``~/.cache/stelladb/catalog.sqlite``, a str the database at that path,
+        False none.
+    **kwargs
+        Extra fields passed directly into the CSV rows, e.g. ``deviceid``,
+        ``config_class``, ``publicationid``, ``date_created``.
+
+    Returns
+    -------
+    errors : list of dict or None
+        If ``estimate_errors``, the estimated absolute error of every metric
+        of each run, by the key of the metric in ``compute_desc_metrics``, in
+        the order of the ``desc_runs`` rows. None otherwise.
+    """
+    run_rows, config_rows, errors = _desc_csv_rows(
+        eq,
+        name=name,
+        provenance=provenance,
+        description=description,
+        inputfilename=inputfilename,
+        initialization_method=initialization_method,
+        cache=cache,
+        family=family,
+        fidelity=fidelity,
+        estimate_errors=estimate_errors,
+        spectrum_threshold=spectrum_threshold,
+        **kwargs,
     )
-    _append_to_csv(
-        "configurations.csv",
-        {k: v for k, v in config.items() if v is not None},
+    _append_rows_to_csv(_in_workspace(workspace, "desc_runs.csv"), run_rows, arrays)
+    _append_rows_to_csv(
+        _in_workspace(workspace, "configurations.csv"), config_rows, arrays
     )
-    return None
+    _catalog_rows(catalog, "desc_runs", run_rows, config_rows)
+    return errors if estimate_errors else None
 
 
 def save_to_db_desc(
@@ -489,18 +686,34 @@ def save_to_db_desc(
     initialization_method="surface",
     deviceDescription=None,
     keep_artifacts=False,
+    family=False,
+    workspace=None,
+    ledger=True,
+    force=False,
+    catalog=True,
+    compression="deflate",
+    compresslevel=None,
 ):
     """Upload a DESC equilibrium to the stellarator database.
 
-    Prepares all required files (zip archive, CSV metadata, optional plots),
-    logs in to the website, and submits the upload form automatically.
-    Local files are cleaned up afterwards unless ``keep_artifacts=True``.
+    Prepares all required files (zip archive, CSV metadata, optional plots) in
+    memory, logs in to the website, and submits the upload form automatically.
+    The CSV files are checked against the table schemas before the browser is
+    started, raising a ``SchemaError`` if they do not match. Nothing is written
+    to the working directory unless ``keep_artifacts=True``, so several uploads
+    can run at the same time, in threads or processes.
+
+    Every upload is recorded in a local ledger, keyed by the content of the
+    equilibrium and the metadata of the upload. An equilibrium that was
+    already uploaded with the same metadata is skipped before any file is
+    prepared, unless ``force=True``.
 
     Parameters
     ----------
     eq : str or Equilibrium or EquilibriaFamily
         DESC equilibrium to upload. If str, treated as a path to an ``.h5``
-        file (without extension). If EquilibriaFamily, the last element is used.
+        file (without extension). If EquilibriaFamily, the last element is used
+        unless ``family=True``.
     config_name : str
         Name used for the configuration entry and to derive all output filenames.
     username : str
@@ -513,7 +726,7 @@ def save_to_db_desc(
         Free-text description stored with the run and configuration.
     provenance : str, optional
         Free-text provenance note (e.g. paper reference or run description).
-    deviceid : int, optional
+    deviceid : int or str, optional
         Database ID of the device this configuration belongs to.
     isDeviceNew : bool, optional
         If True, also create and upload a new device entry using ``config_name``
@@ -533,36 +746,112 @@ def save_to_db_desc(
     deviceDescription : str, optional
         Description for the new device entry. Only used when ``isDeviceNew=True``.
     keep_artifacts : bool, optional
-        If True, keep all locally generated files after upload (default False).
-    """
+        If True, also write the generated files to ``workspace`` (default False).
+    family : bool, optional
+        If True and ``eq`` is an EquilibriaFamily, upload one run for every step
+        of the family instead of only the last one (default False).
+    workspace : str, optional
+        Directory of this upload, where its intermediate files are written in a
+        directory of their own and ``keep_artifacts`` writes the files, created
+        if needed. Defaults to the temporary directory of the system and, for
+        ``keep_artifacts``, the current working directory.
+    ledger : bool or str or UploadLedger, optional
+        Ledger of uploads to check and record this upload in. True (default)
+        uses ``~/.cache/stelladb/uploads.sqlite``, a str the database at that
+        path, False none.
+    force : bool, optional
+        If True, upload even if the ledger records the same upload as done
+        (default False).
+    catalog : bool or str or Catalog, optional
+        Catalog to also add the generated rows to, see ``desc_to_csv``
+        (default True).
+    compression : {"deflate", "stored", "bzip2", "lzma", "zstd"}, optional
+        Compression of the zip archive (default ``"deflate"``). Its members
+        are compressed in parallel threads. ``"zstd"`` needs Python 3.14.
+    compresslevel : int, optional
+        Level of the compression, e.g. 1 (fastest) to 9 (smallest) for
+        deflate, whose default is 6.
 
-    filename, auto_input = _prepare_all_artifacts(
-        eq,
-        config_name,
-        description,
-        provenance,
-        deviceid,
-        isDeviceNew,
-        inputfile,
-        inputfilename,
-        config_class,
-        initialization_method,
-        deviceDescription,
-        uploadPlots,
+    Returns
+    -------
+    uploaded : bool
+        True if the equilibrium was uploaded, or skipped as the ledger records
+        it as uploaded before. False if the upload failed, the error being
+        printed and recorded in the ledger.
+    """
+    metadata = dict(
+        config_name=config_name,
+        uploadPlots=uploadPlots,
+        description=description,
+        provenance=provenance,
+        deviceid=deviceid,
+        isDeviceNew=isDeviceNew,
+        inputfile=inputfile,
+        inputfilename=inputfilename,
+        config_class=config_class,
+        initialization_method=initialization_method,
+        deviceDescription=deviceDescription,
+        family=family,
     )
-
-    print("Uploading to database...\n")
-    driver = get_driver()
-    perform_login(driver, username, password)
-    driver.get(f"{HOME_PAGE}/upload/")
+    ledger, owned = _open_ledger(ledger)
     try:
-        message = _upload_desc_files(driver, filename, isDeviceNew, uploadPlots)
-        print(message)
-    except Exception as e:
-        print(f"An error occurred during upload: {e}")
+        if ledger is not None:
+            key = _desc_upload_key(eq, family, metadata)
+            if not force and _already_uploaded(ledger, key, config_name):
+                return True
+
+        filename, bundle = _prepare_all_artifacts(
+            eq,
+            config_name,
+            description,
+            provenance,
+            deviceid,
+            isDeviceNew,
+            inputfile,
+            inputfilename,
+            config_class,
+            initialization_method,
+            deviceDescription,
+            uploadPlots,
+            family,
+            workspace,
+            catalog,
+            compression,
+            compresslevel,
+        )
+
+        with bundle:
+            if keep_artifacts:
+                bundle.write_to(workspace or os.getcwd())
+            # the form needs paths, so the files only go to a temporary directory
+            with bundle.materialize() as paths:
+                files = _desc_upload_files(paths, filename, isDeviceNew, uploadPlots)
+                # invalid rows are rejected before a browser is started
+                check_upload_files(files)
+
+                print("Uploading to database...\n")
+                driver = open_upload_page(username, password)
+                try:
+                    message = submit_upload_form(driver, files)
+                    status = UPLOADED
+                    print(message)
+                except UploadFormError:
+                    # a form that does not match is not a rejection of the upload
+                    raise
+                except Exception as e:
+                    message = str(e)
+                    status = FAILED
+                    print(f"An error occurred during upload: {e}")
+                finally:
+                    driver.quit()
+
+        if ledger is not None:
+            source = eq + ".h5" if isinstance(eq, str) else None
+            ledger.record(key, status, message, name=config_name, source=source)
     finally:
-        driver.quit()
-        _cleanup_local_files(filename, auto_input, uploadPlots, keep_artifacts)
+        if owned:
+            ledger.close()
+    return status == UPLOADED
 
 
 def generate_files_desc(
@@ -578,19 +867,24 @@ def generate_files_desc(
     config_class=None,
     initialization_method="surface",
     deviceDescription=None,
+    family=False,
+    workspace=None,
+    catalog=True,
+    compression="deflate",
+    compresslevel=None,
 ):
     """Generate and collect all database upload files into a local folder.
 
     Performs the same file preparation as ``save_to_db_desc`` but instead of
-    uploading, moves everything into a folder named ``{config_name}/`` in the
-    current working directory. The folder can later be uploaded with
-    ``upload_files_desc``.
+    uploading, writes everything into a folder named ``{config_name}/`` in
+    ``workspace``. The folder can later be uploaded with ``upload_files_desc``.
 
     Parameters
     ----------
     eq : str or Equilibrium or EquilibriaFamily
         DESC equilibrium to process. If str, treated as a path to an ``.h5``
-        file (without extension). If EquilibriaFamily, the last element is used.
+        file (without extension). If EquilibriaFamily, the last element is used
+        unless ``family=True``.
     config_name : str
         Name used for the configuration entry, output folder, and all filenames.
     uploadPlots : bool, optional
@@ -599,7 +893,7 @@ def generate_files_desc(
         Free-text description stored with the run and configuration.
     provenance : str, optional
         Free-text provenance note (e.g. paper reference or run description).
-    deviceid : int, optional
+    deviceid : int or str, optional
         Database ID of the device this configuration belongs to.
     isDeviceNew : bool, optional
         If True, also create a device CSV for a new device entry (default False).
@@ -617,11 +911,27 @@ def generate_files_desc(
         Initialization method stored in the run metadata (default ``"surface"``).
     deviceDescription : str, optional
         Description for the new device entry. Only used when ``isDeviceNew=True``.
+    family : bool, optional
+        If True and ``eq`` is an EquilibriaFamily, write one run for every step
+        of the family instead of only the last one (default False).
+    workspace : str, optional
+        Directory to create the folder in, which also holds the intermediate
+        files of this job, created if needed. Defaults to the current working
+        directory.
+    catalog : bool or str or Catalog, optional
+        Catalog to also add the generated rows to, see ``desc_to_csv``
+        (default True).
+    compression : {"deflate", "stored", "bzip2", "lzma", "zstd"}, optional
+        Compression of the zip archive (default ``"deflate"``). Its members
+        are compressed in parallel threads. ``"zstd"`` needs Python 3.14.
+    compresslevel : int, optional
+        Level of the compression, e.g. 1 (fastest) to 9 (smallest) for
+        deflate, whose default is 6.
     """
     if not all([eq, config_name]):
         raise ValueError("Please provide a valid input for eq and config_name.")
 
-    filename, auto_input = _prepare_all_artifacts(
+    filename, bundle = _prepare_all_artifacts(
         eq,
         config_name,
         description,
@@ -634,37 +944,19 @@ def generate_files_desc(
         initialization_method,
         deviceDescription,
         uploadPlots,
+        family,
+        workspace,
+        catalog,
+        compression,
+        compresslevel,
     )
 
     folder_name = filename
-    print(f"Creating folder {folder_name}...")
-    os.makedirs(folder_name, exist_ok=True)
-    print("Moving files to the folder...")
-
-    for f in [f"{filename}.zip", "desc_runs.csv", "configurations.csv"]:
-        shutil.move(f, os.path.join(folder_name, f))
-
-    if isDeviceNew and os.path.exists("devices_and_concepts.csv"):
-        shutil.move(
-            "devices_and_concepts.csv",
-            os.path.join(folder_name, "devices_and_concepts.csv"),
-        )
-    if auto_input:
-        auto_input_file = f"auto_generated_{filename}_input.txt"
-        if os.path.exists(auto_input_file):
-            shutil.move(auto_input_file, os.path.join(folder_name, auto_input_file))
-    if uploadPlots:
-        for f in [
-            f"{filename}_surface.webp",
-            f"{filename}_boozer.webp",
-            f"{filename}_3d.html",
-        ]:
-            if os.path.exists(f):
-                shutil.move(f, os.path.join(folder_name, f))
-
-    auto_save_name = f"{filename}_auto_save.h5"
-    if os.path.exists(auto_save_name):
-        os.remove(auto_save_name)
+    if workspace is not None:
+        folder_name = _in_workspace(workspace, os.path.basename(filename))
+    print(f"Writing files to the folder {folder_name}...")
+    with bundle:
+        bundle.write_to(folder_name)
 
 
 def upload_files_desc(folder_path, username, password, verbose=1):
@@ -673,6 +965,8 @@ def upload_files_desc(folder_path, username, password, verbose=1):
     Scans ``folder_path`` for the expected files (zip archive, CSV metadata,
     optional plots) and submits them via the website upload form. Use this
     after ``generate_files_desc`` to separate file preparation from upload.
+    The CSV files are checked against the table schemas first, raising a
+    ``SchemaError`` if they do not match.
 
     Parameters
     ----------
@@ -729,37 +1023,16 @@ def upload_files_desc(folder_path, username, password, verbose=1):
     if verbose > 1:
         print(f"Files to upload: {[f for f in files.values() if f is not None]}")
 
-    driver = get_driver()
-    perform_login(driver, username, password)
-    driver.get(f"{HOME_PAGE}/upload/")
+    if not uploadPlots:
+        for key in ("surfaceToUpload", "boozerToUpload", "plot3dToUpload"):
+            files[key] = None
+    if not isDeviceNew:
+        files["deviceToUpload"] = None
 
+    check_upload_files(files)
+    driver = open_upload_page(username, password)
     try:
-
-        def wait_and_send(element_id, filepath):
-            if filepath:
-                WebDriverWait(driver, 10).until(
-                    EC.presence_of_element_located((By.ID, element_id))
-                ).send_keys(os.path.abspath(filepath))
-
-        wait_and_send("zipToUpload", files["zipToUpload"])
-        wait_and_send("descToUpload", files["descToUpload"])
-        wait_and_send("configToUpload", files["configToUpload"])
-
-        if uploadPlots:
-            wait_and_send("surfaceToUpload", files["surfaceToUpload"])
-            wait_and_send("boozerToUpload", files["boozerToUpload"])
-            wait_and_send("plot3dToUpload", files["plot3dToUpload"])
-
-        if isDeviceNew:
-            wait_and_send("deviceToUpload", files["deviceToUpload"])
-
-        WebDriverWait(driver, 10).until(
-            EC.presence_of_element_located((By.ID, "confirmDesc"))
-        ).click()
-        WebDriverWait(driver, 30).until(
-            lambda d: d.find_elements(By.CSS_SELECTOR, ".success-div, .error-div")
-        )
-        print(driver.find_element(By.CSS_SELECTOR, ".success-div, .error-div").text)
+        print(submit_upload_form(driver, files))
     except Exception as e:
         print(f"Upload failed: {e}")
     finally:
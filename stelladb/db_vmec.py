@@ -1,26 +1,28 @@
 """Functions to convert DESC or VMEC output files into .csv files for the Datbase."""
 
+import os
+from concurrent.futures import ThreadPoolExecutor
 from datetime import date
 
 import numpy as np
 from scipy.interpolate import InterpolatedUnivariateSpline
 
-try:
-    from simsopt.mhd.vmec import Vmec
-except ImportError:
-    raise ImportError(
-        "simsopt is required to use the functions in db_vmec.py. "
-        "Please install simsopt with `pip install simsopt` or "
-        "`conda install -c conda-forge simsopt`."
-    )
-
-from .device import device_or_concept_to_csv
-from .db_desc import _append_to_csv
-
-# TODO: add threshold to truncate at what amplitude surface Fourier coefficient
-# that it is working
-
-# TODO: make arrays stored in one line
+from .cache import cached_metrics, vmec_content_key, vmec_metrics_key
+from .archive import write_zip
+from .artifacts import ArtifactBundle, _in_workspace
+from .catalog import _catalog_rows
+from .device import _device_row
+from .geometry import boundary_excursions, fourier_grid, truncate_spectrum
+from .getters import (
+    UploadFormError,
+    check_upload_files,
+    open_upload_page,
+    submit_upload_form,
+)
+from .ledger import FAILED, UPLOADED, _already_uploaded, _open_ledger, upload_key
+from .profile_analysis import spline_extrema
+from .wout import WoutFile
+from .writers import _append_rows_to_csv, rows_to_csv
 
 # TODO: either make separate utilities for desc_runs csv and configurations csv,
 # or have the utility somehow check for if the configuration exists already,
@@ -30,78 +32,72 @@ from .db_desc import _append_to_csv
 # an existing configuration in the database
 
 
-def save_to_db_vmec():
-    print("This function is not yet implemented.")
-    return None
+def _compute_vmec_metrics(wout, s_half_grid):
+    """Compute the profile and boundary quantities stored for a VMEC wout."""
+    metrics = {}
+    s_full = wout.phi / wout.phi[-1]
+
+    # This is how iota is computed in vmec_splines in simsopt
+    iota = InterpolatedUnivariateSpline(s_half_grid, wout.iotas[1:])
+    pressure = InterpolatedUnivariateSpline(s_half_grid, wout.pres[1:])
+    metrics["iota_profile"] = iota(s_full)
+    metrics["pressure_profile"] = pressure(s_full)
+    metrics["current_profile"] = np.polyval(wout.ac[::-1], s_full)
+
+    # exact extrema on s in [0, 1] from the spline pieces of both profiles
+    minima, maxima = spline_extrema([iota, pressure])
+    metrics["iota_min"], metrics["pressure_min"] = minima
+    metrics["iota_max"], metrics["pressure_max"] = maxima
+
+    metrics.update(
+        boundary_excursions(
+            wout.xm,
+            wout.xn,
+            wout.rmnc[:, -1],
+            wout.rmns[:, -1] if wout.lasym else None,
+            wout.zmns[:, -1],
+            wout.zmnc[:, -1] if wout.lasym else None,
+        )
+    )
+    return metrics
 
 
-def vmec_to_csv(  # noqa
+def _vmec_csv_rows(  # noqa
     eq,
     current=True,
     name=None,
     provenance=None,
     description=None,
     inputfilename=None,
+    cache=True,
+    spectrum_threshold=None,
     **kwargs,
 ):
-    """Save VMEC output file as a csv with relevant information.
-
-    Parameters
-    ----------
-    eq : str
-        VMEC equilibrium to save or path to .h5 of VMEC equilibrium to save
-    current : bool
-        True if the equilibrium was solved with fixed current or not if False,
-        was solved with fixed iota
-    name : str
-        name of configuration (and VMEC run)
-    provenance : str
-        where this configuration (and VMEC run) came from, e.g. VMEC github repo
-    description : str
-        description of the configuration (and VMEC run)
-    inputfilename : str
-        name of the input file corresponding to this configuration (and VMEC run)
-
-    Kwargs
-    ------
-    date_created : str
-        when the VMEC run was created, defaults to current day
-    publicationid : str
-        unique ID for a publication which this VMEC output file is associated with.
-    deviceid : str
-        unique ID for a device/concept which this configuration is associated with.
-    config_class : str
-        class of configuration i.e. quasisymmetry (QA, QH, QP)
-        or omnigenity (QI, OT, OH) or axisymmetry (AS).
-        Defaults to None for a stellarator and (AS) for a tokamak
-        #TODO: can we attempt to automatically detect this for QS configs?
-        maybe with a threshold on low QS, then if passes that, classify
-        based on largest Boozer mode? can add a flag to the table like
-        "automatically labelled class" if this occurs
-        to be transparent about source of the class if it was not a human
+    """Compute the vmec_runs and configurations rows of ``eq``, see ``vmec_to_csv``."""
+    if isinstance(eq, str):
+        with WoutFile(eq) as vmec:
+            return _vmec_csv_rows(
+                vmec,
+                current=current,
+                name=name,
+                provenance=provenance,
+                description=description,
+                inputfilename=inputfilename,
+                cache=cache,
+                spectrum_threshold=spectrum_threshold,
+                **kwargs,
+            )
 
-    Returns
-    -------
-        None
-    """
     # data dicts for each table
     data_vmec_runs = {}
     data_configurations = {}
 
-    vmec_runs_csv_name = "vmec_runs.csv"
-    configurations_csv_name = "configurations.csv"
-
-    if isinstance(eq, str):
-        file_name = eq
-        data_vmec_runs["outputfile"] = file_name
-        vmec = Vmec(file_name)
-        vmec_wout = vmec.wout
-        version = vmec_wout.version_
-        eq = vmec_wout
-    elif isinstance(eq, Vmec):
+    if hasattr(eq, "wout"):
         # Assuming that the equilibrium had been run, and thus wout is not empty
         vmec = eq
+        data_vmec_runs["outputfile"] = getattr(eq, "path", None)
         eq = vmec.wout
+        version = eq.version_
     else:
         raise TypeError("Wrong VMEC file or object was passed!")
 
@@ -118,26 +114,23 @@ def vmec_to_csv(  # noqa
     data_vmec_runs["mpol"] = eq.mpol
     data_vmec_runs["mtor"] = eq.ntor
 
-    # save profiles
-
-    s_full = eq.phi / eq.phi[-1]
-    data_vmec_runs["profile_s"] = s_full
-    s_dense = np.linspace(0.0, 1.0, 101)
+    metrics = cached_metrics(
+        vmec_metrics_key(eq),
+        lambda: _compute_vmec_metrics(eq, vmec.s_half_grid),
+        cache,
+    )
 
-    # This is how iota is computed in vmec_splines in simsopt
-    iota = InterpolatedUnivariateSpline(vmec.s_half_grid, eq.iotas[1:])
-    data_vmec_runs["iota_profile"] = iota(s_full)  # sohuld name differently
+    # save profiles
+    data_vmec_runs["profile_s"] = eq.phi / eq.phi[-1]
 
-    iota_dense = iota(s_dense)
-    data_vmec_runs["iota_max"] = np.max(iota_dense)
-    data_vmec_runs["iota_min"] = np.min(iota_dense)
+    data_vmec_runs["iota_profile"] = metrics["iota_profile"]  # sohuld name differently
+    data_vmec_runs["iota_max"] = metrics["iota_max"]
+    data_vmec_runs["iota_min"] = metrics["iota_min"]
 
     # Not sure what current is wanted here: vmec outputs many.
     # I guess is the profile derived from ac
     data_vmec_runs["ac"] = eq.ac
-    data_vmec_runs["current_profile"] = np.polyval(
-        eq.ac[::-1], s_full
-    )  # round to make sure any 0s are actually zero
+    data_vmec_runs["current_profile"] = metrics["current_profile"]
     if current:
         data_configurations["current_specification"] = "net enclosed current"
     else:
@@ -149,12 +142,9 @@ def vmec_to_csv(  # noqa
     data_vmec_runs["D_Mercier_min"] = np.min(Dmerc)
     data_vmec_runs["D_Mercier"] = Dmerc
 
-    # This is how iota is computed in vmec_splines in simsopt
-    pressure = InterpolatedUnivariateSpline(vmec.s_half_grid, eq.pres[1:])
-    data_vmec_runs["pressure_profile"] = pressure(s_full)
-    pressure_dense = pressure(s_dense)
-    data_vmec_runs["pressure_max"] = np.max(pressure_dense)
-    data_vmec_runs["pressure_min"] = np.min(pressure_dense)
+    data_vmec_runs["pressure_profile"] = metrics["pressure_profile"]
+    data_vmec_runs["pressure_max"] = metrics["pressure_max"]
+    data_vmec_runs["pressure_min"] = metrics["pressure_min"]
 
     today = date.today()
     data_vmec_runs["date_created"] = kwargs.get("date_created", today)
@@ -185,28 +175,8 @@ def vmec_to_csv(  # noqa
     )  # FIXME: I am assuming betatot is this (there are various beta outputs in vmec)
     data_configurations["total_toroidal_current"] = eq.ctor
 
-    theta = np.linspace(0, 1.0, 101) * 2 * np.pi
-    phi = np.linspace(0, 1.0, 101) * 2 * np.pi
-    [theta_grid, phi_grid] = np.meshgrid(theta, phi)
-    xm = eq.xm
-    xn = eq.xn
-    angle = (
-        xm[:, None, None] * theta_grid[None, :, :]
-        - xn[:, None, None] * phi_grid[None, :, :]
-    )
-    rmnc = eq.rmnc[:, -1]
-    zmns = eq.zmns[:, -1]
-    cosangle = np.cos(angle)
-    sinangle = np.sin(angle)
-    R = np.einsum("i,ikl->ikl", rmnc, cosangle)
-    Z = np.einsum("i,ikl->ikl", zmns, sinangle)
-    if eq.lasym:
-        rmns = eq.rmns[:, -1]
-        zmnc = eq.zmnc[:, -1]
-        R += np.einsum("i,ikl->ikl", rmns, sinangle)
-        Z += np.einsum("i,ikl->ikl", zmnc, cosangle)
-    data_configurations["R_excursion"] = float(f"{np.max(R)-np.min(R):1.4e}")
-    data_configurations["Z_excursion"] = float(f"{np.max(Z)-np.min(Z):1.4e}")
+    data_configurations["R_excursion"] = float(f"{metrics['R_excursion']:1.4e}")
+    data_configurations["Z_excursion"] = float(f"{metrics['Z_excursion']:1.4e}")
 
     # Not sure how you are computing the average elongation: all the R & Z info is above
 
@@ -217,20 +187,27 @@ def vmec_to_csv(  # noqa
     # surface geometry
     # currently saving as VMEC format but I'd prefer if we could do DESC format...
 
-    data_configurations["m"] = xm
-    data_configurations["n"] = xn
-
-    data_configurations["RBC"] = rmnc
+    rmnc = eq.rmnc[:, -1]
+    zmns = eq.zmns[:, -1]
+    spectrum = {"RBC": rmnc}
     if eq.lasym:
-        data_configurations["RBS"] = rmns
+        spectrum["RBS"] = eq.rmns[:, -1]
     else:
-        data_configurations["RBS"] = np.zeros_like(rmnc)
+        spectrum["RBS"] = np.zeros_like(rmnc)
     # Z
-    data_configurations["ZBS"] = zmns
+    spectrum["ZBS"] = zmns
     if eq.lasym:
-        data_configurations["ZBC"] = zmnc
+        spectrum["ZBC"] = eq.zmnc[:, -1]
     else:
-        data_configurations["ZBC"] = np.zeros_like(zmns)
+        spectrum["ZBC"] = np.zeros_like(zmns)
+
+    m, n = eq.xm, eq.xn
+    if spectrum_threshold is not None:
+        m, n, spectrum, error = truncate_spectrum(m, n, spectrum, spectrum_threshold)
+        data_configurations["spectrum_truncation_error"] = float(f"{error:1.2e}")
+    data_configurations["m"] = m
+    data_configurations["n"] = n
+    data_configurations.update(spectrum)
 
     # profiles
     # TODO: make dict of different classes of Profile and
@@ -251,11 +228,476 @@ def vmec_to_csv(  # noqa
 
     data_configurations["date_created"] = kwargs.get("date_created", today)
 
-    _append_to_csv(
-        vmec_runs_csv_name, {k: v for k, v in data_vmec_runs.items() if v is not None}
-    )
-    _append_to_csv(
-        configurations_csv_name,
+    return (
+        {k: v for k, v in data_vmec_runs.items() if v is not None},
         {k: v for k, v in data_configurations.items() if v is not None},
     )
+
+
+def vmec_to_csv(
+    eq,
+    current=True,
+    name=None,
+    provenance=None,
+    description=None,
+    inputfilename=None,
+    cache=True,
+    spectrum_threshold=None,
+    arrays="csv",
+    workspace=None,
+    catalog=True,
+    **kwargs,
+):
+    """Save VMEC output file as a csv with relevant information.
+
+    Parameters
+    ----------
+    eq : str or Vmec or WoutFile
+        VMEC equilibrium to save or path to the wout netCDF file of the VMEC
+        equilibrium to save. Any object with ``wout`` and ``s_half_grid``
+        attributes like those of simsopt's ``Vmec`` is accepted.
+    current : bool
+        True if the equilibrium was solved with fixed current or not if False,
+        was solved with fixed iota
+    name : str
+        name of configuration (and VMEC run)
+    provenance : str
+        where this configuration (and VMEC run) came from, e.g. VMEC github repo
+    description : str
+        description of the configuration (and VMEC run)
+    inputfilename : str
+        name of the input file corresponding to this configuration (and VMEC run)
+    cache : bool
+        If True, reuse profile and boundary quantities previously computed for the
+        same wout data from the local cache in ``~/.cache/stelladb``
+    spectrum_threshold : float
+        If given, only the boundary modes with a coefficient larger than this
+        fraction of the largest one are stored, e.g. 1e-6, and the sum of the
+        dropped coefficients is stored as ``spectrum_truncation_error``, an
+        upper bound of the resulting error of R and Z in meters
+    arrays : {"csv", "npz", "parquet"}
+        Where the array fields, i.e. the profiles, ``D_Mercier`` and the
+        boundary spectrum, are written. "csv" (default) writes them into the
+        CSV files as comma-separated strings, the profile coefficients ``ac``,
+        ``am`` and ``ai`` at full precision. "npz" and "parquet" write them
+        exactly to the sidecar files ``vmec_runs_arrays.{npz,parquet}`` and
+        ``configurations_arrays.{npz,parquet}``, one row per CSV row, and only
+        the scalar fields to the CSV files. "parquet" needs ``pyarrow``
+    workspace : str
+        directory to write the files to, created if needed. Defaults to the
+        current working directory. Jobs running at the same time should each
+        use their own
+    catalog : bool or str or Catalog
+        catalog to also add the rows to, for later searches with
+        ``Catalog.search``. True (default) uses
+        ``~/.cache/stelladb/catalog.sqlite``, a str the database at that path,
+        False none
+
+    Kwargs
+    ------
+    date_created : str
+        when the VMEC run was created, defaults to current day
+    publicationid : str
+        unique ID for a publication which this VMEC output file is associated with.
+    deviceid : str
+        unique ID for a device/concept which this configuration is associated with.
+    config_class : str
+        class of configuration i.e. quasisymmetry (QA, QH, QP)
+        or omnigenity (QI, OT, OH) or axisymmetry (AS).
+        Defaults to None for a stellarator and (AS) for a tokamak
+        #TODO: can we attempt to automatically detect this for QS configs?
+        maybe with a threshold on low QS, then if passes that, classify
+        based on largest Boozer mode? can add a flag to the table like
+        "automatically labelled class" if this occurs
+        to be transparent about source of the class if it was not a human
+
+    Returns
+    -------
+        None
+    """
+    vmec_runs, configuration = _vmec_csv_rows(
+        eq,
+        current=current,
+        name=name,
+        provenance=provenance,
+        description=description,
+        inputfilename=inputfilename,
+        cache=cache,
+        spectrum_threshold=spectrum_threshold,
+        **kwargs,
+    )
+    _append_rows_to_csv(_in_workspace(workspace, "vmec_runs.csv"), [vmec_runs], arrays)
+    _append_rows_to_csv(
+        _in_workspace(workspace, "configurations.csv"), [configuration], arrays
+    )
+    _catalog_rows(catalog, "vmec_runs", [vmec_runs], [configuration])
     return None
+
+
+# ---------------------------------------------------------------------------
+# Upload pipeline
+# ---------------------------------------------------------------------------
+
+
+def _vmec_files(eq, inputfile, inputfilename):
+    """Return the wout file of ``eq`` and the VMEC input file to upload with it."""
+    if isinstance(eq, str):
+        wout_path = eq
+    else:
+        # WoutFile.path or simsopt's Vmec.output_file
+        wout_path = getattr(eq, "path", None) or getattr(eq, "output_file", None)
+    if wout_path is None or not os.path.exists(wout_path):
+        raise FileNotFoundError(f"wout file {wout_path} does not exist.")
+
+    if inputfilename is not None:
+        if not os.path.exists(inputfilename):
+            raise FileNotFoundError(f"{inputfilename} does not exist.")
+        return wout_path, inputfilename
+    if inputfile:
+        # VMEC names the output of input.{ext} wout_{ext}.nc
+        directory, base = os.path.split(wout_path)
+        ext = os.path.splitext(base)[0]
+        if ext.startswith("wout_"):
+            ext = ext[len("wout_") :]
+        candidate = os.path.join(directory, "input." + ext)
+        if os.path.exists(candidate):
+            print(f"Found an input file with name {candidate} and using that ...")
+            return wout_path, candidate
+        print(f"No input file {candidate} found, uploading the wout file only.")
+    return wout_path, None
+
+
+def _create_vmec_zip(
+    wout_path, inputfilename, out, compression="deflate", compresslevel=None
+):
+    """Zip the wout file and optional input file into ``out``, a path or file object.
+
+    The files are compressed in parallel threads, see ``archive.write_zip``.
+    """
+    print("Zipping files...")
+    members = {os.path.basename(wout_path): wout_path}
+    if inputfilename is not None:
+        members[os.path.basename(inputfilename)] = inputfilename
+    write_zip(out, members, compression, compresslevel)
+
+
+def _vmec_csv_artifacts(eq, bundle, catalog=True, **kwargs):
+    """Add vmec_runs.csv and configurations.csv of ``eq`` to an ArtifactBundle.
+
+    The rows are also added to ``catalog``, see ``vmec_to_csv``.
+    """
+    vmec_runs, configuration = _vmec_csv_rows(eq, **kwargs)
+    bundle.add("vmec_runs.csv", rows_to_csv([vmec_runs]))
+    bundle.add("configurations.csv", rows_to_csv([configuration]))
+    _catalog_rows(catalog, "vmec_runs", [vmec_runs], [configuration])
+
+
+def _generate_vmec_plots(eq, filename, config_name, bundle):
+    """Generate flux surface and 3D |B| plots of a VMEC equilibrium into a bundle."""
+    # the Figure API instead of pyplot, so plotting is safe in a worker thread
+    from matplotlib.figure import Figure
+    import plotly.graph_objects as go
+
+    if isinstance(eq, str):
+        with WoutFile(eq) as vmec:
+            return _generate_vmec_plots(vmec, filename, config_name, bundle)
+    wout = eq.wout
+
+    print("Plotting/saving surface and 3D plots...")
+    surface_filename = filename + "_surface.webp"
+    d3_filename = filename + "_3d.html"
+
+    def surface(js, theta, phi):
+        """R and Z of surface js on a grid of angles."""
+        R = fourier_grid(
+            wout.xm,
+            wout.xn,
+            wout.rmnc[:, js],
+            wout.rmns[:, js] if wout.lasym else None,
+            theta,
+            phi,
+        )
+        Z = fourier_grid(
+            wout.xm,
+            wout.xn,
+            wout.zmnc[:, js] if wout.lasym else None,
+            wout.zmns[:, js],
+            theta,
+            phi,
+        )
+        return R, Z
+
+    # cross sections at four toroidal angles of one field period, on surfaces
+    # equally spaced in rho = sqrt(s)
+    ns = wout.rmnc.shape[1]
+    theta = np.linspace(0, 2 * np.pi, 101)
+    phi = np.linspace(0, 2 * np.pi / wout.nfp, 4, endpoint=False)
+    surfaces = np.unique(np.round(np.linspace(0, 1, 9)[1:] ** 2 * (ns - 1)))
+    fig = Figure(figsize=(8, 8), layout="constrained")
+    axes = fig.subplots(2, 2).ravel()
+    R_axis, Z_axis = surface(0, theta[:1], phi)
+    for js in surfaces.astype(int):
+        R, Z = surface(js, theta, phi)
+        for ax, r, z in zip(axes, R.T, Z.T):
+            ax.plot(r, z, color="C0", lw=1)
+    for ax, p, r, z in zip(axes, phi, R_axis[0], Z_axis[0]):
+        ax.plot(r, z, "x", color="C0")
+        ax.set_aspect("equal")
+        ax.set_title(f"phi = {p:.3f}")
+        ax.set_xlabel("R (m)")
+        ax.set_ylabel("Z (m)")
+    fig.suptitle(config_name)
+    fig.savefig(bundle.open(surface_filename), dpi=90, format="webp")
+
+    # |B| on the boundary, extrapolated from the last two half grid surfaces
+    theta = np.linspace(0, 2 * np.pi, 30)
+    phi = np.linspace(0, 2 * np.pi, max(140, int(20 * wout.nfp)))
+    R, Z = surface(-1, theta, phi)
+
+    def boundary(coeffs):
+        return 1.5 * coeffs[:, -1] - 0.5 * coeffs[:, -2]
+
+    B = fourier_grid(
+        wout.xm_nyq,
+        wout.xn_nyq,
+        boundary(wout.bmnc),
+        boundary(wout.bmns) if wout.lasym else None,
+        theta,
+        phi,
+    )
+    fig = go.Figure(
+        go.Surface(
+            x=R * np.cos(phi),
+            y=R * np.sin(phi),
+            z=Z,
+            surfacecolor=B,
+            colorscale="plasma",
+            colorbar=dict(title="|B| (T)"),
+        )
+    )
+    fig.update_layout(
+        width=None,
+        height=None,
+        autosize=True,
+        margin=dict(l=0, r=0, t=0, b=0),
+        paper_bgcolor="rgb(0, 0, 0)",
+        scene=dict(aspectmode="data"),
+    )
+    html = fig.to_html(
+        include_plotlyjs=False,
+        full_html=False,
+        div_id="plot3d",
+        config={"responsive": True},
+    )
+    bundle.add(d3_filename, html)
+
+
+def save_to_db_vmec(
+    eq,
+    config_name,
+    username,
+    password,
+    uploadPlots=False,
+    description=None,
+    provenance=None,
+    deviceid=None,
+    isDeviceNew=False,
+    inputfile=False,
+    inputfilename=None,
+    current=True,
+    config_class=None,
+    deviceDescription=None,
+    keep_artifacts=False,
+    workspace=None,
+    ledger=True,
+    force=False,
+    catalog=True,
+    compression="deflate",
+    compresslevel=None,
+):
+    """Upload a VMEC equilibrium to the stellarator database.
+
+    Prepares all required files (zip archive of the wout and input files, CSV
+    metadata, optional plots) in memory, logs in to the website, and submits
+    the upload form automatically. The files are prepared in parallel threads while the
+    browser starts and logs in. The CSV files are checked against the table
+    schemas before the upload, raising a ``SchemaError`` if they do not match.
+    An upload page without one of the inputs of the VMEC form raises an
+    ``UploadFormError`` naming it, instead of recording a failed upload.
+    Nothing is written to the working directory unless ``keep_artifacts=True``,
+    so several uploads can run at the same time, in threads or processes.
+
+    Every upload is recorded in a local ledger, keyed by the content of the
+    wout file and the metadata of the upload. An equilibrium that was already
+    uploaded with the same metadata is skipped before any file is prepared,
+    unless ``force=True``.
+
+    Parameters
+    ----------
+    eq : str or Vmec or WoutFile
+        VMEC equilibrium to upload or path to its wout netCDF file. Objects
+        must refer to a wout file on disk, through the ``path`` of a
+        ``WoutFile`` or the ``output_file`` of a simsopt ``Vmec``.
+    config_name : str
+        Name used for the configuration entry and to derive all output filenames.
+    username : str
+        Username for the database website.
+    password : str
+        Password for the database website.
+    uploadPlots : bool, optional
+        If True, generate and upload flux surface and 3-D plots (default False).
+    description : str, optional
+        Free-text description stored with the run and configuration.
+    provenance : str, optional
+        Free-text provenance note (e.g. paper reference or run description).
+    deviceid : int or str, optional
+        Database ID of the device this configuration belongs to.
+    isDeviceNew : bool, optional
+        If True, also create and upload a new device entry using ``config_name``
+        and ``deviceDescription`` (default False).
+    inputfile : bool, optional
+        If True, include the VMEC input file in the upload. For a wout file
+        ``wout_{ext}.nc`` the file ``input.{ext}`` next to it is used if it
+        exists (default False).
+    inputfilename : str, optional
+        Explicit path to the VMEC input file, which is then always included.
+    current : bool, optional
+        True if the equilibrium was solved with fixed current, False if with
+        fixed iota (default True).
+    config_class : str, optional
+        Configuration class label (e.g. ``"QA"``, ``"QH"``). Ignored for
+        axisymmetric equilibria, which are always classified as ``"AS"``.
+    deviceDescription : str, optional
+        Description for the new device entry. Only used when ``isDeviceNew=True``.
+    keep_artifacts : bool, optional
+        If True, also write the generated files to ``workspace`` (default False).
+    workspace : str, optional
+        Directory of this upload, where its intermediate files are written in a
+        directory of their own and ``keep_artifacts`` writes the files, created
+        if needed. Defaults to the temporary directory of the system and, for
+        ``keep_artifacts``, the current working directory.
+    ledger : bool or str or UploadLedger, optional
+        Ledger of uploads to check and record this upload in. True (default)
+        uses ``~/.cache/stelladb/uploads.sqlite``, a str the database at that
+        path, False none.
+    force : bool, optional
+        If True, upload even if the ledger records the same upload as done
+        (default False).
+    catalog : bool or str or Catalog, optional
+        Catalog to also add the generated rows to, see ``vmec_to_csv``
+        (default True).
+    compression : {"deflate", "stored", "bzip2", "lzma", "zstd"}, optional
+        Compression of the zip archive (default ``"deflate"``). Its members
+        are compressed in parallel threads. ``"zstd"`` needs Python 3.14.
+    compresslevel : int, optional
+        Level of the compression, e.g. 1 (fastest) to 9 (smallest) for
+        deflate, whose default is 6.
+    """
+    wout_path, inputfilename = _vmec_files(eq, inputfile, inputfilename)
+    metadata = dict(
+        config_name=config_name,
+        uploadPlots=uploadPlots,
+        description=description,
+        provenance=provenance,
+        deviceid=deviceid,
+        isDeviceNew=isDeviceNew,
+        inputfile=inputfile,
+        inputfilename=inputfilename,
+        current=current,
+        config_class=config_class,
+        deviceDescription=deviceDescription,
+    )
+    ledger, owned = _open_ledger(ledger)
+    if ledger is not None:
+        try:
+            with WoutFile(wout_path) as wout:
+                key = upload_key([vmec_content_key(wout)], metadata)
+            skip = not force and _already_uploaded(ledger, key, config_name)
+        except BaseException:
+            if owned:
+                ledger.close()
+            raise
+        if skip:
+            if owned:
+                ledger.close()
+            return
+    filename = config_name
+    bundle = ArtifactBundle(directory=workspace)
+
+    print("Preparing files and logging in to the database...")
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        login = executor.submit(open_upload_page, username, password)
+        stages = [
+            executor.submit(
+                _create_vmec_zip,
+                wout_path,
+                inputfilename,
+                bundle.open(f"{filename}.zip"),
+                compression,
+                compresslevel,
+            ),
+            executor.submit(
+                _vmec_csv_artifacts,
+                eq,
+                bundle,
+                catalog=catalog,
+                current=current,
+                name=config_name,
+                provenance=provenance,
+                description=description,
+                inputfilename=(
+                    None if inputfilename is None else os.path.basename(inputfilename)
+                ),
+                deviceid=deviceid,
+                config_class=config_class,
+            ),
+        ]
+        if isDeviceNew:
+            device = _device_row(name=config_name, description=deviceDescription)
+            bundle.add("devices_and_concepts.csv", rows_to_csv([device]))
+        if uploadPlots:
+            stages.append(
+                executor.submit(_generate_vmec_plots, eq, filename, config_name, bundle)
+            )
+    # the executor has waited for every stage, so a failed one leaves none running
+
+    try:
+        for stage in stages:
+            stage.result()
+        if keep_artifacts:
+            bundle.write_to(workspace or os.getcwd())
+        # the form needs paths, so the files only go to a temporary directory
+        with bundle.materialize() as paths:
+            files = {
+                "zipToUpload": paths[f"{filename}.zip"],
+                "vmecToUpload": paths["vmec_runs.csv"],
+                "configToUpload": paths["configurations.csv"],
+            }
+            if uploadPlots:
+                files["surfaceToUpload"] = paths[f"{filename}_surface.webp"]
+                files["plot3dToUpload"] = paths[f"{filename}_3d.html"]
+            if isDeviceNew:
+                files["deviceToUpload"] = paths["devices_and_concepts.csv"]
+            # invalid rows are rejected before anything is uploaded
+            check_upload_files(files)
+            driver = login.result()
+            print("Uploading to database...\n")
+            try:
+                message = submit_upload_form(driver, files, confirm_id="confirmVmec")
+                status = UPLOADED
+                print(message)
+            except UploadFormError:
+                # a form that does not match is not a rejection of the upload
+                raise
+            except Exception as e:
+                message = str(e)
+                status = FAILED
+                print(f"An error occurred during upload: {e}")
+        if ledger is not None:
+            ledger.record(key, status, message, name=config_name, source=wout_path)
+    finally:
+        if login.exception() is None:
+            login.result().quit()
+        bundle.close()
+        if owned:
+            ledger.close()
@@ -1,11 +1,26 @@
-import csv
-import os
 from datetime import date
 
+from .artifacts import _in_workspace
+from .writers import _append_rows_to_csv
+
+
+def _device_row(name=None, description=None):
+    """Return the devices_and_concepts row of a device/concept."""
+    devices_and_concepts = {}
+
+    devices_and_concepts["name"] = name
+    devices_and_concepts["description"] = description
+
+    today = date.today()
+    devices_and_concepts["date_created"] = today
+    devices_and_concepts["date_updated"] = today
+    return devices_and_concepts
+
 
 def device_or_concept_to_csv(
     name=None,
     description=None,
+    workspace=None,
 ):
     """Save device/concept info as a csv for database upload.
 
@@ -15,33 +30,16 @@ def device_or_concept_to_csv(
         name of the device
     description : str
         description of the device/concept
+    workspace : str
+        directory to write ``devices_and_concepts.csv`` to, created if needed.
+        Defaults to the current working directory
 
     Returns
     -------
         None
     """
-    devices_and_concepts = {}
-
-    devices_csv_name = "devices_and_concepts.csv"
-
-    devices_and_concepts["name"] = name
-    devices_and_concepts["description"] = description
-
-    today = date.today()
-    devices_and_concepts["date_created"] = today
-    devices_and_concepts["date_updated"] = today
+    devices_csv_name = _in_workspace(workspace, "devices_and_concepts.csv")
 
-    csv_columns = list(devices_and_concepts.keys())
-    csv_columns.sort()
-    csv_exists = os.path.isfile(devices_csv_name)
-
-    try:
-        with open(devices_csv_name, "a+") as csvfile:
-            writer = csv.DictWriter(csvfile, fieldnames=csv_columns)
-            if not csv_exists:
-                writer.writeheader()  # only need header if file did not exist already
-            writer.writerow(devices_and_concepts)
-    except OSError:
-        print("I/O error")
+    _append_rows_to_csv(devices_csv_name, [_device_row(name, description)])
 
     return None
@@ -0,0 +1,131 @@
+"""Evaluation of boundary Fourier series on a grid of angles."""
+
+import numpy as np
+
+
+def fourier_grid(m, n, cos_coeffs, sin_coeffs, theta, phi, chunk_size=256):
+    """Evaluate a double Fourier series on a tensor grid of angles.
+
+    Evaluates ``sum_k c_k cos(m_k theta - n_k phi) + s_k sin(m_k theta - n_k phi)``
+    on the tensor grid of ``theta`` and ``phi``. The angle difference is split
+    with the sum formulas into products of 1D factors, so the series is
+    accumulated with matrix products over chunks of modes and the memory used
+    is that of one grid plus ``chunk_size`` rows of factors, independent of the
+    number of modes.
+
+    Parameters
+    ----------
+    m, n : ndarray, shape(num_modes,)
+        Poloidal and toroidal mode numbers.
+    cos_coeffs, sin_coeffs : ndarray, shape(num_modes,) or None
+        Coefficients of the cos and sin terms, None if there are none.
+    theta, phi : ndarray
+        Poloidal and toroidal angles of the grid.
+    chunk_size : int, optional
+        Number of modes evaluated at once (default 256).
+
+    Returns
+    -------
+    values : ndarray, shape(theta.size, phi.size)
+        The series on the grid.
+    """
+    m = np.asarray(m, dtype=float)
+    n = np.asarray(n, dtype=float)
+    theta = np.atleast_1d(theta)
+    phi = np.atleast_1d(phi)
+    terms = [
+        np.zeros_like(m) if c is None else np.asarray(c, dtype=float)
+        for c in (cos_coeffs, sin_coeffs)
+    ]
+    values = np.zeros((theta.size, phi.size))
+    for start in range(0, m.size, chunk_size):
+        chunk = slice(start, start + chunk_size)
+        mt = np.outer(m[chunk], theta)
+        nphi = np.outer(n[chunk], phi)
+        cos_m, sin_m = np.cos(mt), np.sin(mt)
+        cos_n, sin_n = np.cos(nphi), np.sin(nphi)
+        c, s = terms[0][chunk, None], terms[1][chunk, None]
+        # cos(a - b) = cos a cos b + sin a sin b, sin(a - b) = sin a cos b - cos a sin b
+        values += (c * cos_m + s * sin_m).T @ cos_n
+        values += (c * sin_m - s * cos_m).T @ sin_n
+    return values
+
+
+def fourier_extrema(m, n, cos_coeffs, sin_coeffs, theta, phi, chunk_size=256):
+    """Return the minimum and maximum of a double Fourier series on a grid.
+
+    Parameters are those of ``fourier_grid``.
+
+    Returns
+    -------
+    min, max : float
+        Extrema of the series on the grid.
+    """
+    values = fourier_grid(m, n, cos_coeffs, sin_coeffs, theta, phi, chunk_size)
+    return values.min(), values.max()
+
+
+def boundary_excursions(m, n, RBC, RBS, ZBS, ZBC, ntheta=101, nphi=101):
+    """Return the radial and vertical extent of a boundary surface.
+
+    Parameters
+    ----------
+    m, n : ndarray, shape(num_modes,)
+        Poloidal and toroidal mode numbers, ``n`` including the number of field
+        periods as in VMEC's ``xn``.
+    RBC, RBS, ZBS, ZBC : ndarray, shape(num_modes,) or None
+        Fourier coefficients of R and Z, None for terms that vanish by
+        stellarator symmetry.
+    ntheta, nphi : int, optional
+        Number of poloidal and toroidal angles in [0, 2pi] the surface is
+        evaluated at (default 101).
+
+    Returns
+    -------
+    excursions : dict of float
+        ``R_excursion`` and ``Z_excursion``, the difference between the largest
+        and smallest R and Z on the surface.
+    """
+    theta = np.linspace(0, 2 * np.pi, ntheta)
+    phi = np.linspace(0, 2 * np.pi, nphi)
+    R_min, R_max = fourier_extrema(m, n, RBC, RBS, theta, phi)
+    Z_min, Z_max = fourier_extrema(m, n, ZBC, ZBS, theta, phi)
+    return {"R_excursion": R_max - R_min, "Z_excursion": Z_max - Z_min}
+
+
+def truncate_spectrum(m, n, coeffs, threshold):
+    """Drop the modes of a Fourier spectrum with small amplitude.
+
+    A mode is kept if any of its coefficients exceeds ``threshold`` times the
+    largest coefficient of the spectrum in absolute value, which for a
+    boundary is usually the major radius.
+
+    Parameters
+    ----------
+    m, n : ndarray, shape(num_modes,)
+        Poloidal and toroidal mode numbers.
+    coeffs : dict of ndarray, shape(num_modes,)
+        Coefficients of the modes, e.g. ``RBC``, ``RBS``, ``ZBS`` and ``ZBC``.
+    threshold : float
+        Amplitude relative to the largest coefficient below which modes are
+        dropped. 0 drops only the modes whose coefficients are all zero.
+
+    Returns
+    -------
+    m, n : ndarray, shape(num_kept,)
+        Mode numbers of the kept modes.
+    coeffs : dict of ndarray, shape(num_kept,)
+        Coefficients of the kept modes.
+    error : float
+        Sum of the absolute values of the dropped coefficients, an upper bound
+        of the pointwise error of every series of the spectrum.
+    """
+    amplitude = np.max(np.abs(np.stack(list(coeffs.values()))), axis=0)
+    keep = amplitude > threshold * amplitude.max()
+    error = sum(np.abs(c[~keep]).sum() for c in coeffs.values())
+    return (
+        np.asarray(m)[keep],
+        np.asarray(n)[keep],
+        {key: np.asarray(c)[keep] for key, c in coeffs.items()},
+        float(error),
+    )
@@ -4,9 +4,27 @@ from selenium import webdriver
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.support.ui import WebDriverWait
+from selenium.common.exceptions import TimeoutException
 from desc.equilibrium import Equilibrium
+from .schema import check_csv
 from .urls import HOME_PAGE
 
+# tables of the CSV files of the upload form, by the id of their input
+_UPLOAD_TABLES = {
+    "descToUpload": "desc_runs",
+    "vmecToUpload": "vmec_runs",
+    "configToUpload": "configurations",
+    "deviceToUpload": "devices_and_concepts",
+}
+
+
+class UploadError(RuntimeError):
+    """Raised when the website rejects an upload, with its error message."""
+
+
+class UploadFormError(UploadError):
+    """Raised when the upload page lacks an input or button of the form."""
+
 
 def get_driver():
     """Initialize a webdriver for use in uploading to the database."""
@@ -135,3 +153,99 @@ def perform_login(driver, username, password):
     if "login" in driver.current_url:
         driver.quit()
         raise ValueError("Login failed. Please check your username and password.")
+
+
+def open_upload_page(username, password):
+    """Start a webdriver, log in to the database website and open the upload page.
+
+    Parameters
+    ----------
+    username : str
+        Username for the database website.
+    password : str
+        Password for the database website.
+
+    Returns
+    -------
+    driver : selenium.webdriver
+        The logged in webdriver, to be quit by the caller.
+    """
+    driver = get_driver()
+    perform_login(driver, username, password)
+    driver.get(f"{HOME_PAGE}/upload/")
+    return driver
+
+
+def _form_element(driver, element_id, timeout=10):
+    """Return the element of the upload form with id ``element_id``."""
+    try:
+        return WebDriverWait(driver, timeout).until(
+            EC.presence_of_element_located((By.ID, element_id))
+        )
+    except TimeoutException:
+        raise UploadFormError(
+            f"The upload page has no element with id {element_id!r}. The form "
+            "of the website may have changed, nothing was uploaded."
+        ) from None
+
+
+def submit_upload_form(driver, files, confirm_id="confirmDesc", timeout=30):
+    """Fill the upload form with the given files, submit it and return the response.
+
+    Parameters
+    ----------
+    driver : selenium.webdriver
+        Logged in webdriver on the upload page.
+    files : dict
+        Paths of the files to upload keyed by the id of their form input.
+        Entries that are None are skipped.
+    confirm_id : str, optional
+        Id of the button submitting the form (default ``"confirmDesc"``).
+    timeout : float, optional
+        Seconds to wait for the response of the website (default 30).
+
+    Returns
+    -------
+    message : str
+        Text of the success message shown by the website.
+
+    Raises
+    ------
+    UploadFormError
+        If the upload page has no element with one of the ids, e.g. because
+        the form of the website changed.
+    UploadError
+        If the website shows an error message instead.
+    """
+    for element_id, filepath in files.items():
+        if filepath is None:
+            continue
+        _form_element(driver, element_id).send_keys(os.path.abspath(filepath))
+
+    _form_element(driver, confirm_id).click()
+    WebDriverWait(driver, timeout).until(
+        lambda d: d.find_elements(By.CSS_SELECTOR, ".success-div, .error-div")
+    )
+    response = driver.find_element(By.CSS_SELECTOR, ".success-div, .error-div")
+    if "error-div" in (response.get_attribute("class") or "").split():
+        raise UploadError(response.text)
+    return response.text
+
+
+def check_upload_files(files):
+    """Check the CSV files of an upload against the schemas of their tables.
+
+    Parameters
+    ----------
+    files : dict
+        Paths of the files to upload keyed by the id of their form input, as
+        passed to ``submit_upload_form``.
+
+    Raises
+    ------
+    SchemaError
+        If the rows of a CSV file do not match the schema of their table.
+    """
+    for element_id, table in _UPLOAD_TABLES.items():
+        if files.get(element_id) is not None:
+            check_csv(files[element_id], table)
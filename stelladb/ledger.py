@@ -0,0 +1,165 @@
+"""Local ledger of uploads to the database, keyed by the content they upload."""
+
+import os
+import sqlite3
+import threading
+from datetime import datetime
+
+from .cache import cache_dir, hash_content
+
+# outcomes of an upload recorded in the ledger
+UPLOADED = "uploaded"
+FAILED = "failed"
+
+
+def ledger_path():
+    """Return the path of the default ledger, ``uploads.sqlite`` in ``cache_dir()``."""
+    return os.path.join(cache_dir(), "uploads.sqlite")
+
+
+def upload_key(content, metadata):
+    """Return the ledger key of an upload.
+
+    Parameters
+    ----------
+    content : list of str
+        Content hashes of the uploaded equilibria, ``cache.desc_content_key``
+        or ``cache.vmec_content_key``, which cover the coefficients, profiles
+        and resolution only.
+    metadata : dict
+        Settings of the upload that end up in the uploaded rows and files,
+        such as the configuration name, description and provenance.
+
+    Returns
+    -------
+    key : str
+        Hex digest, the same for the same equilibria uploaded with the same
+        metadata regardless of the file they are stored in.
+    """
+    return hash_content("upload", *content, repr(sorted(metadata.items())))
+
+
+class UploadLedger:
+    """SQLite record of the outcome of every upload, by ``upload_key``.
+
+    Every entry holds the outcome of the last upload of its key, ``"uploaded"``
+    or ``"failed"``, when it happened and the message of the website or the
+    error. Lookups are by primary key, so checking a file before an upload is
+    a single indexed query. The database can be shared by several threads and
+    processes. Used as a context manager, the connection is closed on exit.
+
+    Parameters
+    ----------
+    path : str, optional
+        Database file, created if it does not exist. Defaults to
+        ``ledger_path()``.
+    """
+
+    def __init__(self, path=None):
+        self.path = ledger_path() if path is None else path
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(
+            self.path, timeout=30, check_same_thread=False, isolation_level=None
+        )
+        # readers are not blocked by the writes of concurrent uploads
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("""CREATE TABLE IF NOT EXISTS uploads (
+                key TEXT PRIMARY KEY,
+                name TEXT,
+                source TEXT,
+                status TEXT NOT NULL,
+                message TEXT,
+                timestamp TEXT NOT NULL
+            )""")
+
+    def get(self, key):
+        """Return the entry of ``key`` as a dict, or None if it was never uploaded."""
+        with self._lock:
+            cursor = self._connection.execute(
+                "SELECT * FROM uploads WHERE key = ?", (key,)
+            )
+            row = cursor.fetchone()
+        if row is None:
+            return None
+        return dict(zip([c[0] for c in cursor.description], row))
+
+    def is_uploaded(self, key):
+        """Return whether the last upload of ``key`` succeeded."""
+        entry = self.get(key)
+        return entry is not None and entry["status"] == UPLOADED
+
+    def record(self, key, status, message=None, name=None, source=None):
+        """Record the outcome of an upload of ``key``, replacing the previous one.
+
+        Parameters
+        ----------
+        key : str
+            Key of the upload, see ``upload_key``.
+        status : {"uploaded", "failed"}
+            Outcome of the upload.
+        message : str, optional
+            Response of the website or error message.
+        name : str, optional
+            Configuration name of the upload.
+        source : str, optional
+            File the equilibrium was read from.
+        """
+        if status not in (UPLOADED, FAILED):
+            raise ValueError(
+                f"status must be {UPLOADED!r} or {FAILED!r}, got {status!r}"
+            )
+        timestamp = datetime.now().isoformat(timespec="seconds")
+        with self._lock:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO uploads VALUES (?, ?, ?, ?, ?, ?)",
+                (key, name, source, status, message, timestamp),
+            )
+
+    def entries(self, status=None):
+        """Return the entries as dicts, oldest first, those of ``status`` if given."""
+        query = "SELECT * FROM uploads"
+        params = ()
+        if status is not None:
+            query += " WHERE status = ?"
+            params = (status,)
+        with self._lock:
+            cursor = self._connection.execute(query + " ORDER BY timestamp", params)
+            rows = cursor.fetchall()
+        names = [c[0] for c in cursor.description]
+        return [dict(zip(names, row)) for row in rows]
+
+    def close(self):
+        self._connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def _already_uploaded(ledger, key, name):
+    """Return whether ``ledger`` records the upload ``key`` as done, saying so if so."""
+    entry = ledger.get(key)
+    if entry is None or entry["status"] != UPLOADED:
+        return False
+    print(
+        f"{name} was already uploaded on {entry['timestamp']}, skipping it. "
+        "Use force=True to upload it again."
+    )
+    return True
+
+
+def _open_ledger(ledger):
+    """Return the UploadLedger of a ``ledger`` argument and whether to close it.
+
+    ``ledger`` is True for the default ledger, a path, an UploadLedger, or
+    False or None to not use one.
+    """
+    if ledger is None or ledger is False:
+        return None, False
+    if isinstance(ledger, UploadLedger):
+        return ledger, False
+    return UploadLedger(None if ledger is True else ledger), True
@@ -0,0 +1,515 @@
+"""Evaluation of the physics quantities stored in the database tables."""
+
+from collections import OrderedDict
+
+import numpy as np
+
+from desc.backend import jit, jnp, vmap
+from desc.basis import zernike_radial
+from desc.compute import compute as compute_fun
+from desc.compute import data_index, get_data_deps, get_params, get_profiles
+from desc.compute import get_transforms
+from desc.grid import LinearGrid, QuadratureGrid
+from desc.vmec_utils import ptolemy_identity_rev
+
+from .cache import _DESC_PROFILES
+from .geometry import boundary_excursions
+from .profile_analysis import polynomial_extrema
+
+_PARAMETERIZATION = "desc.equilibrium.equilibrium.Equilibrium"
+
+# quantities that need the full volume quadrature grid
+_VOLUME_KEYS = [
+    "R0/a",
+    "a",
+    "R0",
+    "V",
+    "<|B|>_vol",
+    "<beta>_vol",
+    "a_major/a_minor",
+    "|F|_normalized",
+]
+# flux functions, all evaluated together on a single radial grid
+_PROFILE_KEYS = ["p", "iota", "current", "D_Mercier"]
+
+# metrics kernels, keyed by resolution signature, least recently used first;
+# compiled once a signature is evaluated for more than one equilibrium
+_KERNELS = OrderedDict()
+_MAX_KERNELS = 16
+
+# boundary spectrum matrices, keyed by basis type and resolution
+_BOUNDARY_TRANSFORMS = OrderedDict()
+
+# grid_scale coarsens or refines L_grid, M_grid and N_grid of every grid, n_rho is
+# the number of stored profile and D_Mercier samples
+FIDELITY_LEVELS = {
+    "preview": {"grid_scale": 0.5, "n_rho": 5},
+    "standard": {"grid_scale": 1.0, "n_rho": 10},
+    "full": {"grid_scale": 1.0, "n_rho": 30},
+}
+# error estimates evaluate a second time on grids coarsened by this factor, which
+# compiles a kernel of its own, and report the difference
+_ERROR_SCALE = 0.5
+
+
+def _metric_rho(n_rho=10):
+    """Return the rho samples of the stored profiles and of D_Mercier."""
+    rho = np.linspace(0, 1.0, n_rho, endpoint=True)
+    rho[0] = 1e-12
+    rho_mercier = np.linspace(0.1, 1.0, n_rho, endpoint=True)
+    return rho, rho_mercier
+
+
+def _scale_resolution(res, grid_scale):
+    """Scale a grid resolution, keeping at least one mode where there was one."""
+    return max(int(np.ceil(res * grid_scale)), min(res, 1))
+
+
+def _surface_grid_sym(eq, keys):
+    """Whether flux surface integrals of ``keys`` may use a symmetric grid."""
+    deps = get_data_deps(keys, obj=_PARAMETERIZATION) + list(keys)
+    return bool(eq.sym) and all(
+        data_index[_PARAMETERIZATION][dep]["grid_requirement"].get("sym", True)
+        and not data_index[_PARAMETERIZATION][dep]["grid_requirement"].get(
+            "can_fft2", False
+        )
+        for dep in deps
+    )
+
+
+def plan_desc_metrics(eq, grid_scale=1.0, n_rho=10):
+    """Build the grids, transforms and profiles needed for all metrics of ``eq``.
+
+    The profile quantities and D_Mercier are merged onto one radial grid that
+    already resolves full flux surfaces, so ``Equilibrium.compute`` never has to
+    rebuild transforms on an override grid.
+
+    Parameters
+    ----------
+    eq : Equilibrium
+        Equilibrium to plan the evaluation for.
+    grid_scale : float, optional
+        Factor applied to ``eq.L_grid``, ``eq.M_grid`` and ``eq.N_grid``.
+    n_rho : int, optional
+        Number of radial samples of the stored profiles and of D_Mercier.
+
+    Returns
+    -------
+    plan : dict
+        Transforms and profiles per grid, and the indices of the stored profile
+        and D_Mercier samples within the merged radial grid.
+    """
+    rho, rho_mercier = _metric_rho(n_rho)
+    rho_all = np.union1d(rho, rho_mercier)
+    L_grid, M_grid, N_grid = (
+        _scale_resolution(res, grid_scale) for res in (eq.L_grid, eq.M_grid, eq.N_grid)
+    )
+    grids = {
+        "volume": QuadratureGrid(L_grid, M_grid, N_grid, eq.NFP),
+        "profile": LinearGrid(
+            rho=rho_all,
+            M=M_grid,
+            N=N_grid,
+            NFP=eq.NFP,
+            sym=_surface_grid_sym(eq, _PROFILE_KEYS),
+        ),
+    }
+    keys = {"volume": _VOLUME_KEYS, "profile": _PROFILE_KEYS}
+    return {
+        "keys": keys,
+        "transforms": {
+            name: get_transforms(keys[name], obj=eq, grid=grid)
+            for name, grid in grids.items()
+        },
+        "profiles": {
+            name: get_profiles(keys[name], obj=eq, grid=grid)
+            for name, grid in grids.items()
+        },
+        "rho": rho,
+        "rho_mercier": rho_mercier,
+        "profile_idx": np.searchsorted(rho_all, rho),
+        "mercier_idx": np.searchsorted(rho_all, rho_mercier),
+    }
+
+
+def _evaluate_plan(plan, params):
+    """Evaluate every planned quantity and reduce it to the stored metrics."""
+    data = {
+        name: compute_fun(
+            _PARAMETERIZATION,
+            plan["keys"][name],
+            params=params,
+            transforms=plan["transforms"][name],
+            profiles=plan["profiles"][name],
+        )
+        for name in plan["keys"]
+    }
+    vol = data["volume"]
+    prof = data["profile"]
+    profile_grid = plan["transforms"]["profile"]["grid"]
+
+    def flux_function(name, idx):
+        return profile_grid.compress(prof[name])[idx]
+
+    return {
+        "aspect_ratio": vol["R0/a"],
+        "minor_radius": vol["a"],
+        "major_radius": vol["R0"],
+        "volume": vol["V"],
+        "volume_averaged_B": vol["<|B|>_vol"],
+        "volume_averaged_beta": vol["<beta>_vol"],
+        "average_elongation": vol["a_major/a_minor"].mean(),
+        "max_normalized_F_error": abs(vol["|F|_normalized"]).max(),
+        "pressure": flux_function("p", plan["profile_idx"]),
+        "iota": flux_function("iota", plan["profile_idx"]),
+        "current": flux_function("current", plan["profile_idx"]),
+        "D_Mercier": flux_function("D_Mercier", plan["mercier_idx"]),
+    }
+
+
+def _basis_key(basis):
+    return (
+        type(basis).__name__,
+        basis.L,
+        basis.M,
+        basis.N,
+        basis.NFP,
+        basis.sym,
+        basis.spectral_indexing,
+    )
+
+
+def _boundary_transform(basis):
+    """Return the matrices mapping Zernike coefficients to the boundary spectrum.
+
+    The evaluation of the basis at rho=1 and the Ptolemy identity are both
+    linear, so they are combined into one matrix per output ("c" for the
+    cos(m*theta - n*phi) and "s" for the sin(m*theta - n*phi) coefficients).
+    Matrices are cached per basis type and resolution.
+    """
+    key = _basis_key(basis)
+    transform = _BOUNDARY_TRANSFORMS.get(key)
+    if transform is not None:
+        _BOUNDARY_TRANSFORMS.move_to_end(key)
+        return transform
+
+    M, N = basis.M, basis.N
+    l, m, n = basis.modes.T
+    # the full double Fourier series zernike_to_fourier evaluates onto
+    m_mn = np.repeat(np.arange(-M, M + 1), 2 * N + 1)
+    n_mn = np.tile(np.arange(-N, N + 1), 2 * M + 1)
+    to_fourier = np.zeros((l.size, m_mn.size))
+    to_fourier[np.arange(l.size), (m + M) * (2 * N + 1) + (n + N)] = (
+        np.where(m < 0, -1.0, 1.0) * zernike_radial(np.array([[1.0]]), l, m)[0]
+    )
+    xm, xn, s, c = ptolemy_identity_rev(m_mn, n_mn, np.eye(m_mn.size))
+    transform = {"m": xm, "n": xn, "s": to_fourier @ s, "c": to_fourier @ c}
+
+    _BOUNDARY_TRANSFORMS[key] = transform
+    if len(_BOUNDARY_TRANSFORMS) > _MAX_KERNELS:
+        _BOUNDARY_TRANSFORMS.popitem(last=False)
+    return transform
+
+
+def boundary_spectra(eqs, include_lambda=False):
+    """Return the boundary Fourier modes and coefficients of several equilibria.
+
+    Equilibria with the same bases are converted together with one matrix
+    multiply per quantity.
+
+    Parameters
+    ----------
+    eqs : list of Equilibrium
+        Equilibria to convert.
+    include_lambda : bool, optional
+        If True, also return the boundary spectrum of the stream function
+        lambda as ``LMNS`` and ``LMNC`` (default False).
+
+    Returns
+    -------
+    spectra : list of dict of ndarray
+        Mode numbers ``m``, ``n`` and coefficients ``RBC``, ``RBS``, ``ZBS``,
+        ``ZBC`` of each equilibrium, in the order of ``eqs``. ``RBS``, ``ZBC``
+        and ``LMNC`` are zero for stellarator symmetric equilibria.
+    """
+    fields = [("R", "RBC", "RBS"), ("Z", "ZBC", "ZBS")]
+    if include_lambda:
+        fields.append(("L", "LMNC", "LMNS"))
+    # coefficients that vanish for stellarator symmetric equilibria
+    asym = ("RBS", "ZBC", "LMNC")
+
+    spectra = [{} for _ in eqs]
+    for field, cos_name, sin_name in fields:
+        groups = {}
+        for i, eq in enumerate(eqs):
+            basis = getattr(eq, field + "_basis")
+            groups.setdefault(_basis_key(basis), (basis, []))[1].append(i)
+        for basis, idx in groups.values():
+            transform = _boundary_transform(basis)
+            lmn = np.stack([np.asarray(getattr(eqs[i], field + "_lmn")) for i in idx])
+            coefficients = {
+                cos_name: lmn @ transform["c"],
+                sin_name: lmn @ transform["s"],
+            }
+            for j, i in enumerate(idx):
+                spectrum = spectra[i]
+                spectrum.setdefault("m", transform["m"])
+                spectrum.setdefault("n", transform["n"])
+                for name, val in coefficients.items():
+                    if eqs[i].sym and name in asym:
+                        spectrum[name] = np.zeros(val.shape[1])
+                    else:
+                        spectrum[name] = val[j]
+    return spectra
+
+
+def desc_boundary_spectrum(eq, include_lambda=False):
+    """Return the boundary Fourier modes and coefficients of ``eq``.
+
+    The returned arrays ``RBS`` and ``ZBC`` are zero for stellarator symmetric
+    equilibria. See ``boundary_spectra``.
+    """
+    return boundary_spectra([eq], include_lambda)[0]
+
+
+def _resolution_signature(eq, params):
+    """Return a key under which equilibria can share one evaluation plan."""
+    profiles = []
+    for name in _DESC_PROFILES:
+        profile = getattr(eq, name, None)
+        knots = getattr(profile, "knots", None)
+        profiles.append(
+            (
+                type(profile).__name__,
+                None if knots is None else tuple(np.asarray(knots).tolist()),
+            )
+        )
+    return (
+        eq.L,
+        eq.M,
+        eq.N,
+        eq.L_grid,
+        eq.M_grid,
+        eq.N_grid,
+        eq.NFP,
+        bool(eq.sym),
+        eq.spectral_indexing,
+        tuple(profiles),
+        tuple((key, np.shape(val)) for key, val in sorted(params.items())),
+    )
+
+
+def _get_kernel(signature, eq, grid_scale=1.0, n_rho=10):
+    """Return the metrics kernel for ``signature``, building its plan from ``eq``.
+
+    The transforms and profiles of the plan are passed to the kernel as
+    arguments rather than baked in, so later equilibria with the same
+    signature only supply their coefficient arrays and reuse the plan and the
+    compiled code. ``uses`` counts the calls for the signature, so code is only
+    compiled, see ``_compiled``, for signatures that come back.
+    """
+    signature = (signature, grid_scale, n_rho)
+    kernel = _KERNELS.get(signature)
+    if kernel is not None:
+        _KERNELS.move_to_end(signature)
+        kernel["uses"] += 1
+        return kernel
+
+    plan = plan_desc_metrics(eq, grid_scale, n_rho)
+    static = {key: plan[key] for key in ("keys", "profile_idx", "mercier_idx")}
+
+    def evaluate(params, transforms, profiles):
+        return _evaluate_plan(
+            {**static, "transforms": transforms, "profiles": profiles}, params
+        )
+
+    kernel = {"plan": plan, "evaluate": evaluate, "uses": 1}
+    _KERNELS[signature] = kernel
+    if len(_KERNELS) > _MAX_KERNELS:
+        _KERNELS.popitem(last=False)
+    return kernel
+
+
+def _compiled(kernel, name):
+    """Return the compiled ``"single"`` or vmapped ``"batched"`` evaluation."""
+    if name not in kernel:
+        evaluate = kernel["evaluate"]
+        if name == "batched":
+            evaluate = vmap(evaluate, in_axes=(0, None, None))
+        kernel[name] = jit(evaluate)
+    return kernel[name]
+
+
+def _profile_extrema(eq, metrics):
+    """Return the extrema of the pressure and |iota| profiles on rho in [0, 1].
+
+    Power series profiles are analysed exactly, all at once. Other profiles,
+    e.g. iota of a current constrained equilibrium, fall back to the extrema
+    of their sampled values.
+    """
+    extrema = {}
+    exact = []
+    for name, absolute in (("pressure", False), ("iota", True)):
+        profile = getattr(eq, name, None)
+        if type(profile).__name__ == "PowerSeriesProfile":
+            exact.append((name, absolute, profile))
+            continue
+        values = np.abs(metrics[name]) if absolute else metrics[name]
+        extrema[name + "_min"], extrema[name + "_max"] = values.min(), values.max()
+    if exact:
+        degree = max(int(p.basis.modes[:, 0].max()) for _, _, p in exact)
+        coeffs = np.zeros((len(exact), degree + 1))
+        for row, (_, _, profile) in zip(coeffs, exact):
+            row[profile.basis.modes[:, 0]] = np.asarray(profile.params)
+        minima, maxima = polynomial_extrema(coeffs, absolute=[a for _, a, _ in exact])
+        for (name, _, _), low, high in zip(exact, minima, maxima):
+            extrema[name + "_min"], extrema[name + "_max"] = low, high
+    return extrema
+
+
+def _finalize_metrics(plan, spectrum, metrics, eq):
+    """Convert evaluated metrics to numpy and attach the boundary quantities."""
+    metrics = {key: np.asarray(val) for key, val in metrics.items()}
+    metrics["profile_rho"] = plan["rho"]
+    metrics["mercier_rho"] = plan["rho_mercier"]
+    metrics.update(_profile_extrema(eq, metrics))
+    metrics.update(spectrum)
+    metrics.update(
+        boundary_excursions(
+            spectrum["m"],
+            spectrum["n"] * eq.NFP,
+            spectrum["RBC"],
+            spectrum["RBS"],
+            spectrum["ZBS"],
+            spectrum["ZBC"],
+        )
+    )
+    return metrics
+
+
+def _evaluate_groups(eqs, params, groups, grid_scale, n_rho):
+    """Evaluate every equilibrium with one call per signature group.
+
+    Groups of several equilibria go through one compiled, vectorized call. A
+    single equilibrium of a signature not seen before is evaluated eagerly, as
+    compiling would cost more than it saves, e.g. for the steps of a
+    continuation family that all differ in resolution.
+    """
+    metrics = [None] * len(eqs)
+    plans = [None] * len(eqs)
+    for signature, idx in groups.items():
+        kernel = _get_kernel(signature, eqs[idx[0]], grid_scale, n_rho)
+        plan = kernel["plan"]
+        args = (plan["transforms"], plan["profiles"])
+        if len(idx) == 1:
+            evaluate = kernel["evaluate"]
+            if kernel["uses"] > 1:
+                evaluate = _compiled(kernel, "single")
+            out = {
+                key: val[None] for key, val in evaluate(params[idx[0]], *args).items()
+            }
+        else:
+            stacked = {
+                key: jnp.stack([jnp.asarray(params[i][key]) for i in idx])
+                for key in params[idx[0]]
+            }
+            out = _compiled(kernel, "batched")(stacked, *args)
+        for j, i in enumerate(idx):
+            metrics[i] = {key: np.asarray(val[j]) for key, val in out.items()}
+            plans[i] = plan
+    return metrics, plans
+
+
+def compute_family_metrics(eqs, fidelity="standard", estimate_errors=False):
+    """Compute every physics quantity stored in the database for several equilibria.
+
+    Equilibria that share a resolution signature (resolution, symmetry, spectral
+    indexing and profile types) are evaluated together: their stacked
+    coefficient arrays are pushed through one compiled kernel in a single
+    vectorized pass. An equilibrium alone with its signature is evaluated
+    without compiling. Kernels are kept in an in-process registry, so later
+    calls with a known signature skip planning, and once compiled, tracing and
+    compilation.
+
+    Parameters
+    ----------
+    eqs : list of Equilibrium or EquilibriaFamily
+        Equilibria to evaluate.
+    fidelity : {"preview", "standard", "full"}, optional
+        Grid resolution to evaluate at, see ``FIDELITY_LEVELS``. ``"preview"``
+        halves the volume and flux surface grids and stores 5 profile samples,
+        ``"full"`` stores 30 profile samples instead of 10.
+    estimate_errors : bool, optional
+        If True, also evaluate every metric on grids coarsened by
+        ``_ERROR_SCALE`` and return the difference as an estimate of its
+        discretization error (default False). This compiles and runs a second
+        kernel, which roughly doubles the cost of equilibria of a new
+        resolution.
+
+    Returns
+    -------
+    metrics : list of dict of ndarray
+        Metrics of each equilibrium, in the order of ``eqs``. See
+        ``compute_desc_metrics``.
+    """
+    if fidelity not in FIDELITY_LEVELS:
+        raise ValueError(
+            f"fidelity must be one of {list(FIDELITY_LEVELS)}, got {fidelity!r}"
+        )
+    level = FIDELITY_LEVELS[fidelity]
+
+    keys = _VOLUME_KEYS + _PROFILE_KEYS
+    params = [get_params(keys, obj=eq) for eq in eqs]
+    groups = {}
+    for i, eq in enumerate(eqs):
+        groups.setdefault(_resolution_signature(eq, params[i]), []).append(i)
+
+    metrics, plans = _evaluate_groups(
+        eqs, params, groups, level["grid_scale"], level["n_rho"]
+    )
+    if estimate_errors:
+        coarse, _ = _evaluate_groups(
+            eqs, params, groups, level["grid_scale"] * _ERROR_SCALE, level["n_rho"]
+        )
+        for fine, rough in zip(metrics, coarse):
+            fine.update(
+                {
+                    f"{key}_error": np.max(np.abs(fine[key] - rough[key]))
+                    for key in rough
+                }
+            )
+    spectra = boundary_spectra(eqs)
+    return [
+        _finalize_metrics(plan, spectrum, m, eq)
+        for plan, spectrum, m, eq in zip(plans, spectra, metrics, eqs)
+    ]
+
+
+def compute_desc_metrics(eq, fidelity="standard", estimate_errors=False):
+    """Compute every physics quantity stored in the database for ``eq``.
+
+    All quantities are planned together and evaluated in one pass per grid, so
+    transforms and shared intermediate quantities are built only once.
+
+    Parameters
+    ----------
+    eq : Equilibrium
+        Equilibrium to evaluate.
+    fidelity : {"preview", "standard", "full"}, optional
+        Grid resolution to evaluate at, see ``FIDELITY_LEVELS``.
+    estimate_errors : bool, optional
+        If True, also estimate the discretization error of every metric, see
+        ``compute_family_metrics`` (default False).
+
+    Returns
+    -------
+    metrics : dict of ndarray
+        Unrounded scalar metrics, the pressure, iota and current profiles
+        sampled at ``profile_rho``, D_Mercier sampled at ``mercier_rho``, the
+        boundary Fourier spectrum, the R and Z excursions of the boundary and the
+        extrema of the pressure and of the absolute value of iota on rho in [0, 1]
+        (``pressure_min``, ``pressure_max``, ``iota_min``, ``iota_max``). With
+        ``estimate_errors`` every evaluated metric ``key`` also has an
+        estimated absolute error ``key + "_error"``.
+    """
+    return compute_family_metrics([eq], fidelity, estimate_errors)[0]
@@ -0,0 +1,101 @@
+"""Exact extrema of radial profiles from their polynomial and spline representations."""
+
+import numpy as np
+from numpy.polynomial import polynomial
+from scipy.interpolate import BSpline, PPoly
+
+
+def _interval_points(roots, interval):
+    """Return the interval endpoints and the real parts of roots inside it."""
+    lo, hi = interval
+    roots = np.real(np.concatenate([np.ravel(r) for r in roots] + [[lo, hi]]))
+    return np.unique(roots[(roots >= lo) & (roots <= hi)])
+
+
+def _reduce(values, absolute):
+    """Return the min and max of each row of values, of |values| where absolute."""
+    absolute = np.broadcast_to(absolute, values.shape[:1])
+    values = np.where(absolute[:, None], np.abs(values), values)
+    return values.min(axis=1), values.max(axis=1)
+
+
+def polynomial_extrema(coeffs, interval=(0.0, 1.0), absolute=False):
+    """Return the extrema of power series on an interval.
+
+    The extrema are attained at the endpoints or at roots of the derivative,
+    and for the absolute value also at roots of the series, so all series are
+    evaluated once at the union of these points instead of on a dense grid.
+
+    Parameters
+    ----------
+    coeffs : array_like, shape(num_profiles, degree + 1)
+        Coefficients of each series in increasing powers.
+    interval : tuple of float, optional
+        Interval to search (default (0, 1)).
+    absolute : bool or array_like of bool, optional
+        Whether to return the extrema of the absolute value, for all or for
+        each series (default False).
+
+    Returns
+    -------
+    min, max : ndarray, shape(num_profiles,)
+        Minimum and maximum of each series on the interval.
+    """
+    coeffs = np.atleast_2d(np.asarray(coeffs, dtype=float))
+    roots = []
+    for c in coeffs:
+        c = np.trim_zeros(c, "b")
+        if c.size > 2:
+            roots.append(polynomial.polyroots(polynomial.polyder(c)))
+        if c.size > 1:
+            roots.append(polynomial.polyroots(c))
+    x = _interval_points(roots, interval)
+    return _reduce(polynomial.polyval(x, coeffs.T), absolute)
+
+
+def _bspline(spline):
+    """Return a FITPACK spline, e.g. a ``UnivariateSpline``, as a ``BSpline``.
+
+    ``get_knots`` returns the end knots once while FITPACK repeats them
+    ``k + 1`` times, so the degree follows from the number of coefficients.
+    """
+    knots, coeffs = spline.get_knots(), spline.get_coeffs()
+    k = len(coeffs) - len(knots) + 1
+    t = np.concatenate([np.full(k, knots[0]), knots, np.full(k, knots[-1])])
+    return BSpline(t, coeffs, k)
+
+
+def spline_extrema(splines, interval=(0.0, 1.0), absolute=False):
+    """Return the extrema of 1D splines on an interval.
+
+    The splines are converted to piecewise polynomials and their extrema found
+    from the roots of the derivative, outside the knots the end pieces are
+    extrapolated as the splines themselves do. Splines with the same knots,
+    such as the profiles of one VMEC run, are handled as a single piecewise
+    polynomial with one root search.
+
+    Parameters
+    ----------
+    splines : list of UnivariateSpline
+        Splines to analyse, e.g. ``InterpolatedUnivariateSpline`` objects.
+    interval : tuple of float, optional
+        Interval to search (default (0, 1)).
+    absolute : bool or array_like of bool, optional
+        Whether to return the extrema of the absolute value, for all or for
+        each spline (default False).
+
+    Returns
+    -------
+    min, max : ndarray, shape(len(splines),)
+        Minimum and maximum of each spline on the interval.
+    """
+    pieces = [PPoly.from_spline(_bspline(spline)) for spline in splines]
+    if all(np.array_equal(p.x, pieces[0].x) for p in pieces):
+        pieces = [PPoly(np.stack([p.c for p in pieces], axis=-1), pieces[0].x)]
+    roots = []
+    for p in pieces:
+        roots += list(np.atleast_1d(p.derivative().roots(extrapolate=True)))
+        roots += list(np.atleast_1d(p.roots(extrapolate=True)))
+    x = _interval_points(roots, interval)
+    values = np.column_stack([p(x) for p in pieces])
+    return _reduce(values.T, absolute)
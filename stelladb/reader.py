@@ -0,0 +1,163 @@
+"""Lightweight reader for DESC ``.h5`` output files."""
+
+import pydoc
+
+import h5py
+import numpy as np
+
+from .cache import _DESC_PROFILES
+
+_RESOLUTION = ("L", "M", "N", "L_grid", "M_grid", "N_grid", "NFP")
+_COEFFICIENTS = ("R_lmn", "Z_lmn", "L_lmn")
+
+
+def _decode(value):
+    return value.decode("utf-8") if isinstance(value, bytes) else value
+
+
+def desc_header(eq):
+    """Return the header of an Equilibrium, as read by ``DescFile.headers``.
+
+    The header holds the resolution, symmetry, toroidal flux, spectral
+    coefficients and the type and parameters of every profile, which is all
+    ``desc_to_csv`` needs besides the computed metrics.
+    """
+    header = {name: int(getattr(eq, name)) for name in _RESOLUTION}
+    header["sym"] = bool(eq.sym)
+    header["spectral_indexing"] = str(eq.spectral_indexing)
+    header["Psi"] = float(eq.Psi)
+    for name in _COEFFICIENTS:
+        header[name] = np.asarray(getattr(eq, name))
+    profiles = {}
+    for name in _DESC_PROFILES:
+        profile = getattr(eq, name, None)
+        if profile is None:
+            profiles[name] = None
+            continue
+        knots = getattr(profile, "_knots", None)
+        profiles[name] = (
+            type(profile).__name__,
+            np.asarray(profile.params),
+            None if knots is None else np.asarray(knots),
+            getattr(profile, "_method", None),
+        )
+    header["profiles"] = profiles
+    return header
+
+
+def _group_header(group):
+    """Read the header of an Equilibrium stored in an h5 group.
+
+    Returns None if a profile is stored in a form whose parameters can not be
+    read without building the profile object, e.g. a sum of profiles.
+    """
+    header = {name: int(group["_" + name][()]) for name in _RESOLUTION}
+    header["sym"] = bool(group["_sym"][()])
+    header["spectral_indexing"] = str(_decode(group["_spectral_indexing"][()]))
+    header["Psi"] = float(group["_Psi"][()])
+    for name in _COEFFICIENTS:
+        # datasets are read here once, straight into the arrays that are hashed
+        header[name] = group["_" + name][()]
+    profiles = {}
+    for name in _DESC_PROFILES:
+        stored = group.get("_" + name)
+        if stored is None or isinstance(stored, h5py.Dataset):
+            profiles[name] = None
+            continue
+        if "_params" not in stored:
+            return None
+        knots = stored["_knots"][()] if "_knots" in stored else None
+        method = _decode(stored["_method"][()]) if "_method" in stored else None
+        profiles[name] = (
+            _decode(stored["__class__"][()]).rsplit(".", 1)[-1],
+            stored["_params"][()],
+            knots,
+            method,
+        )
+    header["profiles"] = profiles
+    return header
+
+
+class DescFile:
+    """A DESC ``.h5`` output file, opened once and read lazily.
+
+    The version and the per-equilibrium headers are read directly from the
+    datasets, so metrics that are already cached never require building the
+    Equilibrium. ``load`` builds it from the same open file on first use and
+    keeps it for later stages such as plotting.
+
+    Parameters
+    ----------
+    path : str
+        Path to an ``.h5`` file holding an Equilibrium or EquilibriaFamily.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._file = h5py.File(path, "r")
+        self._equilibrium = None
+        self.version = (
+            str(_decode(self._file["__version__"][()]))
+            if "__version__" in self._file
+            else "unknown"
+        )
+        self._class_path = str(_decode(self._file["__class__"][()]))
+        self.class_name = self._class_path.rsplit(".", 1)[-1]
+
+    @property
+    def is_family(self):
+        return self.class_name == "EquilibriaFamily"
+
+    def _member_groups(self, family=False):
+        if not self.is_family:
+            return [self._file]
+        members = self._file["_equilibria"]
+        names = sorted((k for k in members if k.isdigit()), key=int)
+        if not family:
+            names = names[-1:]
+        return [members[k] for k in names]
+
+    def headers(self, family=False):
+        """Return the headers of the stored equilibria.
+
+        Parameters
+        ----------
+        family : bool, optional
+            If True and the file holds an EquilibriaFamily, return the headers
+            of every step instead of only the last one.
+
+        Returns
+        -------
+        headers : list of dict or None
+            One header per equilibrium, None where it could only be read by
+            building the Equilibrium. Headers are read from the Equilibrium
+            directly once it has been loaded.
+        """
+        if self._equilibrium is not None:
+            return [desc_header(eq) for eq in self.members(family)]
+        return [_group_header(group) for group in self._member_groups(family)]
+
+    def load(self):
+        """Return the stored Equilibrium or EquilibriaFamily, building it once."""
+        if self._equilibrium is None:
+            # read from the already open file instead of opening it again by path
+            cls = pydoc.locate(self._class_path)
+            self._equilibrium = cls.load(self._file, file_format="hdf5")
+        return self._equilibrium
+
+    def members(self, family=False):
+        """Return the stored equilibria, the last step of a family unless ``family``."""
+        eq = self.load()
+        if type(eq).__name__ == "EquilibriaFamily":
+            return list(eq) if family else [eq[-1]]
+        return [eq]
+
+    def close(self):
+        if self._file.id.valid:
+            self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,353 @@
+"""Schemas of the database tables and validation of rows against them."""
+
+import csv
+import os
+from collections import namedtuple
+from datetime import date
+
+import numpy as np
+
+from .writers import ARRAY_FORMATS, read_sidecar, sidecar_path
+
+Column = namedtuple("Column", ["type", "nullable", "unit", "choices"])
+Column.__doc__ = """A column of a database table.
+
+Parameters
+----------
+type : {"str", "int", "float", "bool", "date", "int[]", "float[]"}
+    Type of the values, ``[]`` marking 1D arrays.
+nullable : bool
+    Whether the value may be missing.
+unit : str or None
+    Physical unit of the values.
+choices : tuple or None
+    Allowed values.
+"""
+
+
+def _col(type, nullable=True, unit=None, choices=None):
+    return Column(type, nullable, unit, choices)
+
+
+_CLASSES = ("QA", "QH", "QP", "QI", "OT", "OH", "AS")
+_CURRENT_SPECIFICATIONS = ("iota", "net enclosed current")
+_PROFILE_TYPES = ("power_series",)
+
+# columns shared by the runs tables of both codes
+_RUNS = {
+    "outputfile": _col("str", nullable=False),
+    "provenance": _col("str"),
+    "description": _col("str"),
+    "iota_profile": _col("float[]"),
+    "iota_max": _col("float"),
+    "iota_min": _col("float"),
+    "current_profile": _col("float[]", unit="A"),
+    "pressure_profile": _col("float[]", unit="Pa"),
+    "pressure_max": _col("float", unit="Pa"),
+    "pressure_min": _col("float", unit="Pa"),
+    "D_Mercier": _col("float[]"),
+    "D_Mercier_max": _col("float"),
+    "D_Mercier_min": _col("float"),
+    "date_created": _col("date", nullable=False),
+    "publicationid": _col("str"),
+}
+
+TABLES = {
+    "desc_runs": {
+        **_RUNS,
+        "version": _col("str", nullable=False),
+        "inputfilename": _col("str"),
+        "initialization_method": _col("str"),
+        "l_rad": _col("int", nullable=False),
+        "l_grid": _col("int", nullable=False),
+        "m_pol": _col("int", nullable=False),
+        "m_grid": _col("int", nullable=False),
+        "n_tor": _col("int", nullable=False),
+        "n_grid": _col("int", nullable=False),
+        "profile_rho": _col("float[]"),
+        "spectral_indexing": _col("str"),
+        "sym": _col("bool", nullable=False),
+        "current_specification": _col("str", choices=_CURRENT_SPECIFICATIONS),
+        "max_normalized_F_error": _col("float"),
+        "vacuum": _col("bool"),
+    },
+    "vmec_runs": {
+        **_RUNS,
+        "vmec_version": _col("float", nullable=False),
+        "inputfile": _col("str"),
+        "mpol": _col("int", nullable=False),
+        "mtor": _col("int", nullable=False),
+        "profile_s": _col("float[]"),
+        "ac": _col("float[]"),
+    },
+    "configurations": {
+        "name": _col("str", nullable=False),
+        "NFP": _col("int", nullable=False),
+        "stell_sym": _col("bool", nullable=False),
+        "deviceid": _col("str"),
+        "provenance": _col("str"),
+        "description": _col("str"),
+        "toroidal_flux": _col("float", unit="Wb"),
+        "aspect_ratio": _col("float"),
+        "minor_radius": _col("float", unit="m"),
+        "major_radius": _col("float", unit="m"),
+        "volume": _col("float", unit="m^3"),
+        "volume_averaged_B": _col("float", unit="T"),
+        "volume_averaged_beta": _col("float"),
+        "total_toroidal_current": _col("float", unit="A"),
+        "R_excursion": _col("float", unit="m"),
+        "Z_excursion": _col("float", unit="m"),
+        "average_elongation": _col("float"),
+        "classification": _col("str", choices=_CLASSES),
+        "current_specification": _col("str", choices=_CURRENT_SPECIFICATIONS),
+        "pressure_profile": _col("float[]", unit="Pa"),
+        "iota_profile": _col("float[]"),
+        "current_profile": _col("float[]", unit="A"),
+        **{
+            f"{profile}_profile_{field}": column
+            for profile in ("pressure", "iota", "current")
+            for field, column in (
+                ("type", _col("str", choices=_PROFILE_TYPES)),
+                ("data1", _col("int[]")),
+                ("data2", _col("float[]")),
+            )
+        },
+        "m": _col("int[]", nullable=False),
+        "n": _col("int[]", nullable=False),
+        "RBC": _col("float[]", nullable=False, unit="m"),
+        "RBS": _col("float[]", unit="m"),
+        "ZBS": _col("float[]", nullable=False, unit="m"),
+        "ZBC": _col("float[]", unit="m"),
+        "spectrum_truncation_error": _col("float", unit="m"),
+        "date_created": _col("date", nullable=False),
+    },
+    "devices_and_concepts": {
+        "name": _col("str", nullable=False),
+        "description": _col("str"),
+        "date_created": _col("date", nullable=False),
+        "date_updated": _col("date", nullable=False),
+    },
+}
+
+# array columns of a row that must have the same length
+_SAME_LENGTH = {
+    "desc_runs": [
+        ("profile_rho", "pressure_profile", "iota_profile", "current_profile")
+    ],
+    "vmec_runs": [("profile_s", "pressure_profile", "iota_profile", "current_profile")],
+    "configurations": [("m", "n", "RBC", "RBS", "ZBS", "ZBC")]
+    + [
+        (f"{profile}_profile_data1", f"{profile}_profile_data2")
+        for profile in ("pressure", "iota", "current")
+    ],
+}
+
+
+class SchemaError(ValueError):
+    """Raised when rows do not match the schema of their table."""
+
+    def __init__(self, table, errors):
+        self.table = table
+        self.errors = errors
+        shown = "\n  ".join(errors[:20])
+        more = f"\n  ... and {len(errors) - 20} more" if len(errors) > 20 else ""
+        super().__init__(f"Invalid {table} rows:\n  {shown}{more}")
+
+
+def _is_missing(value):
+    return value is None or (isinstance(value, str) and value.strip() == "")
+
+
+def _is_repr(value):
+    """Whether an array field is a numpy repr, as written by earlier releases."""
+    return isinstance(value, str) and value.strip().startswith("[")
+
+
+def _as_array(value):
+    """Return an array field as a float array, parsing the strings of CSV files.
+
+    Strings are comma-separated values, or the numpy reprs such as
+    ``"[ 1.  2.\n  3.]"`` that earlier releases wrote. The ``...`` of a
+    summarized repr is dropped, leaving the values shown.
+    """
+    if _is_repr(value):
+        values = value.strip()[1:-1].replace(",", " ").replace("...", " ")
+        return np.array(values.split(), dtype=float)
+    if isinstance(value, str):
+        return np.array(value.split(","), dtype=float)
+    return np.asarray(value, dtype=float)
+
+
+def _safe_size(value):
+    """Return the length of an array field, None if it cannot be known."""
+    if _is_repr(value) and "..." in value:
+        return None
+    try:
+        return _as_array(value).size
+    except (TypeError, ValueError):
+        return None
+
+
+def _as_floats(values):
+    """Convert values to floats at once, NaN where a value is not a number."""
+    try:
+        return np.asarray(values, dtype=float)
+    except (TypeError, ValueError):
+        out = np.full(len(values), np.nan)
+        for i, value in enumerate(values):
+            try:
+                out[i] = float(value)
+            except (TypeError, ValueError):
+                pass
+        return out
+
+
+def _is_date(value):
+    if isinstance(value, date):
+        return True
+    try:
+        date.fromisoformat(str(value))
+        return True
+    except ValueError:
+        return False
+
+
+def _check_column(name, column, rows, values):
+    """Return the problems of the present ``values`` of column ``name``."""
+    rows = np.asarray(rows)
+    problems = []
+
+    def report(bad, message):
+        problems.extend((row, f"{name} {message}") for row in rows[bad])
+
+    if column.type in ("int", "float"):
+        x = _as_floats(values)
+        report(~np.isfinite(x), "is not a finite number")
+        if column.type == "int":
+            report(np.isfinite(x) & (x != np.round(x)), "is not an integer")
+    elif column.type == "bool":
+        ok = [v in (True, False) or str(v) in ("True", "False") for v in values]
+        report(~np.asarray(ok), "is not True or False")
+    elif column.type == "date":
+        report(~np.asarray([_is_date(v) for v in values]), "is not a date")
+    elif column.type.endswith("[]"):
+        arrays = []
+        for i, value in enumerate(values):
+            try:
+                arrays.append(_as_array(value).ravel())
+            except (TypeError, ValueError):
+                problems.append((rows[i], f"{name} is not an array of numbers"))
+                arrays.append(np.zeros(0))
+        # one pass over the values of all rows, mapped back to their rows
+        x = np.concatenate(arrays)
+        owner = np.repeat(np.arange(len(arrays)), [a.size for a in arrays])
+        report(np.unique(owner[~np.isfinite(x)]), "contains non-finite values")
+        if column.type == "int[]":
+            bad = np.isfinite(x) & (x != np.round(x))
+            report(np.unique(owner[bad]), "contains non-integers")
+    if column.choices is not None:
+        ok = [str(v) in column.choices for v in values]
+        report(~np.asarray(ok), f"is not one of {column.choices}")
+    return problems
+
+
+def validate_rows(table, rows):
+    """Check rows against the schema of a table.
+
+    Every column is checked for all rows at once: unknown and missing
+    required columns, types, finiteness of numbers, allowed values and equal
+    lengths of related arrays, like the boundary modes and their
+    coefficients. Rows can hold the values produced by ``desc_to_csv`` and
+    ``vmec_to_csv`` or the strings read back from their CSV files, including
+    files written by earlier releases, whose arrays are numpy reprs.
+
+    Parameters
+    ----------
+    table : {"desc_runs", "vmec_runs", "configurations", "devices_and_concepts"}
+        Table the rows belong to.
+    rows : list of dict
+        Rows to check.
+
+    Returns
+    -------
+    errors : list of str
+        Description of every problem found, empty if the rows are valid.
+    """
+    schema = TABLES[table]
+    problems = []
+    for name in sorted(set().union(*rows) - set(schema)):
+        problems.append((-1, f"unknown column {name!r}"))
+
+    lengths = {}
+    for name, column in schema.items():
+        present = [(i, row[name]) for i, row in enumerate(rows) if name in row]
+        present = [(i, v) for i, v in present if not _is_missing(v)]
+        if not column.nullable and len(present) < len(rows):
+            have = {i for i, _ in present}
+            problems += [
+                (i, f"{name} is missing") for i in range(len(rows)) if i not in have
+            ]
+        if not present:
+            continue
+        index, values = zip(*present)
+        problems += _check_column(name, column, index, values)
+        if column.type.endswith("[]"):
+            lengths[name] = dict(zip(index, (_safe_size(v) for v in values)))
+
+    for group in _SAME_LENGTH.get(table, []):
+        group = [name for name in group if name in lengths]
+        for i in sorted(set().union(*(lengths[name] for name in group))):
+            sizes = {lengths[name][i] for name in group if i in lengths[name]}
+            sizes.discard(None)
+            if len(sizes) > 1:
+                problems.append((i, f"{', '.join(group)} have different lengths"))
+
+    return [
+        f"row {row}: {message}" if row >= 0 else message
+        for row, message in sorted(problems, key=lambda p: p[0])
+    ]
+
+
+def check_rows(table, rows):
+    """Raise a SchemaError if ``rows`` do not match the schema of ``table``.
+
+    See ``validate_rows`` for the checks done.
+    """
+    errors = validate_rows(table, rows)
+    if errors:
+        raise SchemaError(table, errors)
+
+
+def _add_sidecar_arrays(path, rows):
+    """Add the array fields stored in the sidecar of the CSV file ``path`` to rows."""
+    for fmt in ARRAY_FORMATS[1:]:
+        sidecar = sidecar_path(path, fmt)
+        if not os.path.exists(sidecar):
+            continue
+        for name, values in read_sidecar(sidecar).items():
+            for row, value in zip(rows, values):
+                # rows without the field have an empty array
+                if value.size:
+                    row[name] = value
+
+
+def check_csv(path, table=None):
+    """Raise a SchemaError if the rows of a CSV file do not match their table.
+
+    Array fields written to an ``npz`` or ``parquet`` sidecar of the file,
+    see ``writers.append_sidecar``, are read from it and checked as well.
+
+    Parameters
+    ----------
+    path : str
+        CSV file, e.g. ``desc_runs.csv``.
+    table : str, optional
+        Table of the rows. Defaults to the file name without extension.
+    """
+    if table is None:
+        table = os.path.splitext(os.path.basename(path))[0]
+    csv.field_size_limit(max(csv.field_size_limit(), 2**31 - 1))
+    with open(path, newline="") as f:
+        rows = list(csv.DictReader(f))
+    _add_sidecar_arrays(path, rows)
+    check_rows(table, rows)
@@ -0,0 +1,244 @@
+"""Incremental processing of directories that DESC runs keep writing into."""
+
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+from .batch import find_desc_files
+
+_MANIFEST_NAME = ".stelladb_manifest.json"
+# the manifest is saved during a scan after this many files or seconds
+_SAVE_EVERY = 50
+_SAVE_INTERVAL = 30.0
+
+
+def _file_hash(path, chunk_size=2**20):
+    """Return the sha256 digest of the contents of a file."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def load_manifest(path):
+    """Return the manifest stored at ``path``, or an empty one if there is none."""
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+def save_manifest(path, manifest):
+    """Atomically write ``manifest`` to ``path``."""
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    with os.fdopen(fd, "w") as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+    os.replace(tmp, path)
+
+
+def _changed_files(folder, manifest, settle):
+    """Return the files of ``folder`` that are new or changed since the manifest.
+
+    Files whose size and modification time match their manifest entry are
+    skipped after a single stat. Files that were touched but whose contents
+    hash to the recorded digest only get their entry refreshed, and their
+    number is returned as well. Files modified less than ``settle`` seconds
+    ago are left for a later scan, as they may still be being written.
+    """
+    now = time.time()
+    changed = []
+    refreshed = 0
+    for path in find_desc_files(folder):
+        st = os.stat(path)
+        if now - st.st_mtime < settle:
+            continue
+        rel = os.path.relpath(path, folder)
+        entry = manifest.get(rel)
+        if (
+            entry is not None
+            and entry["size"] == st.st_size
+            and entry["mtime_ns"] == st.st_mtime_ns
+        ):
+            continue
+        digest = _file_hash(path)
+        if entry is not None and entry["sha256"] == digest:
+            entry.update(size=st.st_size, mtime_ns=st.st_mtime_ns)
+            refreshed += 1
+            continue
+        changed.append((path, rel, st, digest))
+    return changed, refreshed
+
+
+def sync_desc_directory(
+    folder,
+    username=None,
+    password=None,
+    manifest=None,
+    settle=5.0,
+    verbose=1,
+    **kwargs,
+):
+    """Process the DESC files of ``folder`` that are new or changed since last time.
+
+    Every ``.h5`` file found recursively in ``folder`` is checked against a
+    manifest of processed files (path, size, modification time and sha256 of
+    the contents). New or changed files are passed to ``save_to_db_desc`` if
+    ``username`` and ``password`` are given, otherwise to
+    ``generate_files_desc``, and recorded in the manifest once processed
+    successfully, i.e. uploaded or found in the upload ledger, or generated.
+    Files that fail are retried on the next scan. Unchanged files cost only a
+    stat, and the manifest is only written when it changes, so repeated scans
+    of large directories are cheap. During a scan the manifest is saved every
+    ``_SAVE_EVERY`` files or ``_SAVE_INTERVAL`` seconds and when the scan ends
+    or is interrupted, so an interrupted scan keeps its progress.
+
+    Parameters
+    ----------
+    folder : str
+        Directory to scan.
+    username, password : str, optional
+        Credentials for the database website. If not given, files are only
+        generated locally with ``generate_files_desc``.
+    manifest : str, optional
+        Path of the manifest file. Defaults to ``.stelladb_manifest.json`` in
+        ``folder``.
+    settle : float, optional
+        Files modified less than this many seconds ago are left for the next
+        scan, as they may still be being written (default 5).
+    verbose : int, optional
+        If 1 (default), print which files are processed.
+    **kwargs
+        Passed to ``save_to_db_desc`` or ``generate_files_desc``, e.g.
+        ``provenance``, ``description`` or ``family``. ``config_name``
+        defaults to the file name without extension. Uploads are checked
+        against the upload ledger of ``save_to_db_desc``, so an equilibrium
+        that was already uploaded, e.g. under another file name, is skipped
+        unless ``force=True``.
+
+    Returns
+    -------
+    processed : list of str
+        Paths of the files processed in this scan.
+    """
+    from .db_desc import generate_files_desc, save_to_db_desc
+
+    if manifest is None:
+        manifest = os.path.join(folder, _MANIFEST_NAME)
+    entries = load_manifest(manifest)
+    changed, refreshed = _changed_files(folder, entries, settle)
+    if verbose and changed:
+        print(f"Found {len(changed)} new or changed files in {folder}")
+
+    processed = []
+    unsaved = refreshed
+    saved = time.monotonic()
+    try:
+        for path, rel, st, digest in changed:
+            stem = os.path.splitext(path)[0]
+            options = dict(kwargs)
+            options.setdefault("config_name", os.path.basename(stem))
+            if verbose:
+                print(f"\n* * * Processing {rel} * * *")
+            # files that fail are not recorded, so they are retried on the next scan
+            try:
+                if username is not None:
+                    uploaded = save_to_db_desc(
+                        stem, username=username, password=password, **options
+                    )
+                else:
+                    generate_files_desc(stem, **options)
+                    uploaded = True
+            except Exception as e:
+                print(f"Failed to process {rel}: {e}")
+                continue
+            if not uploaded:
+                print(f"Failed to upload {rel}, retrying it on the next scan")
+                continue
+            entries[rel] = {
+                "size": st.st_size,
+                "mtime_ns": st.st_mtime_ns,
+                "sha256": digest,
+                "processed": datetime.now().isoformat(timespec="seconds"),
+            }
+            processed.append(path)
+            unsaved += 1
+            if unsaved >= _SAVE_EVERY or time.monotonic() - saved > _SAVE_INTERVAL:
+                save_manifest(manifest, entries)
+                unsaved, saved = 0, time.monotonic()
+    finally:
+        # also the refreshed stats of unchanged files that were touched
+        if unsaved:
+            save_manifest(manifest, entries)
+    return processed
+
+
+def _event_trigger(folder):
+    """Return an Event set on filesystem changes, or None without watchdog."""
+    try:
+        from watchdog.events import FileSystemEventHandler
+        from watchdog.observers import Observer
+    except ImportError:
+        return None, None
+
+    trigger = threading.Event()
+
+    class _Handler(FileSystemEventHandler):
+        def on_any_event(self, event):
+            path = getattr(event, "dest_path", "") or event.src_path
+            if str(path).endswith(".h5"):
+                trigger.set()
+
+    observer = Observer()
+    observer.schedule(_Handler(), folder, recursive=True)
+    observer.start()
+    return trigger, observer
+
+
+def watch_desc_directory(folder, interval=60.0, settle=5.0, verbose=1, **kwargs):
+    """Keep processing new or changed DESC files of ``folder`` until interrupted.
+
+    Runs ``sync_desc_directory`` repeatedly. If the optional ``watchdog``
+    package is installed, a scan starts as soon as an ``.h5`` file is created
+    or modified, and otherwise every ``interval`` seconds. Stop with Ctrl-C.
+
+    Parameters
+    ----------
+    folder : str
+        Directory to watch.
+    interval : float, optional
+        Seconds between scans when no filesystem events arrive (default 60).
+    settle : float, optional
+        See ``sync_desc_directory`` (default 5).
+    verbose : int, optional
+        If 1 (default), print which files are processed.
+    **kwargs
+        Passed to ``sync_desc_directory``.
+    """
+    trigger, observer = _event_trigger(folder)
+    if verbose:
+        mode = "filesystem events" if observer is not None else f"every {interval} s"
+        print(f"Watching {folder} ({mode}), press Ctrl-C to stop...")
+    try:
+        while True:
+            sync_desc_directory(folder, settle=settle, verbose=verbose, **kwargs)
+            if trigger is None:
+                time.sleep(interval)
+                continue
+            trigger.wait(interval)
+            if trigger.is_set():
+                # let the writer finish before the file is considered settled
+                time.sleep(settle)
+                trigger.clear()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if observer is not None:
+            observer.stop()
+            observer.join()
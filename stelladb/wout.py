@@ -0,0 +1,72 @@
+"""Lightweight reader for VMEC ``wout`` netCDF files."""
+
+import numpy as np
+from scipy.io import netcdf_file
+
+# variables stored under a different name in the wout file
+_ALIASES = {"lasym": "lasym__logical__", "volume": "volume_p"}
+
+
+class WoutFile:
+    """A VMEC ``wout`` netCDF file whose variables are read on first access.
+
+    Variables are attributes named as in the file, with 2D arrays transposed
+    to shape (mn_modes, ns) like simsopt's ``Vmec.wout``. NetCDF3 files are
+    memory-mapped, so only the parts of the arrays that are used are read from
+    disk; NetCDF4 files are read with the optional ``netCDF4`` package. The
+    object can be passed to ``vmec_to_csv`` in place of a simsopt ``Vmec``.
+
+    Parameters
+    ----------
+    path : str
+        Path to the wout file.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        try:
+            self._file = netcdf_file(path, "r", mmap=True)
+        except TypeError:
+            # not a NetCDF3 file, wout files written through HDF5 need netCDF4
+            import netCDF4
+
+            self._file = netCDF4.Dataset(path)
+            self._file.set_auto_mask(False)
+
+    @property
+    def wout(self):
+        return self
+
+    @property
+    def s_half_grid(self):
+        """Normalized toroidal flux on the half grid, as in simsopt's ``Vmec``."""
+        s_full = np.linspace(0, 1, int(self.ns))
+        return s_full[1:] - 0.5 * (s_full[1] - s_full[0])
+
+    def __getattr__(self, name):
+        if name.startswith("_"):
+            raise AttributeError(name)
+        try:
+            var = self._file.variables[_ALIASES.get(name, name)]
+        except KeyError:
+            raise AttributeError(f"{self.path} has no variable {name!r}") from None
+        # copied, so no array refers to the memory map once the file is closed
+        val = np.array(var[...])
+        if val.ndim == 2:
+            val = val.T
+        elif val.ndim == 0:
+            val = val.item()
+        if name == "lasym":
+            val = bool(val)
+        # cache, so the variable is read only once
+        self.__dict__[name] = val
+        return val
+
+    def close(self):
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
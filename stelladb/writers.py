@@ -0,0 +1,307 @@
+"""Writers of database table rows to CSV files and binary sidecars of their arrays."""
+
+import csv
+import io
+import os
+import zipfile
+
+import numpy as np
+
+# where the array fields of the rows can be written
+ARRAY_FORMATS = ("csv", "npz", "parquet")
+
+# significant digits of the array fields written to CSV, 2 for the others
+_ARRAY_DIGITS = {"RBC": 3, "RBS": 3, "ZBS": 3, "ZBC": 3}
+# array fields of mode numbers, written as integers
+_INTEGER_ARRAYS = {"m", "n"}
+# VMEC profile coefficients, written exactly as polynomial terms may cancel
+_COEFFICIENT_ARRAYS = {"ac", "am", "ai"}
+
+# number of rows of a sidecar part, stored next to its array fields
+_NUM_ROWS = "__num_rows__"
+
+
+def _format_array(arr, sig=2):
+    """Format an array of floats as a comma-separated string in scientific notation."""
+    return ", ".join(f"{v:.{sig}e}" for v in arr)
+
+
+def _is_array(value):
+    return isinstance(value, np.ndarray) and value.ndim > 0
+
+
+def _is_coefficients(key):
+    return key in _COEFFICIENT_ARRAYS or key.endswith("_profile_data2")
+
+
+def _csv_value(key, value):
+    """Return the CSV representation of the field ``key`` of a row."""
+    if not _is_array(value):
+        return value
+    if key in _INTEGER_ARRAYS or np.issubdtype(value.dtype, np.integer):
+        return ", ".join(str(int(v)) for v in value)
+    if _is_coefficients(key):
+        # the shortest representation that reads back to the same float
+        return ", ".join(repr(float(v)) for v in value)
+    return _format_array(value, _ARRAY_DIGITS.get(key, 2))
+
+
+def _write_rows(writer, rows):
+    """Write rows with a DictWriter, formatting their array fields."""
+    writer.writerows({k: _csv_value(k, v) for k, v in row.items()} for row in rows)
+
+
+def rows_to_csv(rows):
+    """Return the text of a CSV file of ``rows``, as ``CsvSink`` writes a new file."""
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=sorted(set().union(*rows)), restval="")
+    writer.writeheader()
+    _write_rows(writer, rows)
+    return buffer.getvalue()
+
+
+class CsvSink:
+    """Buffered writer of table rows to a CSV file.
+
+    Rows are collected with ``add`` and written together by ``flush``, with a
+    single open of the file and a single write. The columns are the union of
+    the keys of all rows, missing values being left empty. A new file gets the
+    columns in sorted order. If an existing file lacks some of the columns, it
+    is rewritten once with them appended to its header, so rows never end up
+    under the wrong column. Used as a context manager, the rows are flushed on
+    exit.
+
+    Parameters
+    ----------
+    filename : str
+        CSV file to append to.
+    arrays : {"csv", "npz", "parquet"}, optional
+        Write array fields into the CSV file as comma-separated strings
+        (default), or to an ``npz`` or ``parquet`` sidecar, see ``append_sidecar``.
+    """
+
+    def __init__(self, filename, arrays="csv"):
+        if arrays not in ARRAY_FORMATS:
+            raise ValueError(f"arrays must be one of {ARRAY_FORMATS}, got {arrays!r}")
+        self.filename = filename
+        self.arrays = arrays
+        self._rows = []
+
+    def add(self, row):
+        """Buffer one row, a dict of field values."""
+        self._rows.append(row)
+
+    def extend(self, rows):
+        """Buffer several rows."""
+        self._rows.extend(rows)
+
+    def flush(self):
+        """Write the buffered rows to the file.
+
+        With a sidecar, its arrays are appended only once the CSV rows are
+        written, so that a failed CSV write does not shift the rows of the
+        sidecar against those of the CSV file.
+        """
+        rows, self._rows = self._rows, []
+        if not rows:
+            return
+        if self.arrays != "csv":
+            rows, columns = split_arrays(rows)
+        buffer = io.StringIO()
+        try:
+            with open(self.filename, "a+", newline="") as csvfile:
+                csvfile.seek(0)
+                header = next(csv.reader(csvfile), [])
+                new = sorted(set().union(*rows).difference(header))
+                writer = csv.DictWriter(buffer, fieldnames=header + new, restval="")
+                if not header or new:
+                    writer.writeheader()
+                if header and new:
+                    # the existing rows are rewritten with empty new columns
+                    csv.field_size_limit(max(csv.field_size_limit(), 2**31 - 1))
+                    csvfile.seek(0)
+                    writer.writerows(csv.DictReader(csvfile))
+                    csvfile.truncate(0)
+                _write_rows(writer, rows)
+                csvfile.write(buffer.getvalue())
+        except OSError as e:
+            print(f"I/O error writing to {self.filename}: {e}")
+            return
+        if self.arrays != "csv":
+            append_sidecar(sidecar_path(self.filename, self.arrays), columns, len(rows))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.flush()
+
+
+def _append_rows_to_csv(filename, rows, arrays="csv"):
+    """Append several dicts as rows, using the union of their keys as columns."""
+    with CsvSink(filename, arrays) as sink:
+        sink.extend(rows)
+
+
+def split_arrays(rows):
+    """Split rows into their scalar fields and columns of their array fields.
+
+    Parameters
+    ----------
+    rows : list of dict
+        Rows of a table.
+
+    Returns
+    -------
+    scalars : list of dict
+        The rows without their array fields.
+    columns : dict of list of ndarray
+        Every field that is an array in some row, with its value in every row.
+        Rows without the field have an empty array.
+    """
+    names = sorted({k for row in rows for k, v in row.items() if _is_array(v)})
+    columns = {
+        name: [np.atleast_1d(row.get(name, np.zeros(0))) for row in rows]
+        for name in names
+    }
+    scalars = [{k: v for k, v in row.items() if k not in columns} for row in rows]
+    return scalars, columns
+
+
+def sidecar_path(filename, fmt):
+    """Return the path of the ``fmt`` array sidecar of the CSV file ``filename``."""
+    return os.path.splitext(filename)[0] + "_arrays." + fmt
+
+
+def _parquet_parts(path):
+    """Return the part files of a parquet sidecar, in the order of their rows."""
+    if os.path.isfile(path):
+        return [path]
+    if not os.path.isdir(path):
+        return []
+    return [
+        os.path.join(path, name)
+        for name in sorted(os.listdir(path))
+        if name.startswith("part-") and name.endswith(".parquet")
+    ]
+
+
+def _read_parts(path):
+    """Yield the array columns and number of rows of every part of a sidecar."""
+    if path.endswith(".parquet"):
+        import pyarrow.parquet as pq
+
+        for part in _parquet_parts(path):
+            table = pq.read_table(part)
+            metadata = table.schema.metadata or {}
+            num_rows = int(metadata.get(_NUM_ROWS.encode(), table.num_rows))
+            yield {
+                name: [
+                    np.asarray(v, dtype=float) for v in table.column(name).to_pylist()
+                ]
+                for name in table.column_names
+            }, num_rows
+        return
+
+    parts = {}
+    with np.load(path) as data:
+        for key in data.files:
+            part, _, name = key.rpartition("/")
+            parts.setdefault(part, {})[name] = data[key]
+    for part in sorted(parts):
+        fields = parts[part]
+        # each column is stored flat together with the offsets of its rows
+        columns = {
+            name: np.split(fields[name], fields[name + ".offsets"][1:-1])
+            for name in fields
+            if not name.endswith(".offsets") and name != _NUM_ROWS
+        }
+        if _NUM_ROWS in fields:
+            num_rows = int(fields[_NUM_ROWS])
+        else:
+            num_rows = len(next(iter(columns.values()), []))
+        yield columns, num_rows
+
+
+def read_sidecar(path):
+    """Read the array columns stored in a sidecar file.
+
+    Parameters
+    ----------
+    path : str
+        Path of a ``.npz`` or ``.parquet`` sidecar written by ``append_sidecar``.
+
+    Returns
+    -------
+    columns : dict of list of ndarray
+        Arrays of every row, by field name, in the order of the CSV rows.
+        Rows without a field have an empty array.
+    """
+    columns = {}
+    total = 0
+    for part, num_rows in _read_parts(path):
+        for name in set(columns) | set(part):
+            columns.setdefault(name, [np.zeros(0)] * total)
+            columns[name] += part.get(name, [np.zeros(0)] * num_rows)
+        total += num_rows
+    return columns
+
+
+def append_sidecar(path, columns, num_rows):
+    """Append array columns to a sidecar file, creating it if it does not exist.
+
+    The arrays are stored exactly. Every append adds a part holding only the
+    new rows, so appending costs the same however large the sidecar is.
+    ``.npz`` sidecars store each field of a part as one flat array of the
+    values of all its rows, together with the offsets of the rows in
+    ``{field}.offsets``, so that reading it is a single copy. ``.parquet``
+    sidecars are a directory of one parquet file per part, with one float64
+    list column per field, readable as one dataset by ``pyarrow`` or
+    ``pandas``, and need the optional ``pyarrow`` package. The rows of the
+    sidecar are those of the CSV file it belongs to, in the same order.
+
+    Parameters
+    ----------
+    path : str
+        Path of the ``.npz`` or ``.parquet`` sidecar.
+    columns : dict of list of ndarray
+        Arrays of each new row, by field name, as returned by ``split_arrays``.
+    num_rows : int
+        Number of new rows. Fields that only other parts have are empty
+        arrays for them when read.
+    """
+    if path.endswith(".parquet"):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise ImportError(
+                "Writing parquet sidecars requires pyarrow, install it or use npz."
+            ) from None
+        parts = _parquet_parts(path)
+        if os.path.isfile(path):
+            # a single file sidecar becomes the first part of a directory
+            os.replace(path, path + ".tmp")
+            os.makedirs(path)
+            os.replace(path + ".tmp", os.path.join(path, "part-00000.parquet"))
+        os.makedirs(path, exist_ok=True)
+        table = pa.table(
+            {
+                name: pa.array([np.asarray(v, dtype=float) for v in values])
+                for name, values in columns.items()
+            }
+        )
+        table = table.replace_schema_metadata({_NUM_ROWS: str(num_rows)})
+        pq.write_table(table, os.path.join(path, f"part-{len(parts):05d}.parquet"))
+        return
+
+    with zipfile.ZipFile(path, "a") as archive:
+        parts = sum(n.endswith(f"/{_NUM_ROWS}.npy") for n in archive.namelist())
+        part = f"part{parts:05d}"
+        data = {_NUM_ROWS: np.array(num_rows)}
+        for name, values in columns.items():
+            data[name] = np.concatenate(values) if values else np.zeros(0)
+            data[name + ".offsets"] = np.cumsum([0] + [len(v) for v in values])
+        for name, array in data.items():
+            with archive.open(f"{part}/{name}.npy", "w", force_zip64=True) as f:
+                np.lib.format.write_array(f, np.asarray(array))
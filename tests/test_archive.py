@@ -0,0 +1,69 @@
+"""Tests of the zip archives of upload files."""
+
+import io
+import sys
+import zipfile
+
+import numpy as np
+import pytest
+
+from stelladb import archive
+from stelladb.archive import COMPRESSIONS, write_zip
+
+# compressible data spanning several chunks
+DATA = np.arange(200_000).tobytes()
+
+
+def _members(tmp_path):
+    path = tmp_path / "member.bin"
+    path.write_bytes(DATA)
+    return {
+        "path.bin": str(path),
+        "bytes.bin": DATA[:1000],
+        "file.bin": io.BytesIO(DATA[::-1]),
+        "empty.bin": b"",
+    }
+
+
+@pytest.mark.parametrize("precompress", [True, False])
+@pytest.mark.parametrize("compression", list(COMPRESSIONS))
+def test_write_zip(tmp_path, monkeypatch, compression, precompress):
+    """Both the parallel writing and ``ZipFile.write`` give valid archives."""
+    if not precompress:
+        # as with a zipfile whose internals changed
+        monkeypatch.setattr(archive, "_can_precompress", lambda: False)
+    elif not archive._can_precompress():
+        pytest.skip("zipfile of this Python has no hooks to compress in parallel")
+    out = tmp_path / "out.zip"
+    write_zip(str(out), _members(tmp_path), compression, workers=3, chunk_size=2**16)
+    with zipfile.ZipFile(out) as zipf:
+        assert zipf.testzip() is None
+        assert zipf.read("path.bin") == DATA
+        assert zipf.read("bytes.bin") == DATA[:1000]
+        assert zipf.read("file.bin") == DATA[::-1]
+        assert zipf.read("empty.bin") == b""
+        for info in zipf.infolist():
+            assert info.compress_type == COMPRESSIONS[compression]
+            if compression != "stored" and info.file_size:
+                assert info.compress_size < info.file_size
+
+
+@pytest.mark.skipif(
+    sys.version_info[:2] not in archive._TESTED_PYTHONS,
+    reason="zipfile internals not tested on this Python",
+)
+def test_precompress_tested_python():
+    """On the tested versions, archives compressed in parallel read back intact."""
+    archive._can_precompress.cache_clear()
+    assert archive._can_precompress() is True
+
+
+def test_can_precompress():
+    """The check of the zipfile internals fails without raising."""
+    archive._can_precompress.cache_clear()
+    try:
+        with pytest.MonkeyPatch.context() as monkeypatch:
+            monkeypatch.delattr(zipfile, "_get_compressor")
+            assert archive._can_precompress() is False
+    finally:
+        archive._can_precompress.cache_clear()
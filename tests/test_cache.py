@@ -0,0 +1,74 @@
+"""Tests of the metrics cache and of the content keys of the upload ledger."""
+
+import os
+import types
+
+import numpy as np
+
+from stelladb import cache
+from stelladb.cache import (
+    desc_content_key,
+    desc_metrics_key,
+    load_metrics,
+    store_metrics,
+    vmec_content_key,
+    vmec_metrics_key,
+)
+
+HEADER = {
+    "L": 2,
+    "M": 2,
+    "N": 0,
+    "L_grid": 4,
+    "M_grid": 4,
+    "N_grid": 0,
+    "NFP": 1,
+    "sym": True,
+    "spectral_indexing": "ansi",
+    "Psi": 1.0,
+    "R_lmn": [10.0, 1.0, 0.1],
+    "Z_lmn": [-1.0, 0.1],
+    "L_lmn": [0.0],
+    "profiles": dict.fromkeys(cache._DESC_PROFILES),
+}
+
+
+def _wout(version=9.0, rmnc=1.0):
+    arrays = dict.fromkeys(["phi", "iotas", "pres", "ac", "DMerc"], np.ones(3))
+    return types.SimpleNamespace(
+        **arrays,
+        xm=np.array([0, 1]),
+        xn=np.array([0, 0]),
+        nfp=5,
+        rmnc=np.full((2, 3), rmnc),
+        zmns=np.zeros((2, 3)),
+        lasym=False,
+        version_=version,
+    )
+
+
+def test_content_keys(monkeypatch):
+    """Content keys ignore versions and cache invalidation, not content."""
+    desc_key, vmec_key = desc_content_key(HEADER), vmec_content_key(_wout())
+    metrics_keys = desc_metrics_key(HEADER, "0.10"), vmec_metrics_key(_wout())
+    monkeypatch.setattr(cache, "_METRICS_VERSION", cache._METRICS_VERSION + 1)
+    assert desc_content_key(HEADER) == desc_key
+    assert vmec_content_key(_wout(version=8.0)) == vmec_key
+    assert desc_metrics_key(HEADER, "0.10") != metrics_keys[0]
+    assert vmec_metrics_key(_wout()) != metrics_keys[1]
+    assert desc_content_key(dict(HEADER, R_lmn=[10.0, 1.0, 0.2])) != desc_key
+    assert vmec_content_key(_wout(rmnc=2.0)) != vmec_key
+
+
+def test_load_evicted_entry(tmp_path, monkeypatch):
+    """A hit whose entry another process evicts right after reading it is kept."""
+    monkeypatch.setenv("STELLADB_CACHE_DIR", str(tmp_path))
+    store_metrics("key", {"volume": 1.5})
+
+    def evicted(path, *args, **kwargs):
+        os.remove(path)
+        raise FileNotFoundError(path)
+
+    monkeypatch.setattr(os, "utime", evicted)
+    assert load_metrics("key") == {"volume": 1.5}
+    assert load_metrics("key") is None
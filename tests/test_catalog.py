@@ -0,0 +1,41 @@
+"""Tests of the local SQLite catalog."""
+
+import sqlite3
+
+import numpy as np
+
+from stelladb.catalog import Catalog, _catalog_rows
+
+CONFIGURATION = {"name": "test", "NFP": 4, "m": np.array([0, 1]), "RBC": [1.0, 0.1]}
+RUN = {"iota_min": 0.9, "iota_max": 1.1}
+
+
+def test_string_deviceid(tmp_path):
+    """A device given by name is stored and found, also in an older catalog."""
+    path = str(tmp_path / "catalog.sqlite")
+    # the deviceid column of catalogs made before ids were strings is INTEGER
+    with sqlite3.connect(path) as connection:
+        connection.execute(
+            "CREATE TABLE configurations "
+            "(id INTEGER PRIMARY KEY, row_hash TEXT UNIQUE NOT NULL, deviceid INTEGER)"
+        )
+    config = dict(CONFIGURATION, deviceid="HSX")
+    _catalog_rows(path, "vmec_runs", [RUN], [config])
+    with Catalog(path) as catalog:
+        (row,) = catalog.search("vmec_runs", deviceid="HSX")
+    assert row["deviceid"] == "HSX"
+    assert row["NFP"] == 4
+    np.testing.assert_array_equal(row["m"], [0, 1])
+
+
+def test_unconvertible_values(tmp_path, capsys):
+    """Values not of the type of their column are kept as text, never raising."""
+    path = str(tmp_path / "catalog.sqlite")
+    config = dict(CONFIGURATION, NFP="four", m="[0 1]", date_created="today")
+    _catalog_rows(path, "desc_runs", [RUN], [config])
+    assert "Could not write" not in capsys.readouterr().out
+    with Catalog(path) as catalog:
+        (row,) = catalog.search(name="test")
+    assert row["NFP"] == "four"
+    assert row["m"] == "[0 1]"
+    assert row["date_created"] == "today"
@@ -0,0 +1,44 @@
+"""Tests of the exact extrema of polynomial and spline profiles."""
+
+import numpy as np
+import pytest
+from scipy.interpolate import InterpolatedUnivariateSpline, UnivariateSpline
+
+from stelladb.profile_analysis import polynomial_extrema, spline_extrema
+
+# dense samples, against which the exact extrema are checked
+RHO = np.linspace(0, 1, 100_001)
+
+
+def _assert_bounds(minima, maxima, values):
+    """Check that exact extrema bound the sampled values and are close to them."""
+    assert np.all(minima <= values.min(axis=1) + 1e-12)
+    assert np.all(maxima >= values.max(axis=1) - 1e-12)
+    np.testing.assert_allclose(minima, values.min(axis=1), atol=1e-4)
+    np.testing.assert_allclose(maxima, values.max(axis=1), atol=1e-4)
+
+
+def test_polynomial_extrema():
+    """Extrema of power series and of their absolute value."""
+    coeffs = [[0.5, 0.0, -2.0, 1.0], [1.0, 0.0, 0.0, 0.0], [-0.2, 1.0, 0.0, 0.0]]
+    minima, maxima = polynomial_extrema(coeffs, absolute=[False, False, True])
+    values = np.polynomial.polynomial.polyval(RHO, np.transpose(coeffs))
+    values[2] = np.abs(values[2])
+    _assert_bounds(minima, maxima, values)
+    assert minima[2] == pytest.approx(0, abs=1e-12)
+
+
+@pytest.mark.parametrize("k", [1, 2, 3, 4, 5])
+def test_spline_extrema(k):
+    """Extrema of splines of any degree, also extrapolated beyond their knots."""
+    s = np.linspace(0.05, 0.95, 12)
+    iota = InterpolatedUnivariateSpline(s, np.sin(5 * s) - 0.3, k=k)
+    pressure = InterpolatedUnivariateSpline(s, (1 - s) ** 2 * np.cos(3 * s), k=k)
+    # a smoothing spline, whose knots differ from those of the others
+    current = UnivariateSpline(s, s * (1 - 2 * s), k=k, s=1e-4)
+    splines = [iota, pressure, current]
+    minima, maxima = spline_extrema(splines, absolute=[True, False, False])
+    values = np.array([spline(RHO) for spline in splines])
+    values[0] = np.abs(values[0])
+    _assert_bounds(minima, maxima, values)
+    assert minima[0] == pytest.approx(0, abs=1e-12)
@@ -0,0 +1,78 @@
+"""Tests of the table schemas and of the validation of upload files."""
+
+import os
+
+import pytest
+
+from stelladb.getters import check_upload_files
+from stelladb.schema import SchemaError, check_csv, validate_rows
+
+DATA = os.path.join(os.path.dirname(__file__), "data")
+
+# minimal valid configurations row, as read back from a CSV file
+CONFIGURATION = {
+    "name": "test",
+    "NFP": "2",
+    "stell_sym": "True",
+    "date_created": "2024-01-01",
+    "m": "0, 1",
+    "n": "0, 0",
+    "RBC": "1.00e+01, 1.00e+00",
+    "ZBS": "0.00e+00, 1.00e+00",
+}
+
+
+@pytest.mark.parametrize(
+    "folder, runs_input",
+    [("legacy_desc", "descToUpload"), ("legacy_vmec", "vmecToUpload")],
+)
+def test_legacy_folder(folder, runs_input):
+    """Folders written before arrays were comma-separated, as numpy reprs, pass."""
+    path = os.path.join(DATA, folder)
+    runs = "desc_runs.csv" if runs_input == "descToUpload" else "vmec_runs.csv"
+    check_upload_files(
+        {
+            runs_input: os.path.join(path, runs),
+            "configToUpload": os.path.join(path, "configurations.csv"),
+        }
+    )
+
+
+def test_repr_arrays():
+    """Numpy reprs are parsed, their values and lengths still checked."""
+    row = dict(CONFIGURATION, m="[0 1]", n="[ 0.  0.]", RBC="[10.\n  1.]")
+    assert validate_rows("configurations", [row]) == []
+    row["ZBS"] = "[0. 1. 2.]"
+    assert validate_rows("configurations", [row]) == [
+        "row 0: m, n, RBC, ZBS have different lengths"
+    ]
+    row["ZBS"] = "[0. nan]"
+    assert validate_rows("configurations", [row]) == [
+        "row 0: ZBS contains non-finite values"
+    ]
+    row["ZBS"] = "[0. x]"
+    assert "row 0: ZBS is not an array of numbers" in validate_rows(
+        "configurations", [row]
+    )
+
+
+def test_summarized_repr():
+    """The values shown by a summarized repr are checked, not its length."""
+    row = dict(CONFIGURATION, m="[0 1 ... 5 6]", n="[0 0 ... 0 0]")
+    assert validate_rows("configurations", [row]) == []
+    row["n"] = "[0 0 ... 0.5 0]"
+    assert validate_rows("configurations", [row]) == ["row 0: n contains non-integers"]
+
+
+@pytest.mark.parametrize("deviceid", ["HSX", "12", 12])
+def test_string_ids(deviceid):
+    """Device and publication ids are strings, as documented by *_to_csv."""
+    row = dict(CONFIGURATION, deviceid=deviceid)
+    assert validate_rows("configurations", [row]) == []
+
+
+def test_invalid_csv(tmp_path):
+    path = tmp_path / "configurations.csv"
+    path.write_text('name,NFP,m\ntest,2.5,"0, 1"\n')
+    with pytest.raises(SchemaError, match="NFP is not an integer"):
+        check_csv(str(path))
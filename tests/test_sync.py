@@ -0,0 +1,56 @@
+"""Tests of the incremental processing of DESC output directories."""
+
+import pytest
+
+from stelladb import db_desc, sync
+from stelladb.sync import load_manifest, sync_desc_directory
+
+
+@pytest.fixture
+def folder(tmp_path, monkeypatch):
+    """Folder of five DESC files, whose processing only records their names."""
+    for i in range(5):
+        (tmp_path / f"eq{i}.h5").write_bytes(b"%d" % i)
+    generated = []
+    monkeypatch.setattr(
+        db_desc, "generate_files_desc", lambda stem, **kwargs: generated.append(stem)
+    )
+    saves = []
+    save_manifest = sync.save_manifest
+
+    def counted(path, manifest):
+        saves.append(len(manifest))
+        save_manifest(path, manifest)
+
+    monkeypatch.setattr(sync, "save_manifest", counted)
+    return tmp_path, generated, saves
+
+
+def test_manifest_saved_in_batches(folder, monkeypatch):
+    """The manifest is saved every few files and at the end, not after every file."""
+    path, generated, saves = folder
+    monkeypatch.setattr(sync, "_SAVE_EVERY", 2)
+    assert len(sync_desc_directory(str(path), settle=0, verbose=0)) == 5
+    assert saves == [2, 4, 5]
+    assert sync_desc_directory(str(path), settle=0, verbose=0) == []
+    assert saves == [2, 4, 5]
+
+
+def test_interrupted_scan_keeps_progress(folder, monkeypatch):
+    """Files processed before an interruption are not processed again."""
+    path, generated, saves = folder
+
+    def interrupted(stem, **kwargs):
+        if len(generated) == 2:
+            raise KeyboardInterrupt
+        generated.append(stem)
+
+    monkeypatch.setattr(db_desc, "generate_files_desc", interrupted)
+    with pytest.raises(KeyboardInterrupt):
+        sync_desc_directory(str(path), settle=0, verbose=0)
+    manifest = load_manifest(str(path / sync._MANIFEST_NAME))
+    assert sorted(manifest) == ["eq0.h5", "eq1.h5"]
+    monkeypatch.undo()
+    monkeypatch.setattr(db_desc, "generate_files_desc", lambda stem, **kwargs: None)
+    processed = sync_desc_directory(str(path), settle=0, verbose=0)
+    assert [p.rsplit("/", 1)[1] for p in processed] == ["eq2.h5", "eq3.h5", "eq4.h5"]
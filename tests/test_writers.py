@@ -0,0 +1,28 @@
+"""Tests of the CSV and sidecar writers."""
+
+import csv
+
+import numpy as np
+
+from stelladb import writers
+from stelladb.writers import CsvSink, read_sidecar, sidecar_path
+
+
+def test_failed_csv_write_keeps_sidecar_aligned(tmp_path, monkeypatch):
+    """Rows whose CSV write fails are not appended to the sidecar either."""
+    filename = str(tmp_path / "configurations.csv")
+    for value in (1.0, 2.0, 3.0):
+        if value == 2.0:
+
+            def fail(*args, **kwargs):
+                raise OSError("disk full")
+
+            monkeypatch.setattr(writers, "open", fail, raising=False)
+        with CsvSink(filename, "npz") as sink:
+            sink.add({"name": str(value), "RBC": np.full(3, value)})
+        monkeypatch.undo()
+    with open(filename, newline="") as f:
+        names = [row["name"] for row in csv.DictReader(f)]
+    arrays = read_sidecar(sidecar_path(filename, "npz"))["RBC"]
+    assert names == ["1.0", "3.0"]
+    assert [a[0] for a in arrays] == [1.0, 3.0]